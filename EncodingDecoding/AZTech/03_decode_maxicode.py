@@ -1,12 +1,14 @@
 import subprocess
 import os
 
-def decode_maxicode_with_docker(image_path, docker_image="zxing-decoder"):
+def decode_maxicode_with_docker(image_path, docker_image="zxing-decoder", pool=None):
     """
     Decodes a MaxiCode using a Dockerized ZXing setup.
     Parameters:
         - image_path (str): Path to the MaxiCode image file to decode.
         - docker_image (str): Name of the Docker image containing ZXing.
+        - pool: Optional warm container pool (decode_common.container_pool);
+          when given, no new container is started for this image.
     Returns:
         - Decoded result as a string or an error message if decoding fails.
     """
@@ -14,6 +16,15 @@ def decode_maxicode_with_docker(image_path, docker_image="zxing-decoder"):
     if not os.path.exists(image_path):
         return f"Error: File '{image_path}' not found."
 
+    if pool is not None:
+        try:
+            barcodes = pool.decode_file(image_path, timeout=30)
+        except Exception as e:
+            return f"Error: {str(e)}"
+        if not barcodes:
+            return "Error: No barcode found."
+        return "\n".join(barcode["text"] for barcode in barcodes)
+
     try:
         # Run the Docker command to decode the MaxiCode
         command = [
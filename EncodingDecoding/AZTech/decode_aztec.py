@@ -3,23 +3,58 @@ Aztec Code Decoder - Complete Implementation
 Decodes Aztec barcodes using multiple methods
 """
 
-from pyzbar.pyzbar import decode
-from PIL import Image
-import cv2
 import sys
 import os
+import time
 
-def decode_aztec(image_path):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from decode_common.image_context import ImageContext
+from decode_common.cascade import estimated_costs, run_cascade, DEFAULT_WORKERS
+from decode_common.result_cache import default_cache, symbol_record, record_symbol
+from decode_common.backends import route
+from decode_common.localize import localized_methods
+from decode_common.multi import find_all
+from decode_common.prefilter import DEFAULT_THRESHOLD as PREFILTER_THRESHOLD, screen, shorten
+from decode_common.deadline import deadline_of, GaveUp
+from decode_common.lazy import report_at_exit
+from decode_common.trace import traced, trace_to
+from decode_common.result import DecodeResult, FORMATS, silenced, timings_since, write_results
+
+# Default file the decoded data is written to (None = do not write)
+OUTPUT_FILE = "decoded_aztec.txt"
+
+# Part of the cache key; bump when the cascade changes what it can find
+CACHE_CONFIG = "aztec/v2"
+
+@traced()
+def decode_aztec(image_path, workers=DEFAULT_WORKERS, cache=None, output_file=OUTPUT_FILE,
+                 localize=True, deadline=None, quiet=False, all_symbols=False,
+                 prefilter=PREFILTER_THRESHOLD):
     """
     Decode Aztec code from image
     
     Args:
         image_path: Path to the image file
+        workers: Threads used for the preprocessing cascade (1 = sequential)
+        cache: ResultCache to consult first (default: the shared cache,
+            False disables caching)
+        output_file: File the decoded data is written to (None = do not write)
+        localize: Decode candidate regions of large images before the full frame
+        deadline: Latency budget in ms (or a Deadline); methods that would
+            overrun it are skipped
+        quiet: Skip the per-symbol console report
+        all_symbols: Return every Aztec code on the page, merged across
+            backends and regions, instead of the first method's result
+        prefilter: Code-likelihood threshold below which the cascade is
+            shortened or skipped (see decode_common.prefilter; 0 disables)
     
     Returns:
-        List of decoded data or None
+        List of DecodeResult or None
     """
     
+    start = time.perf_counter()
+    deadline = deadline_of(deadline)
+    
     if not os.path.exists(image_path):
         print(f"❌ Error: Image file '{image_path}' not found!")
         return None
@@ -30,79 +65,63 @@ def decode_aztec(image_path):
     print(f"Image: {image_path}\n")
     
     try:
-        # Method 1: Try with pyzbar + PIL
-        print("Method 1: Decoding with pyzbar + PIL...")
-        pil_image = Image.open(image_path)
-        decoded_pil = decode(pil_image)
-        
-        if decoded_pil:
-            aztec_results = [obj for obj in decoded_pil if obj.type == 'AZTEC']
-            if aztec_results:
-                print("✅ Successfully decoded with pyzbar + PIL!\n")
-                return process_results(aztec_results, image_path)
-        
-        # Method 2: Try with pyzbar + OpenCV
-        print("Method 2: Decoding with pyzbar + OpenCV...")
-        cv_image = cv2.imread(image_path)
-        decoded_cv = decode(cv_image)
-        
-        if decoded_cv:
-            aztec_results = [obj for obj in decoded_cv if obj.type == 'AZTEC']
-            if aztec_results:
-                print("✅ Successfully decoded with pyzbar + OpenCV!\n")
-                return process_results(aztec_results, image_path)
-        
-        # Method 3: Try with grayscale
-        print("Method 3: Decoding with grayscale conversion...")
-        gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-        decoded_gray = decode(gray)
-        
-        if decoded_gray:
-            aztec_results = [obj for obj in decoded_gray if obj.type == 'AZTEC']
-            if aztec_results:
-                print("✅ Successfully decoded with grayscale!\n")
-                return process_results(aztec_results, image_path)
-        
-        # Method 4: Try with binary threshold
-        print("Method 4: Decoding with binary threshold...")
-        _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
-        decoded_binary = decode(binary)
-        
-        if decoded_binary:
-            aztec_results = [obj for obj in decoded_binary if obj.type == 'AZTEC']
-            if aztec_results:
-                print("✅ Successfully decoded with binary threshold!\n")
-                return process_results(aztec_results, image_path)
-        
-        # Method 5: Try with Otsu's thresholding
-        print("Method 5: Decoding with Otsu's thresholding...")
-        _, otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        decoded_otsu = decode(otsu)
-        
-        if decoded_otsu:
-            aztec_results = [obj for obj in decoded_otsu if obj.type == 'AZTEC']
-            if aztec_results:
-                print("✅ Successfully decoded with Otsu's thresholding!\n")
-                return process_results(aztec_results, image_path)
-        
-        # Method 6: Try with adaptive thresholding
-        print("Method 6: Decoding with adaptive thresholding...")
-        adaptive = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                        cv2.THRESH_BINARY, 11, 2)
-        decoded_adaptive = decode(adaptive)
-        
-        if decoded_adaptive:
-            aztec_results = [obj for obj in decoded_adaptive if obj.type == 'AZTEC']
-            if aztec_results:
-                print("✅ Successfully decoded with adaptive thresholding!\n")
-                return process_results(aztec_results, image_path)
+        cache = default_cache() if cache is None else cache
+        if cache:
+            cache_key = cache.key_for_file(image_path, f"{CACHE_CONFIG}{':all' if all_symbols else ''}")
+            records = cache.get(cache_key)
+            if records:
+                print("✅ Found in result cache!\n")
+                return process_results([record_symbol(r) for r in records], image_path, output_file,
+                                       method="cache", timings=timings_since(start), quiet=quiet)
+        
+        ctx = ImageContext(image_path)
+        if ctx.image is None:
+            print(f"❌ Error: Could not load image '{image_path}'")
+            return None
+        
+        action = screen(ctx, prefilter)
+        if action == "skip":
+            return None
+        
+        # Only backends that can read Aztec (zbar cannot); on large photos
+        # candidate crops are tried before the full frame
+        if action == "shorten":
+            methods = shorten(route(ctx, 'AZTEC', deadline=deadline))
+        elif localize and not all_symbols:
+            methods = localized_methods(ctx, lambda c: route(c, 'AZTEC', deadline=deadline))
+        else:
+            methods = route(ctx, 'AZTEC', deadline=deadline)
+        if not methods:
+            print("❌ No Aztec-capable backend installed (pyztec or ZXing with Java)")
+            return None
+        
+        if all_symbols and action == "decode":
+            print("Decoding every Aztec code on the page...")
+            aztec_results = find_all(ctx, lambda c: route(c, 'AZTEC', deadline=deadline),
+                                     deadline=deadline)
+            method_name = "find all" if aztec_results else None
+        else:
+            for i, (name, _) in enumerate(methods, 1):
+                print(f"Method {i}: Decoding with {name}...")
+            
+            method_name, aztec_results = run_cascade(methods, workers=workers, deadline=deadline,
+                                                     costs=estimated_costs(ctx))
+        if isinstance(aztec_results, GaveUp):
+            print(f"⏱️ Time budget exhausted: {aztec_results}")
+            return None
+        if method_name:
+            print(f"✅ Successfully decoded with {method_name}!\n")
+            if cache:
+                cache.put(cache_key, [symbol_record(obj) for obj in aztec_results])
+            return process_results(aztec_results, image_path, output_file, method=method_name,
+                                   timings=timings_since(start), quiet=quiet)
         
         print("❌ No Aztec code found with any method!")
         print("\nPossible reasons:")
         print("  - The image doesn't contain an Aztec code")
         print("  - The Aztec code is damaged or unclear")
         print("  - Image quality is too low")
-        print("  - The code requires specialized pyztec library")
+        print("  - The code is a full-range symbol (pyztec only reads compact ones)")
         return None
         
     except Exception as e:
@@ -111,34 +130,35 @@ def decode_aztec(image_path):
         traceback.print_exc()
         return None
 
-def process_results(decoded_objects, image_path):
-    """Process and display decoded results"""
+def process_results(decoded_objects, image_path, output_file=OUTPUT_FILE, method=None,
+                    timings=None, quiet=False):
+    """Process and display decoded results (returns a list of DecodeResult)"""
+    
+    results = [DecodeResult.from_symbol(obj, method, timings, image_path) for obj in decoded_objects]
+    
+    # Save to file
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for i, result in enumerate(results, 1):
+                f.write(f"Aztec Code #{i}\n")
+                f.write(f"Type: {result.symbology}\n")
+                f.write(f"Data: {result.text}\n")
+                f.write("\n")
+    
+    if quiet:
+        return results
     
     print("=" * 80)
-    print(f"✅ Found {len(decoded_objects)} Aztec code(s)")
+    print(f"✅ Found {len(results)} Aztec code(s)")
     print("=" * 80)
     
-    decoded_data_list = []
-    
-    for i, obj in enumerate(decoded_objects, 1):
-        # Decode data
-        try:
-            aztec_data = obj.data.decode('utf-8')
-        except UnicodeDecodeError:
-            try:
-                aztec_data = obj.data.decode('latin-1')
-            except:
-                aztec_data = str(obj.data)
-        
-        aztec_type = obj.type
-        decoded_data_list.append((aztec_type, aztec_data))
-        
+    for i, (obj, result) in enumerate(zip(decoded_objects, results), 1):
         # Display information
         print(f"\nAztec Code #{i}")
-        print(f"  Type: {aztec_type}")
-        print(f"  Data: {aztec_data}")
+        print(f"  Type: {result.symbology}")
+        print(f"  Data: {result.text}")
         print(f"  Raw Bytes: {obj.data}")
-        print(f"  Data Length: {len(aztec_data)} characters")
+        print(f"  Data Length: {len(result.text)} characters")
         
         # Position information
         if hasattr(obj, 'rect'):
@@ -156,29 +176,50 @@ def process_results(decoded_objects, image_path):
         
         print("-" * 80)
     
-    # Save to file
-    output_file = "decoded_aztec.txt"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for i, (aztec_type, data) in enumerate(decoded_data_list, 1):
-            f.write(f"Aztec Code #{i}\n")
-            f.write(f"Type: {aztec_type}\n")
-            f.write(f"Data: {data}\n")
-            f.write("\n")
-    
-    print(f"\n💾 Decoded data saved to: {output_file}")
+    if output_file:
+        print(f"\n💾 Decoded data saved to: {output_file}")
     print("=" * 80)
     
-    return decoded_data_list
+    return results
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python decode_aztec.py <image_path>")
-        print("\nExample:")
-        print("  python decode_aztec.py aztec.png")
-        sys.exit(1)
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Aztec code decoder",
+        epilog="Example: python decode_aztec.py aztec.png",
+    )
+    parser.add_argument("image_path", help="Path to the image file")
+    parser.add_argument("--budget-ms", type=float,
+                        help="Latency budget per image; slower methods are skipped")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Print backend import timings on exit")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Write a Chrome trace of every stage to FILE and print stage timings")
+    parser.add_argument("--format", choices=FORMATS, default="text",
+                        help="jsonl/csv: one record per symbol on stdout, no report or text file")
+    parser.add_argument("--all", action="store_true",
+                        help="Decode every Aztec code on the page, not just the first method's result")
+    parser.add_argument("--prefilter-threshold", type=float, default=PREFILTER_THRESHOLD,
+                        help="Skip or shorten the cascade on images scoring below this "
+                             "code likelihood (0 disables)")
+    args = parser.parse_args()
+    
+    if args.startup_report:
+        report_at_exit()
+    if args.trace:
+        trace_to(args.trace)
+    
+    if args.format != "text":
+        with silenced():
+            results = decode_aztec(args.image_path, deadline=args.budget_ms, output_file=None,
+                                   quiet=True, all_symbols=args.all,
+                                   prefilter=args.prefilter_threshold)
+        write_results(results, args.format)
+        sys.exit(0 if results else 1)
     
-    image_path = sys.argv[1]
-    results = decode_aztec(image_path)
+    results = decode_aztec(args.image_path, deadline=args.budget_ms, all_symbols=args.all,
+                           prefilter=args.prefilter_threshold)
     
     if results:
         print("\n✅ DECODING SUCCESSFUL!")
@@ -3,23 +3,71 @@
 Decodes all types of 1D barcodes (EAN, UPC, Code128, etc.)
 """
 
-from pyzbar.pyzbar import decode
-from PIL import Image
-import cv2
 import sys
 import os
+import time
 
-def decode_barcode(image_path):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from decode_common.image_context import ImageContext
+from decode_common.cascade import estimated_costs, run_cascade, DEFAULT_WORKERS
+from decode_common.result_cache import default_cache, symbol_record, record_symbol
+from decode_common.localize import localized_methods
+from decode_common.symbologies import PROFILES, parse_symbols, zbar_decode
+from decode_common.deadline import deadline_of, GaveUp
+from decode_common.lazy import report_at_exit
+from decode_common.trace import traced, trace_to
+from decode_common.result import DecodeResult, FORMATS, silenced, timings_since, write_results
+from decode_common.prefilter import DEFAULT_THRESHOLD as PREFILTER_THRESHOLD, screen, shorten
+
+# Default file the decoded data is written to (None = do not write)
+OUTPUT_FILE = "decoded_barcode.txt"
+
+# Part of the cache key; bump when the methods change what they can find
+CACHE_CONFIG = "barcode/v1"
+
+def decode_with_pyzbar(image, symbols=PROFILES['barcode']):
+    """Run pyzbar on one image variant, restricted to `symbols`"""
+    decoded_objects = zbar_decode(image, symbols)
+    return bool(decoded_objects), decoded_objects
+
+def build_methods(ctx, symbols=PROFILES['barcode']):
+    """Cascade methods for one image (or candidate crop), in preferred order"""
+    return [
+        ("PIL", lambda: decode_with_pyzbar(ctx.pil, symbols)),
+        ("OpenCV", lambda: decode_with_pyzbar(ctx.image, symbols)),
+        ("grayscale", lambda: decode_with_pyzbar(ctx.gray, symbols)),
+        ("binary threshold", lambda: decode_with_pyzbar(ctx.binary, symbols)),
+        ("adaptive thresholding", lambda: decode_with_pyzbar(ctx.adaptive, symbols)),
+    ]
+
+@traced()
+def decode_barcode(image_path, workers=DEFAULT_WORKERS, cache=None, output_file=OUTPUT_FILE,
+                   symbols=PROFILES['barcode'], localize=True, deadline=None, quiet=False,
+                   prefilter=PREFILTER_THRESHOLD):
     """
     Decode 1D barcode from image
     
     Args:
         image_path: Path to the image file
+        workers: Threads used for the preprocessing cascade (1 = sequential)
+        cache: ResultCache to consult first (default: the shared cache,
+            False disables caching)
+        output_file: File the decoded data is written to (None = do not write)
+        symbols: Symbologies zbar scans for (see decode_common.symbologies)
+        localize: Decode candidate regions of large images before the full frame
+        deadline: Latency budget in ms (or a Deadline); methods that would
+            overrun it are skipped
+        quiet: Skip the per-symbol console report
+        prefilter: Code-likelihood threshold below which the cascade is
+            shortened or skipped (see decode_common.prefilter; 0 disables)
     
     Returns:
-        List of decoded data or None
+        List of DecodeResult or None
     """
     
+    start = time.perf_counter()
+    deadline = deadline_of(deadline)
+    
     if not os.path.exists(image_path):
         print(f"❌ Error: Image file '{image_path}' not found!")
         return None
@@ -30,52 +78,47 @@ def decode_barcode(image_path):
     print(f"Image: {image_path}\n")
     
     try:
-        # Method 1: Try with PIL
-        print("Method 1: Decoding with PIL...")
-        pil_image = Image.open(image_path)
-        decoded_pil = decode(pil_image)
-        
-        if decoded_pil:
-            print("✅ Successfully decoded with PIL!\n")
-            return process_results(decoded_pil, image_path)
-        
-        # Method 2: Try with OpenCV
-        print("Method 2: Decoding with OpenCV...")
-        cv_image = cv2.imread(image_path)
-        decoded_cv = decode(cv_image)
-        
-        if decoded_cv:
-            print("✅ Successfully decoded with OpenCV!\n")
-            return process_results(decoded_cv, image_path)
-        
-        # Method 3: Try with grayscale
-        print("Method 3: Decoding with grayscale conversion...")
-        gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-        decoded_gray = decode(gray)
-        
-        if decoded_gray:
-            print("✅ Successfully decoded with grayscale!\n")
-            return process_results(decoded_gray, image_path)
-        
-        # Method 4: Try with preprocessing
-        print("Method 4: Decoding with image preprocessing...")
-        # Apply thresholding
-        _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
-        decoded_binary = decode(binary)
-        
-        if decoded_binary:
-            print("✅ Successfully decoded with binary threshold!\n")
-            return process_results(decoded_binary, image_path)
-        
-        # Method 5: Try with adaptive thresholding
-        print("Method 5: Decoding with adaptive thresholding...")
-        adaptive = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                        cv2.THRESH_BINARY, 11, 2)
-        decoded_adaptive = decode(adaptive)
-        
-        if decoded_adaptive:
-            print("✅ Successfully decoded with adaptive thresholding!\n")
-            return process_results(decoded_adaptive, image_path)
+        cache = default_cache() if cache is None else cache
+        if cache:
+            cache_key = cache.key_for_file(image_path, f"{CACHE_CONFIG}:{','.join(symbols)}")
+            records = cache.get(cache_key)
+            if records:
+                print("✅ Found in result cache!\n")
+                return process_results([record_symbol(r) for r in records], image_path, output_file,
+                                       method="cache", timings=timings_since(start), quiet=quiet)
+        
+        ctx = ImageContext(image_path)
+        if ctx.image is None:
+            print(f"❌ Error: Could not load image '{image_path}'")
+            return None
+        
+        action = screen(ctx, prefilter)
+        if action == "skip":
+            return None
+        
+        # Large photos: try candidate crops before the full frame
+        if action == "shorten":
+            methods = shorten(build_methods(ctx, symbols))
+        elif localize:
+            methods = localized_methods(ctx, lambda c: build_methods(c, symbols))
+        else:
+            methods = build_methods(ctx, symbols)
+        for i, (name, _) in enumerate(methods, 1):
+            print(f"Method {i}: Decoding with {name}...")
+        
+        method_name, result = run_cascade(methods, workers=workers, deadline=deadline,
+                                          costs=estimated_costs(ctx))
+        
+        if isinstance(result, GaveUp):
+            print(f"⏱️ Time budget exhausted: {result}")
+            return None
+        
+        if method_name:
+            print(f"✅ Successfully decoded with {method_name}!\n")
+            if cache:
+                cache.put(cache_key, [symbol_record(obj) for obj in result])
+            return process_results(result, image_path, output_file, method=method_name,
+                                   timings=timings_since(start), quiet=quiet)
         
         print("❌ No barcode found with any method!")
         print("\nPossible reasons:")
@@ -91,32 +134,33 @@ def decode_barcode(image_path):
         traceback.print_exc()
         return None
 
-def process_results(decoded_objects, image_path):
-    """Process and display decoded results"""
+def process_results(decoded_objects, image_path, output_file=OUTPUT_FILE, method=None,
+                    timings=None, quiet=False):
+    """Process and display decoded results (returns a list of DecodeResult)"""
+    
+    results = [DecodeResult.from_symbol(obj, method, timings, image_path) for obj in decoded_objects]
+    
+    # Save to file
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for i, result in enumerate(results, 1):
+                f.write(f"Barcode #{i}\n")
+                f.write(f"Type: {result.symbology}\n")
+                f.write(f"Data: {result.text}\n")
+                f.write("\n")
+    
+    if quiet:
+        return results
     
     print("=" * 80)
-    print(f"✅ Found {len(decoded_objects)} barcode(s)")
+    print(f"✅ Found {len(results)} barcode(s)")
     print("=" * 80)
     
-    decoded_data_list = []
-    
-    for i, obj in enumerate(decoded_objects, 1):
-        # Decode data
-        try:
-            barcode_data = obj.data.decode('utf-8')
-        except UnicodeDecodeError:
-            try:
-                barcode_data = obj.data.decode('latin-1')
-            except:
-                barcode_data = str(obj.data)
-        
-        barcode_type = obj.type
-        decoded_data_list.append((barcode_type, barcode_data))
-        
+    for i, (obj, result) in enumerate(zip(decoded_objects, results), 1):
         # Display information
         print(f"\nBarcode #{i}")
-        print(f"  Type: {barcode_type}")
-        print(f"  Data: {barcode_data}")
+        print(f"  Type: {result.symbology}")
+        print(f"  Data: {result.text}")
         print(f"  Raw Bytes: {obj.data}")
         
         # Position information
@@ -131,29 +175,50 @@ def process_results(decoded_objects, image_path):
         
         print("-" * 80)
     
-    # Save to file
-    output_file = "decoded_barcode.txt"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for i, (barcode_type, data) in enumerate(decoded_data_list, 1):
-            f.write(f"Barcode #{i}\n")
-            f.write(f"Type: {barcode_type}\n")
-            f.write(f"Data: {data}\n")
-            f.write("\n")
-    
-    print(f"\n💾 Decoded data saved to: {output_file}")
+    if output_file:
+        print(f"\n💾 Decoded data saved to: {output_file}")
     print("=" * 80)
     
-    return decoded_data_list
+    return results
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python decode_barcode.py <image_path>")
-        print("\nExample:")
-        print("  python decode_barcode.py barcode.png")
-        sys.exit(1)
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="1D barcode decoder",
+        epilog="Example: python decode_barcode.py barcode.png",
+    )
+    parser.add_argument("image_path", help="Path to the image file")
+    parser.add_argument("--symbols", type=parse_symbols, default=PROFILES['barcode'],
+                        help="Comma-separated zbar symbologies or profile names (default: barcode)")
+    parser.add_argument("--budget-ms", type=float,
+                        help="Latency budget per image; slower methods are skipped")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Print backend import timings on exit")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Write a Chrome trace of every stage to FILE and print stage timings")
+    parser.add_argument("--format", choices=FORMATS, default="text",
+                        help="jsonl/csv: one record per symbol on stdout, no report or text file")
+    parser.add_argument("--prefilter-threshold", type=float, default=PREFILTER_THRESHOLD,
+                        help="Skip or shorten the cascade on images scoring below this "
+                             "code likelihood (0 disables)")
+    args = parser.parse_args()
+    
+    if args.startup_report:
+        report_at_exit()
+    if args.trace:
+        trace_to(args.trace)
+    
+    if args.format != "text":
+        with silenced():
+            results = decode_barcode(args.image_path, symbols=args.symbols,
+                                     deadline=args.budget_ms, output_file=None, quiet=True,
+                                     prefilter=args.prefilter_threshold)
+        write_results(results, args.format)
+        sys.exit(0 if results else 1)
     
-    image_path = sys.argv[1]
-    results = decode_barcode(image_path)
+    results = decode_barcode(args.image_path, symbols=args.symbols, deadline=args.budget_ms,
+                             prefilter=args.prefilter_threshold)
     
     if results:
         print("\n✅ DECODING SUCCESSFUL!")
@@ -3,22 +3,68 @@ Data Matrix Decoder - Complete Implementation
 Decodes Data Matrix barcodes (ECC 200 and other variants)
 """
 
-from pylibdmtx.pylibdmtx import decode
-from PIL import Image
 import sys
 import os
+import time
 
-def decode_datamatrix(image_path):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from decode_common.result_cache import default_cache, symbol_record, record_symbol
+from decode_common.cascade import estimated_costs, run_cascade
+from decode_common.deadline import deadline_of, GaveUp
+from decode_common.lazy import lazy, load, report_at_exit
+from decode_common.localize import localized_methods
+from decode_common.trace import traced, trace_to
+from decode_common.image_context import ImageContext
+from decode_common.prefilter import DEFAULT_THRESHOLD as PREFILTER_THRESHOLD, screen, shorten
+from decode_common.result import DecodeResult, FORMATS, silenced, timings_since, write_results
+
+pylibdmtx = lazy("pylibdmtx.pylibdmtx")
+
+# Default file the decoded data is written to (None = do not write)
+OUTPUT_FILE = "decoded_datamatrix.txt"
+
+# Part of the cache key; bump when decoding changes what it can find
+CACHE_CONFIG = "datamatrix/v1"
+
+def decode_with_pylibdmtx(image, deadline=None):
+    """Run libdmtx on one image; the scan stops when `deadline` runs out"""
+    if deadline is None:
+        decoded_results = pylibdmtx.decode(image)
+    else:
+        # libdmtx stops scanning after `timeout` milliseconds
+        decoded_results = pylibdmtx.decode(image, timeout=max(1, int(deadline.remaining_ms())))
+    return bool(decoded_results), decoded_results
+
+def build_methods(ctx, deadline=None):
+    """Cascade methods for one image (or candidate crop): a single libdmtx scan"""
+    return [("libdmtx", lambda: decode_with_pylibdmtx(ctx.pil, deadline))]
+
+@traced()
+def decode_datamatrix(image_path, cache=None, output_file=OUTPUT_FILE, deadline=None,
+                      prefilter=PREFILTER_THRESHOLD, quiet=False, localize=True):
     """
     Decode Data Matrix barcode from image
     
     Args:
         image_path: Path to the image file
+        cache: ResultCache to consult first (default: the shared cache,
+            False disables caching)
+        output_file: File the decoded data is written to (None = do not write)
+        deadline: Latency budget in ms (or a Deadline); the time left is
+            passed to each libdmtx scan as its timeout
+        prefilter: Code-likelihood threshold below which the image is
+            skipped, or only scanned as a whole (see decode_common.prefilter;
+            0 disables)
+        quiet: Skip the per-symbol console report
+        localize: Scan candidate regions of large images before the full frame
     
     Returns:
-        List of decoded data or None
+        List of DecodeResult or None
     """
     
+    start = time.perf_counter()
+    deadline = deadline_of(deadline)
+    
     if not os.path.exists(image_path):
         print(f"❌ Error: Image file '{image_path}' not found!")
         return None
@@ -29,16 +75,47 @@ def decode_datamatrix(image_path):
     print(f"Image: {image_path}\n")
     
     try:
-        # Load image
-        image = Image.open(image_path)
-        print(f"Image size: {image.size}")
-        print(f"Image mode: {image.mode}\n")
+        cache = default_cache() if cache is None else cache
+        if cache:
+            cache_key = cache.key_for_file(image_path, CACHE_CONFIG)
+            records = cache.get(cache_key)
+            if records:
+                print("✅ Found in result cache!\n")
+                return process_results([record_symbol(r) for r in records], image_path, output_file,
+                                       method="cache", timings=timings_since(start), quiet=quiet)
+        
+        ctx = ImageContext(image_path)
+        if ctx.image is None:
+            print(f"❌ Error: Could not load image '{image_path}'")
+            return None
+        
+        # libdmtx scans a code-free image for as long as it is allowed to
+        action = screen(ctx, prefilter)
+        if action == "skip":
+            return None
         
-        # Decode Data Matrix
-        print("Decoding Data Matrix barcode...\n")
-        decoded_results = decode(image)
+        height, width = ctx.shape[:2]
+        print(f"Image size: {width} x {height}\n")
         
-        if not decoded_results:
+        # Import now, so a missing libdmtx is reported instead of failing
+        # every scan quietly
+        load("pylibdmtx.pylibdmtx")
+        
+        # Large photos: scan candidate crops before the full frame
+        if action == "decode" and localize:
+            methods = localized_methods(ctx, lambda c: build_methods(c, deadline))
+        else:
+            methods = shorten(build_methods(ctx, deadline))
+        print(f"Decoding Data Matrix barcode ({len(methods)} scan(s))...\n")
+        
+        method_name, decoded_results = run_cascade(methods, workers=1, deadline=deadline,
+                                                   costs=estimated_costs(ctx))
+        
+        if isinstance(decoded_results, GaveUp):
+            print(f"⏱️ Time budget exhausted: {decoded_results}")
+            return None
+        
+        if not method_name:
             print("❌ No Data Matrix barcode found!")
             print("\nPossible reasons:")
             print("  - The image doesn't contain a Data Matrix barcode")
@@ -47,51 +124,10 @@ def decode_datamatrix(image_path):
             print("  - Wrong barcode type (not Data Matrix)")
             return None
         
-        # Process results
-        print(f"✅ Successfully decoded {len(decoded_results)} Data Matrix barcode(s)\n")
-        print("=" * 80)
-        
-        decoded_data_list = []
-        
-        for i, result in enumerate(decoded_results, 1):
-            try:
-                # Decode bytes to string
-                decoded_text = result.data.decode('utf-8')
-            except UnicodeDecodeError:
-                # If UTF-8 fails, try latin-1 or show raw bytes
-                try:
-                    decoded_text = result.data.decode('latin-1')
-                except:
-                    decoded_text = str(result.data)
-            
-            decoded_data_list.append(decoded_text)
-            
-            # Display result
-            print(f"Data Matrix #{i}")
-            print(f"  Decoded Text: {decoded_text}")
-            print(f"  Data Length: {len(decoded_text)} characters")
-            print(f"  Raw Bytes: {result.data}")
-            
-            # Position and size info if available
-            if hasattr(result, 'rect'):
-                rect = result.rect
-                print(f"  Position: x={rect.left}, y={rect.top}")
-                print(f"  Size: {rect.width} x {rect.height} pixels")
-            
-            print("-" * 80)
-        
-        # Save decoded data to file
-        output_file = "decoded_datamatrix.txt"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            for i, data in enumerate(decoded_data_list, 1):
-                f.write(f"Data Matrix #{i}:\n")
-                f.write(f"{data}\n")
-                f.write("\n")
-        
-        print(f"\n💾 Decoded data saved to: {output_file}")
-        print("=" * 80)
-        
-        return decoded_data_list
+        if cache:
+            cache.put(cache_key, [symbol_record(result) for result in decoded_results])
+        return process_results(decoded_results, image_path, output_file, method=method_name,
+                               timings=timings_since(start), quiet=quiet)
         
     except Exception as e:
         print(f"❌ Error during decoding: {str(e)}")
@@ -99,21 +135,88 @@ def decode_datamatrix(image_path):
         traceback.print_exc()
         return None
 
+def process_results(decoded_results, image_path, output_file=OUTPUT_FILE, method=None,
+                    timings=None, quiet=False):
+    """Process and display decoded results (returns a list of DecodeResult)"""
+    
+    results = [DecodeResult.from_symbol(obj, method, timings, image_path, symbology='DATAMATRIX')
+               for obj in decoded_results]
+    
+    # Save to file
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for i, result in enumerate(results, 1):
+                f.write(f"Data Matrix #{i}:\n")
+                f.write(f"{result.text}\n")
+                f.write("\n")
+    
+    if quiet:
+        return results
+    
+    print(f"✅ Successfully decoded {len(results)} Data Matrix barcode(s)\n")
+    print("=" * 80)
+    
+    for i, (obj, result) in enumerate(zip(decoded_results, results), 1):
+        # Display result
+        print(f"Data Matrix #{i}")
+        print(f"  Decoded Text: {result.text}")
+        print(f"  Data Length: {len(result.text)} characters")
+        print(f"  Raw Bytes: {obj.data}")
+        
+        # Position and size info if available
+        if hasattr(obj, 'rect'):
+            rect = obj.rect
+            print(f"  Position: x={rect.left}, y={rect.top}")
+            print(f"  Size: {rect.width} x {rect.height} pixels")
+        
+        print("-" * 80)
+    
+    if output_file:
+        print(f"\n💾 Decoded data saved to: {output_file}")
+    print("=" * 80)
+    
+    return results
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python decode_datamatrix.py <image_path>")
-        print("\nExample:")
-        print("  python decode_datamatrix.py datamatrix.png")
-        sys.exit(1)
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Data Matrix decoder",
+        epilog="Example: python decode_datamatrix.py datamatrix.png",
+    )
+    parser.add_argument("image_path", help="Path to the image file")
+    parser.add_argument("--budget-ms", type=float,
+                        help="Latency budget per image, passed to libdmtx as its scan timeout")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Print backend import timings on exit")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Write a Chrome trace of every stage to FILE and print stage timings")
+    parser.add_argument("--format", choices=FORMATS, default="text",
+                        help="jsonl/csv: one record per symbol on stdout, no report or text file")
+    parser.add_argument("--prefilter-threshold", type=float, default=PREFILTER_THRESHOLD,
+                        help="Skip images scoring below this code likelihood (0 disables)")
+    args = parser.parse_args()
+    
+    if args.startup_report:
+        report_at_exit()
+    if args.trace:
+        trace_to(args.trace)
+    
+    if args.format != "text":
+        with silenced():
+            results = decode_datamatrix(args.image_path, output_file=None, deadline=args.budget_ms,
+                                        prefilter=args.prefilter_threshold, quiet=True)
+        write_results(results, args.format)
+        sys.exit(0 if results else 1)
     
-    image_path = sys.argv[1]
-    results = decode_datamatrix(image_path)
+    results = decode_datamatrix(args.image_path, deadline=args.budget_ms,
+                                prefilter=args.prefilter_threshold)
     
     if results:
         print("\n✅ DECODING SUCCESSFUL!")
         print(f"Total decoded messages: {len(results)}")
-        for i, data in enumerate(results, 1):
-            print(f"\n{i}. {data}")
+        for i, (dm_type, data) in enumerate(results, 1):
+            print(f"\n{i}. [{dm_type}] {data}")
     else:
         print("\n❌ DECODING FAILED")
         sys.exit(1)
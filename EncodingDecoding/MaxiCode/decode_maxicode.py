@@ -6,133 +6,46 @@ Tries multiple methods to decode MaxiCode barcodes
 
 import sys
 import os
+import time
+from functools import partial
 from pathlib import Path
 
-# Method 1: Try with pyzbar
-def decode_with_pyzbar_pil(image_path):
-    """Decode using pyzbar with PIL"""
-    try:
-        from PIL import Image
-        from pyzbar.pyzbar import decode
-        
-        img = Image.open(image_path)
-        decoded_objects = decode(img)
-        
-        for obj in decoded_objects:
-            if obj.type == 'MAXICODE':
-                return obj.data.decode('utf-8', errors='replace'), obj
-        return None, None
-    except Exception as e:
-        return None, f"pyzbar+PIL error: {e}"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from decode_common.cascade import estimated_costs, run_cascade
+from decode_common.method_stats import MethodStats
+from decode_common.image_context import ImageContext
+from decode_common.backends import route, use_zxing_pool
+from decode_common.deadline import deadline_of, GaveUp
+from decode_common.lazy import report_at_exit
+from decode_common.trace import span, traced, trace_to
+from decode_common.prefilter import DEFAULT_THRESHOLD as PREFILTER_THRESHOLD, screen, shorten
+from decode_common.result import DecodeResult, FORMATS, silenced, timings_since, write_results
 
-# Method 2: Try with pyzbar and OpenCV
-def decode_with_pyzbar_opencv(image_path):
-    """Decode using pyzbar with OpenCV"""
-    try:
-        import cv2
-        from pyzbar.pyzbar import decode
-        
-        img = cv2.imread(image_path)
-        if img is None:
-            return None, "Could not load image"
-        
-        decoded_objects = decode(img)
-        
-        for obj in decoded_objects:
-            if obj.type == 'MAXICODE':
-                return obj.data.decode('utf-8', errors='replace'), obj
-        return None, None
-    except Exception as e:
-        return None, f"pyzbar+OpenCV error: {e}"
+# Written next to the image; None disables
+OUTPUT_FILE = "decoded_maxicode.txt"
 
-# Method 3: Try with grayscale conversion
-def decode_with_grayscale(image_path):
-    """Decode with grayscale preprocessing"""
-    try:
-        import cv2
-        from pyzbar.pyzbar import decode
-        
-        img = cv2.imread(image_path)
-        if img is None:
-            return None, "Could not load image"
-        
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        decoded_objects = decode(gray)
-        
-        for obj in decoded_objects:
-            if obj.type == 'MAXICODE':
-                return obj.data.decode('utf-8', errors='replace'), obj
+# zbar has no MaxiCode reader, so pyzbar is never tried; the backend router
+# picks ZXing (local JVM, or the warm containers) when it is usable
+def decode_with_backend(method):
+    """Adapt a routed cascade method to the (result, obj) convention"""
+    success, symbols = method()
+    if not success:
         return None, None
-    except Exception as e:
-        return None, f"grayscale error: {e}"
-
-# Method 4: Try with binary threshold
-def decode_with_binary(image_path):
-    """Decode with binary threshold preprocessing"""
-    try:
-        import cv2
-        from pyzbar.pyzbar import decode
-        
-        img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-        if img is None:
-            return None, "Could not load image"
-        
-        _, binary = cv2.threshold(img, 127, 255, cv2.THRESH_BINARY)
-        decoded_objects = decode(binary)
-        
-        for obj in decoded_objects:
-            if obj.type == 'MAXICODE':
-                return obj.data.decode('utf-8', errors='replace'), obj
-        return None, None
-    except Exception as e:
-        return None, f"binary threshold error: {e}"
+    text = "\n".join(obj.data.decode('utf-8', errors='replace') for obj in symbols)
+    return text, symbols[0]
 
-# Method 5: Try with Otsu's thresholding
-def decode_with_otsu(image_path):
-    """Decode with Otsu's thresholding"""
-    try:
-        import cv2
-        from pyzbar.pyzbar import decode
-        
-        img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-        if img is None:
-            return None, "Could not load image"
-        
-        _, otsu = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        decoded_objects = decode(otsu)
-        
-        for obj in decoded_objects:
-            if obj.type == 'MAXICODE':
-                return obj.data.decode('utf-8', errors='replace'), obj
-        return None, None
-    except Exception as e:
-        return None, f"Otsu threshold error: {e}"
-
-# Method 6: Try with adaptive thresholding
-def decode_with_adaptive(image_path):
-    """Decode with adaptive thresholding"""
-    try:
-        import cv2
-        from pyzbar.pyzbar import decode
-        
-        img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-        if img is None:
-            return None, "Could not load image"
-        
-        adaptive = cv2.adaptiveThreshold(img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                        cv2.THRESH_BINARY, 11, 2)
-        decoded_objects = decode(adaptive)
-        
-        for obj in decoded_objects:
-            if obj.type == 'MAXICODE':
-                return obj.data.decode('utf-8', errors='replace'), obj
-        return None, None
-    except Exception as e:
-        return None, f"adaptive threshold error: {e}"
+def use_warm_containers(size=2, image="zxing-decoder", runner=None):
+    """Keep `size` ZXing containers running and send ZXing work to them"""
+    from decode_common.container_pool import warm_container_pool
+    
+    jar_dir = os.path.dirname(os.path.abspath(__file__))
+    pool = warm_container_pool(jar_dir, size=size, image=image, runner=runner)
+    use_zxing_pool(pool)
+    return pool
 
-# Method 7: Try with ZXing via Docker
-def decode_with_zxing_docker(image_path):
-    """Decode using ZXing in Docker"""
+# Fallback: ZXing via one `docker run --rm` per image
+def decode_with_zxing_docker(image_path, deadline=None):
+    """Decode using ZXing in Docker (the wait is capped by `deadline`)"""
     try:
         import subprocess
         
@@ -144,7 +57,9 @@ def decode_with_zxing_docker(image_path):
             f"{os.path.abspath(os.path.dirname(image_path))}:/data",
             "zxing-decoder", f"/data/{os.path.basename(image_path)}"
         ]
-        result = subprocess.run(command, capture_output=True, text=True, timeout=30)
+        timeout = deadline.timeout(30) if deadline is not None else 30
+        with span("zxing docker", "external"):
+            result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
         
         if result.returncode == 0 and result.stdout.strip():
             return result.stdout.strip(), None
@@ -156,8 +71,27 @@ def decode_with_zxing_docker(image_path):
     except Exception as e:
         return None, f"ZXing Docker error: {e}"
 
-def decode_maxicode(image_path):
-    """Try all methods to decode MaxiCode"""
+@traced()
+def decode_maxicode(image_path, stats_file=None, deadline=None, prefilter=PREFILTER_THRESHOLD,
+                    output_file=OUTPUT_FILE):
+    """
+    Try all methods to decode MaxiCode
+    
+    Args:
+        image_path: Path to the image file
+        stats_file: Optional JSON file used to learn the method order
+        deadline: Latency budget in ms (or a Deadline); methods that would
+            overrun it are skipped
+        prefilter: Code-likelihood threshold below which the cascade is
+            shortened or skipped (see decode_common.prefilter; 0 disables)
+        output_file: Report file name, relative to the image's directory
+            (None disables)
+    
+    Returns:
+        List of DecodeResult or None
+    """
+    start = time.perf_counter()
+    deadline = deadline_of(deadline)
     
     print("=" * 80)
     print("MAXICODE DECODER")
@@ -166,55 +100,86 @@ def decode_maxicode(image_path):
     
     if not os.path.exists(image_path):
         print(f"❌ Error: Image file not found: {image_path}")
-        return False
-    
-    methods = [
-        ("Method 1: Decoding with pyzbar + PIL...", decode_with_pyzbar_pil),
-        ("Method 2: Decoding with pyzbar + OpenCV...", decode_with_pyzbar_opencv),
-        ("Method 3: Decoding with grayscale conversion...", decode_with_grayscale),
-        ("Method 4: Decoding with binary threshold...", decode_with_binary),
-        ("Method 5: Decoding with Otsu's thresholding...", decode_with_otsu),
-        ("Method 6: Decoding with adaptive thresholding...", decode_with_adaptive),
-        ("Method 7: Decoding with ZXing (Docker)...", decode_with_zxing_docker),
-    ]
-    
-    for description, method in methods:
+        return None
+    
+    ctx = ImageContext(image_path)
+    action = screen(ctx, prefilter) if ctx.image is not None else "decode"
+    if action == "skip":
+        return None
+    
+    methods = [(name, lambda path, method=method: decode_with_backend(method))
+               for name, method in route(ctx, 'MAXICODE', deadline=deadline)]
+    if action == "shorten":
+        # An unlikely image is not worth starting a container for
+        methods = shorten(methods)
+    elif not methods:
+        methods.append(("ZXing (Docker)", partial(decode_with_zxing_docker, deadline=deadline)))
+    methods = [(f"Method {i}: Decoding with {name}...", method)
+               for i, (name, method) in enumerate(methods, 1)]
+    
+    stats = MethodStats(stats_file, "MAXICODE") if stats_file else None
+    
+    def attempt(description, method):
+        # Methods return (result, obj); the cascade expects (success, result)
         print(description)
         result, obj = method(image_path)
-        
-        if result:
-            print(f"\n✅ SUCCESS! MaxiCode decoded with {description.split(':')[0]}")
-            print("-" * 80)
-            print("Decoded Data:")
-            print(result)
-            print("-" * 80)
-            
-            if obj and hasattr(obj, 'rect'):
-                print(f"\nPosition: x={obj.rect.left} y={obj.rect.top}")
-                print(f"Size: {obj.rect.width}x{obj.rect.height} pixels")
-            
-            # Save to file
-            output_file = os.path.join(os.path.dirname(image_path), "decoded_maxicode.txt")
-            try:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(f"MaxiCode Decoding Result\n")
-                    f.write(f"{'=' * 80}\n")
-                    f.write(f"Image: {image_path}\n")
-                    f.write(f"Method: {description}\n")
-                    f.write(f"\nDecoded Data:\n")
-                    f.write(result)
-                    f.write("\n")
-                    
-                    if obj and hasattr(obj, 'rect'):
-                        f.write(f"\nPosition: x={obj.rect.left} y={obj.rect.top}\n")
-                        f.write(f"Size: {obj.rect.width}x{obj.rect.height} pixels\n")
+        return bool(result), (result, obj)
+    
+    cascade = [(description, partial(attempt, description, method))
+               for description, method in methods]
+    description, outcome = run_cascade(cascade, workers=1, stats=stats, deadline=deadline,
+                                       costs=estimated_costs(ctx))
+    result, obj = outcome if description else (None, None)
+    if stats is not None:
+        stats.save()
+    
+    if isinstance(outcome, GaveUp):
+        print(f"\n⏱️ Time budget exhausted: {outcome}")
+    
+    if result:
+        print(f"\n✅ SUCCESS! MaxiCode decoded with {description.split(':')[0]}")
+        print("-" * 80)
+        print("Decoded Data:")
+        print(result)
+        print("-" * 80)
+        
+        if obj and hasattr(obj, 'rect'):
+            print(f"\nPosition: x={obj.rect.left} y={obj.rect.top}")
+            print(f"Size: {obj.rect.width}x{obj.rect.height} pixels")
+        
+        method_name = description.split(':')[0]
+        if obj is not None:
+            results = [DecodeResult.from_symbol(obj, method_name, timings_since(start), image_path,
+                                                symbology='MAXICODE')]
+        else:
+            results = [DecodeResult.from_text(result, 'MAXICODE', method_name, timings_since(start),
+                                              image_path)]
+        
+        if not output_file:
+            return results
+        
+        # Save to file
+        output_file = os.path.join(os.path.dirname(image_path), output_file)
+        try:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(f"MaxiCode Decoding Result\n")
+                f.write(f"{'=' * 80}\n")
+                f.write(f"Image: {image_path}\n")
+                f.write(f"Method: {description}\n")
+                f.write(f"\nDecoded Data:\n")
+                f.write(result)
+                f.write("\n")
                 
-                print(f"\n💾 Result saved to: {output_file}")
-            except Exception as e:
-                print(f"\n⚠️ Could not save to file: {e}")
+                if obj and hasattr(obj, 'rect'):
+                    f.write(f"\nPosition: x={obj.rect.left} y={obj.rect.top}\n")
+                    f.write(f"Size: {obj.rect.width}x{obj.rect.height} pixels\n")
             
-            return True
-    
+            print(f"\n💾 Result saved to: {output_file}")
+        except Exception as e:
+            print(f"\n⚠️ Could not save to file: {e}")
+        
+        return results
+
     print("\n❌ No MaxiCode found with any method!")
     print("\nPossible reasons:")
     print("  - The image doesn't contain a MaxiCode")
@@ -222,16 +187,49 @@ def decode_maxicode(image_path):
     print("  - Image quality is too low")
     print("  - MaxiCode requires ZXing library (try with Docker)")
     print("\n❌ DECODING FAILED")
-    return False
+    return None
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python decode_maxicode.py <image_path>")
-        print("\nExample:")
-        print("  python decode_maxicode.py maxicode.png")
-        print("  python decode_maxicode.py d:\\path\\to\\maxicode.jpg")
-        sys.exit(1)
-    
-    image_path = sys.argv[1]
-    success = decode_maxicode(image_path)
-    sys.exit(0 if success else 1)
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Comprehensive MaxiCode decoder",
+        epilog="Example: python decode_maxicode.py maxicode.png",
+    )
+    parser.add_argument("image_path", help="Path to the image file")
+    parser.add_argument("--stats-file",
+                        help="JSON file used to learn the method order from past results")
+    parser.add_argument("--budget-ms", type=float,
+                        help="Latency budget per image; slower methods are skipped")
+    parser.add_argument("--warm-containers", type=int, default=0, metavar="N",
+                        help="Keep N ZXing containers running instead of one 'docker run' per image")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Print backend import timings on exit")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Write a Chrome trace of every stage to FILE and print stage timings")
+    parser.add_argument("--prefilter-threshold", type=float, default=PREFILTER_THRESHOLD,
+                        help="Skip or shorten the cascade on images scoring below this "
+                             "code likelihood (0 disables)")
+    parser.add_argument("--format", choices=FORMATS, default="text",
+                        help="jsonl/csv: one record per symbol on stdout, no report or text file")
+    args = parser.parse_args()
+    
+    if args.startup_report:
+        report_at_exit()
+    if args.trace:
+        trace_to(args.trace)
+    
+    if args.warm_containers:
+        use_warm_containers(args.warm_containers)
+    
+    if args.format != "text":
+        with silenced():
+            results = decode_maxicode(args.image_path, stats_file=args.stats_file,
+                                      deadline=args.budget_ms, prefilter=args.prefilter_threshold,
+                                      output_file=None)
+        write_results(results, args.format)
+        sys.exit(0 if results else 1)
+    
+    results = decode_maxicode(args.image_path, stats_file=args.stats_file, deadline=args.budget_ms,
+                              prefilter=args.prefilter_threshold)
+    sys.exit(0 if results else 1)
@@ -3,23 +3,105 @@ QR Code Decoder - Complete Implementation
 Decodes all types of QR codes
 """
 
-from pyzbar.pyzbar import decode
-from PIL import Image
-import cv2
 import sys
 import os
+import time
 
-def decode_qrcode(image_path):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from decode_common.image_context import ImageContext
+from decode_common.cascade import estimated_costs, run_cascade, DEFAULT_WORKERS
+from decode_common.result_cache import default_cache, symbol_record, record_symbol
+from decode_common.backends import make_symbol
+from decode_common.localize import localized_methods
+from decode_common.multi import find_all
+from decode_common.prefilter import DEFAULT_THRESHOLD as PREFILTER_THRESHOLD, screen, shorten
+from decode_common.deadline import deadline_of, GaveUp
+from decode_common.symbologies import PROFILES, parse_symbols, zbar_decode
+from decode_common.lazy import lazy, report_at_exit
+from decode_common.trace import traced, trace_to
+from decode_common.result import DecodeResult, FORMATS, silenced, timings_since, write_results
+
+cv2 = lazy("cv2")
+
+# Default file the decoded data is written to (None = do not write)
+OUTPUT_FILE = "decoded_qrcode.txt"
+
+# Part of the cache key; bump when the cascade changes what it can find
+CACHE_CONFIG = "qrcode/v1"
+
+def decode_with_pyzbar(image, symbols=PROFILES['qrcode']):
+    """Run pyzbar on one image variant, restricted to `symbols`"""
+    decoded_objects = zbar_decode(image, symbols)
+    return bool(decoded_objects), decoded_objects
+
+def decode_with_qrcode_detector(image):
+    """Run OpenCV's QRCodeDetector; returns a pyzbar-shaped symbol on success"""
+    qrDecoder = cv2.QRCodeDetector()
+    data, vertices_array, _ = qrDecoder.detectAndDecode(image)
+    if not data:
+        return False, None
+    polygon = vertices_array.reshape(-1, 2) if vertices_array is not None else None
+    return True, [make_symbol(data, 'QRCODE', polygon)]
+
+def decode_with_qrcode_detector_multi(image):
+    """Run OpenCV's QRCodeDetector for every QR code in the image at once"""
+    found, texts, points, _ = cv2.QRCodeDetector().detectAndDecodeMulti(image)
+    if not found:
+        return False, None
+    symbols = [make_symbol(text, 'QRCODE', corners.reshape(-1, 2))
+               for text, corners in zip(texts, points) if text]
+    return bool(symbols), symbols
+
+def build_methods(ctx, symbols=PROFILES['qrcode'], multi=False):
+    """
+    Cascade methods for one image (or candidate crop), in preferred order
+    (`multi` uses the detector that reads every QR code in one pass)
+    """
+    if multi:
+        detector = ("OpenCV QRCodeDetector multi", lambda: decode_with_qrcode_detector_multi(ctx.image))
+    else:
+        detector = ("OpenCV QRCodeDetector", lambda: decode_with_qrcode_detector(ctx.image))
+    methods = [
+        ("pyzbar + PIL", lambda: decode_with_pyzbar(ctx.pil, symbols)),
+        ("pyzbar + OpenCV", lambda: decode_with_pyzbar(ctx.image, symbols)),
+        detector,
+        ("grayscale", lambda: decode_with_pyzbar(ctx.gray, symbols)),
+        ("binary threshold", lambda: decode_with_pyzbar(ctx.binary, symbols)),
+    ]
+    if 'QRCODE' not in symbols:
+        methods = [m for m in methods if m is not detector]
+    return methods
+
+@traced()
+def decode_qrcode(image_path, workers=DEFAULT_WORKERS, cache=None, output_file=OUTPUT_FILE,
+                  symbols=PROFILES['qrcode'], localize=True, deadline=None, quiet=False,
+                  all_symbols=False, prefilter=PREFILTER_THRESHOLD):
     """
     Decode QR code from image
     
     Args:
         image_path: Path to the image file
+        workers: Threads used for the preprocessing cascade (1 = sequential)
+        cache: ResultCache to consult first (default: the shared cache,
+            False disables caching)
+        output_file: File the decoded data is written to (None = do not write)
+        symbols: Symbologies zbar scans for (see decode_common.symbologies)
+        localize: Decode candidate regions of large images before the full frame
+        deadline: Latency budget in ms (or a Deadline); methods that would
+            overrun it are skipped
+        quiet: Skip the per-symbol console report
+        all_symbols: Return every QR code on the page, merged across
+            variants and regions, instead of the first method's result
+        prefilter: Code-likelihood threshold below which the cascade is
+            shortened or skipped (see decode_common.prefilter; 0 disables)
     
     Returns:
-        List of decoded data or None
+        List of DecodeResult or None
     """
     
+    start = time.perf_counter()
+    deadline = deadline_of(deadline)
+    
     if not os.path.exists(image_path):
         print(f"❌ Error: Image file '{image_path}' not found!")
         return None
@@ -30,72 +112,56 @@ def decode_qrcode(image_path):
     print(f"Image: {image_path}\n")
     
     try:
-        # Method 1: Try with pyzbar + PIL
-        print("Method 1: Decoding with pyzbar + PIL...")
-        pil_image = Image.open(image_path)
-        decoded_pil = decode(pil_image)
+        cache = default_cache() if cache is None else cache
+        if cache:
+            config = f"{CACHE_CONFIG}:{','.join(symbols)}{':all' if all_symbols else ''}"
+            cache_key = cache.key_for_file(image_path, config)
+            records = cache.get(cache_key)
+            if records:
+                print("✅ Found in result cache!\n")
+                return process_results([record_symbol(r) for r in records], image_path, output_file,
+                                       method="cache", timings=timings_since(start), quiet=quiet)
         
-        if decoded_pil:
-            print("✅ Successfully decoded with pyzbar + PIL!\n")
-            return process_results(decoded_pil, image_path)
+        ctx = ImageContext(image_path)
+        if ctx.image is None:
+            print(f"❌ Error: Could not load image '{image_path}'")
+            return None
         
-        # Method 2: Try with pyzbar + OpenCV
-        print("Method 2: Decoding with pyzbar + OpenCV...")
-        cv_image = cv2.imread(image_path)
-        decoded_cv = decode(cv_image)
+        action = screen(ctx, prefilter)
+        if action == "skip":
+            return None
         
-        if decoded_cv:
-            print("✅ Successfully decoded with pyzbar + OpenCV!\n")
-            return process_results(decoded_cv, image_path)
-        
-        # Method 3: Try with OpenCV QRCodeDetector
-        print("Method 3: Decoding with OpenCV QRCodeDetector...")
-        qrDecoder = cv2.QRCodeDetector()
-        data, vertices_array, _ = qrDecoder.detectAndDecode(cv_image)
-        
-        if data:
-            print("✅ Successfully decoded with OpenCV QRCodeDetector!\n")
-            print("=" * 80)
-            print("✅ Found 1 QR code")
-            print("=" * 80)
-            print(f"\nQR Code #1")
-            print(f"  Type: QRCODE")
-            print(f"  Data: {data}")
-            print(f"  Data Length: {len(data)} characters")
-            
-            if vertices_array is not None:
-                print(f"  Vertices: {vertices_array}")
-            
-            print("-" * 80)
+        if all_symbols and action == "decode":
+            print("Decoding every QR code on the page...")
+            # The multi detector reads the full frame; a region crop holds
+            # one code, which the single detector reads more reliably
+            result = find_all(ctx, lambda c: build_methods(c, symbols, multi=True),
+                              lambda c: build_methods(c, symbols), deadline=deadline)
+            method_name = "find all" if result else None
+        else:
+            # Large photos: try candidate crops before the full frame
+            if action == "shorten":
+                methods = shorten(build_methods(ctx, symbols))
+            elif localize:
+                methods = localized_methods(ctx, lambda c: build_methods(c, symbols))
+            else:
+                methods = build_methods(ctx, symbols)
+            for i, (name, _) in enumerate(methods, 1):
+                print(f"Method {i}: Decoding with {name}...")
             
-            # Save to file
-            output_file = "decoded_qrcode.txt"
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(f"QR Code:\n")
-                f.write(f"{data}\n")
-            
-            print(f"\n💾 Decoded data saved to: {output_file}")
-            print("=" * 80)
-            
-            return [('QRCODE', data)]
-        
-        # Method 4: Try with grayscale
-        print("Method 4: Decoding with grayscale conversion...")
-        gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-        decoded_gray = decode(gray)
-        
-        if decoded_gray:
-            print("✅ Successfully decoded with grayscale!\n")
-            return process_results(decoded_gray, image_path)
+            method_name, result = run_cascade(methods, workers=workers, deadline=deadline,
+                                              costs=estimated_costs(ctx))
         
-        # Method 5: Try with preprocessing
-        print("Method 5: Decoding with image preprocessing...")
-        _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
-        decoded_binary = decode(binary)
+        if isinstance(result, GaveUp):
+            print(f"⏱️ Time budget exhausted: {result}")
+            return None
         
-        if decoded_binary:
-            print("✅ Successfully decoded with binary threshold!\n")
-            return process_results(decoded_binary, image_path)
+        if method_name:
+            print(f"✅ Successfully decoded with {method_name}!\n")
+            if cache:
+                cache.put(cache_key, [symbol_record(obj) for obj in result])
+            return process_results(result, image_path, output_file, method=method_name,
+                                   timings=timings_since(start), quiet=quiet)
         
         print("❌ No QR code found with any method!")
         print("\nPossible reasons:")
@@ -110,32 +176,33 @@ def decode_qrcode(image_path):
         traceback.print_exc()
         return None
 
-def process_results(decoded_objects, image_path):
-    """Process and display decoded results"""
+def process_results(decoded_objects, image_path, output_file=OUTPUT_FILE, method=None,
+                    timings=None, quiet=False):
+    """Process and display decoded results (returns a list of DecodeResult)"""
+    
+    results = [DecodeResult.from_symbol(obj, method, timings, image_path) for obj in decoded_objects]
+    
+    # Save to file
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for i, result in enumerate(results, 1):
+                f.write(f"QR Code #{i}\n")
+                f.write(f"Type: {result.symbology}\n")
+                f.write(f"Data: {result.text}\n")
+                f.write("\n")
+    
+    if quiet:
+        return results
     
     print("=" * 80)
-    print(f"✅ Found {len(decoded_objects)} QR code(s)")
+    print(f"✅ Found {len(results)} QR code(s)")
     print("=" * 80)
     
-    decoded_data_list = []
-    
-    for i, obj in enumerate(decoded_objects, 1):
-        # Decode data
-        try:
-            qr_data = obj.data.decode('utf-8')
-        except UnicodeDecodeError:
-            try:
-                qr_data = obj.data.decode('latin-1')
-            except:
-                qr_data = str(obj.data)
-        
-        qr_type = obj.type
-        decoded_data_list.append((qr_type, qr_data))
-        
+    for i, (obj, result) in enumerate(zip(decoded_objects, results), 1):
         # Display information
         print(f"\nQR Code #{i}")
-        print(f"  Type: {qr_type}")
-        print(f"  Data: {qr_data}")
+        print(f"  Type: {result.symbology}")
+        print(f"  Data: {result.text}")
         print(f"  Raw Bytes: {obj.data}")
         
         # Position information
@@ -154,29 +221,52 @@ def process_results(decoded_objects, image_path):
         
         print("-" * 80)
     
-    # Save to file
-    output_file = "decoded_qrcode.txt"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for i, (qr_type, data) in enumerate(decoded_data_list, 1):
-            f.write(f"QR Code #{i}\n")
-            f.write(f"Type: {qr_type}\n")
-            f.write(f"Data: {data}\n")
-            f.write("\n")
-    
-    print(f"\n💾 Decoded data saved to: {output_file}")
+    if output_file:
+        print(f"\n💾 Decoded data saved to: {output_file}")
     print("=" * 80)
     
-    return decoded_data_list
+    return results
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python decode_qrcode.py <image_path>")
-        print("\nExample:")
-        print("  python decode_qrcode.py qrcode.png")
-        sys.exit(1)
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="QR code decoder",
+        epilog="Example: python decode_qrcode.py qrcode.png",
+    )
+    parser.add_argument("image_path", help="Path to the image file")
+    parser.add_argument("--symbols", type=parse_symbols, default=PROFILES['qrcode'],
+                        help="Comma-separated zbar symbologies or profile names (default: qrcode)")
+    parser.add_argument("--budget-ms", type=float,
+                        help="Latency budget per image; slower methods are skipped")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Print backend import timings on exit")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Write a Chrome trace of every stage to FILE and print stage timings")
+    parser.add_argument("--format", choices=FORMATS, default="text",
+                        help="jsonl/csv: one record per symbol on stdout, no report or text file")
+    parser.add_argument("--all", action="store_true",
+                        help="Decode every QR code on the page, not just the first method's result")
+    parser.add_argument("--prefilter-threshold", type=float, default=PREFILTER_THRESHOLD,
+                        help="Skip or shorten the cascade on images scoring below this "
+                             "code likelihood (0 disables)")
+    args = parser.parse_args()
+    
+    if args.startup_report:
+        report_at_exit()
+    if args.trace:
+        trace_to(args.trace)
+    
+    if args.format != "text":
+        with silenced():
+            results = decode_qrcode(args.image_path, symbols=args.symbols, deadline=args.budget_ms,
+                                    output_file=None, quiet=True, all_symbols=args.all,
+                                    prefilter=args.prefilter_threshold)
+        write_results(results, args.format)
+        sys.exit(0 if results else 1)
     
-    image_path = sys.argv[1]
-    results = decode_qrcode(image_path)
+    results = decode_qrcode(args.image_path, symbols=args.symbols, deadline=args.budget_ms,
+                            all_symbols=args.all, prefilter=args.prefilter_threshold)
     
     if results:
         print("\n✅ DECODING SUCCESSFUL!")
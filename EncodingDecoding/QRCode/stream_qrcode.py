@@ -0,0 +1,106 @@
+"""
+QR Code Stream Decoder
+Decodes QR codes from a camera, a video file or a network stream
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from decode_common.stream import StreamDecoder, frame_decoder, DEFAULT_WORKERS, DEFAULT_QUEUE_SIZE
+from decode_common.tracking import SymbolTracker
+
+def stream_qrcodes(source, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                   budget_ms=None, realtime=False, track=False, report_every=5.0):
+    """
+    Decode QR codes from a video source until it ends (or Ctrl+C)
+
+    Args:
+        source: Camera index, video file or stream URL
+        workers: Decoder threads
+        queue_size: Frames buffered before the oldest is dropped
+        budget_ms: Optional latency budget per frame
+        realtime: Read video files at their own frame rate
+        track: Follow decoded codes with optical flow and only decode new
+            or lost ones (runs a single decoder thread)
+        report_every: Seconds between throughput reports
+
+    Returns:
+        Stream statistics (see StreamDecoder.stats)
+    """
+
+    print("=" * 80)
+    print("QR CODE STREAM DECODER")
+    print("=" * 80)
+    print(f"Source: {source}\n")
+
+    decode_frame = frame_decoder('QRCODE', budget_ms=budget_ms)
+    tracker = None
+    if track:
+        # Tracking needs the frames in order
+        tracker = SymbolTracker(decode_frame)
+        decode_frame, workers = tracker.update, 1
+
+    stream = StreamDecoder(source, decode_frame,
+                           workers=workers, queue_size=queue_size, realtime=realtime)
+    seen = set()
+    next_report = report_every
+    try:
+        with stream:
+            for result in stream.results():
+                for obj in result.symbols:
+                    data = obj.data.decode('utf-8', errors='replace')
+                    if data not in seen:
+                        seen.add(data)
+                        print(f"✅ Frame {result.index}: {data} "
+                              f"({result.latency_ms:.0f} ms after capture)")
+
+                stats = stream.stats()
+                if stats['elapsed_s'] >= next_report:
+                    next_report += report_every
+                    print(f"📈 {stats['fps']} fps, latency {stats['latency_ms_mean']} ms "
+                          f"(p95 {stats['latency_ms_p95']} ms), {stats['frames_dropped']} dropped")
+    except KeyboardInterrupt:
+        stream.close()
+
+    stats = stream.stats()
+    print("\n" + "=" * 80)
+    print(f"Frames read: {stats['frames_read']}, decoded: {stats['frames_decoded']}, "
+          f"dropped: {stats['frames_dropped']}")
+    print(f"Throughput: {stats['fps']} fps")
+    print(f"Latency: mean {stats['latency_ms_mean']} ms, p95 {stats['latency_ms_p95']} ms")
+    if tracker is not None:
+        tracked = tracker.stats()
+        print(f"Decodes: {tracked['decodes']} for {tracked['frames']} frames "
+              f"({tracked['decodes_per_frame']} per frame)")
+    print(f"Distinct QR codes: {len(seen)}")
+    print("=" * 80)
+    return stats
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="QR code stream decoder",
+        epilog="Examples: python stream_qrcode.py 0 | python stream_qrcode.py clip.mp4 --realtime",
+    )
+    parser.add_argument("source", nargs="?", default="0",
+                        help="Camera index, video file or stream URL (default: camera 0)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Decoder threads")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Frames buffered before the oldest is dropped")
+    parser.add_argument("--budget-ms", type=float,
+                        help="Latency budget per frame")
+    parser.add_argument("--realtime", action="store_true",
+                        help="Read video files at their frame rate instead of as fast as possible")
+    parser.add_argument("--track", action="store_true",
+                        help="Follow decoded codes between frames instead of decoding every frame")
+    args = parser.parse_args()
+
+    try:
+        stream_qrcodes(args.source, workers=args.workers, queue_size=args.queue_size,
+                       budget_ms=args.budget_ms, realtime=args.realtime, track=args.track)
+    except IOError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
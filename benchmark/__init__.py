@@ -0,0 +1,6 @@
+"""
+Decoder benchmarks over a synthetic, reproducible corpus
+
+    python -m benchmark generate --out corpus --seed 7
+    python -m benchmark run --corpus corpus --json results.json
+"""
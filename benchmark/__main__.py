@@ -0,0 +1,89 @@
+"""
+Benchmark command line
+
+    python -m benchmark generate --out corpus [--seed N] [--symbologies QRCODE,PDF417]
+                                 [--severities 0,0.3,0.6,1] [--degradations blur,jpeg]
+    python -m benchmark run --corpus corpus [--decoders qrcode,pdf417] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmark.corpus import (DEFAULT_SEED, GENERATORS, MODULE_SIZES, PAYLOAD_LENGTHS,
+                              SAMPLES, SEVERITIES, generate_corpus)
+from benchmark.degrade import DEGRADATIONS
+
+
+def _names(text):
+    return [item.strip() for item in text.split(",") if item.strip()]
+
+
+def _ints(text):
+    return tuple(int(item) for item in _names(text))
+
+
+def _floats(text):
+    return tuple(float(item) for item in _names(text))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmark",
+                                     description="Decoder benchmarks on a synthetic corpus")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Write a seeded corpus and its manifest")
+    generate.add_argument("--out", default="corpus", help="Output directory")
+    generate.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    generate.add_argument("--symbologies", type=lambda t: [n.upper() for n in _names(t)],
+                          help=f"Comma-separated subset of {','.join(GENERATORS)}")
+    generate.add_argument("--module-sizes", type=_ints, default=MODULE_SIZES,
+                          help="Pixels per module, comma-separated")
+    generate.add_argument("--payload-lengths", type=_ints, default=PAYLOAD_LENGTHS,
+                          help="Payload lengths in characters, comma-separated")
+    generate.add_argument("--samples", type=int, default=SAMPLES,
+                          help="Images per symbology/size/length combination")
+    generate.add_argument("--severities", type=_floats, default=SEVERITIES,
+                          help="Degradation severities from 0 (clean) to 1, comma-separated")
+    generate.add_argument("--degradations", type=_names,
+                          help=f"Comma-separated subset of {','.join(DEGRADATIONS)} (default: all)")
+
+    run = commands.add_parser("run", help="Benchmark the decoders on a corpus")
+    run.add_argument("--corpus", default="corpus", help="Directory written by 'generate'")
+    run.add_argument("--decoders", type=_names,
+                     help="Comma-separated entry points (default: every one in the corpus)")
+    run.add_argument("--no-methods", action="store_true",
+                     help="Skip timing the individual cascade methods")
+    run.add_argument("--json", help="Also write the report to this JSON file")
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        unknown = [n for n in args.symbologies or [] if n not in GENERATORS]
+        if unknown:
+            parser.error(f"Unknown symbology: {', '.join(unknown)}")
+        unknown = [n for n in args.degradations or [] if n not in DEGRADATIONS]
+        if unknown:
+            parser.error(f"Unknown degradation: {', '.join(unknown)}")
+        manifest = generate_corpus(args.out, seed=args.seed, symbologies=args.symbologies,
+                                   module_sizes=args.module_sizes,
+                                   payload_lengths=args.payload_lengths, samples=args.samples,
+                                   severities=args.severities, degradations=args.degradations)
+        print(f"✅ {len(manifest['images'])} images written to {args.out}")
+        return
+
+    # Imported here so 'generate' does not load the decoders
+    from benchmark.runner import print_report, run_benchmark
+
+    report = run_benchmark(args.corpus, decoders=args.decoders, methods=not args.no_methods)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Synthetic Benchmark Corpus
+Generates a reproducible set of images across symbologies, module sizes
+and payload lengths (optionally degraded at several severities, see
+benchmark.degrade), plus a manifest.json recording what each image
+contains. The same seed always produces the same payloads and pixels.
+
+    python -m benchmark generate --out corpus --seed 7
+    python -m benchmark generate --out corpus --severities 0,0.3,0.6,1
+"""
+
+import json
+import os
+import random
+import shutil
+import string
+import subprocess
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from benchmark.degrade import degrade
+
+# Pixels per module (bar/cell width)
+MODULE_SIZES = (2, 4, 8)
+
+# Payload lengths in characters (fixed-length symbologies ignore these)
+PAYLOAD_LENGTHS = (8, 32, 128)
+
+# Images per (symbology, module size, payload length)
+SAMPLES = 2
+
+DEFAULT_SEED = 1234
+
+# Degradation severities each symbol is saved at (0 = the clean image)
+SEVERITIES = (0.0,)
+
+# Quiet zone around every symbol, in modules
+QUIET_ZONE = 4
+
+# Height of 1D barcodes, in modules
+BAR_HEIGHT = 40
+
+MANIFEST = "manifest.json"
+
+
+class GeneratorUnavailable(Exception):
+    """The library or tool needed to draw a symbology is missing"""
+
+
+def _payload(rng, length, alphabet=string.ascii_letters + string.digits):
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def _render(matrix, module_px, quiet_zone=QUIET_ZONE):
+    """Boolean module matrix (True = dark) -> grayscale PIL image"""
+    modules = np.pad(np.asarray(matrix, dtype=bool), quiet_zone, constant_values=False)
+    pixels = np.where(modules, 0, 255).astype(np.uint8)
+    pixels = np.kron(pixels, np.ones((module_px, module_px), dtype=np.uint8))
+    return Image.fromarray(pixels, mode="L")
+
+
+def _linear(symbology_name):
+    """Generator for a python-barcode symbology drawn from its module string"""
+    def generate(rng, length, module_px):
+        import barcode
+
+        if symbology_name == 'ean13':
+            data = _payload(rng, 12, string.digits)
+        else:
+            data = _payload(rng, min(length, 40))
+        code = barcode.get(symbology_name, data)
+        bars = [c == "1" for c in code.build()[0]]
+        return _render([bars] * BAR_HEIGHT, module_px), code.get_fullcode()
+    return generate
+
+
+def _qrcode(rng, length, module_px):
+    import qrcode
+
+    data = _payload(rng, length)
+    qr = qrcode.QRCode(border=0, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return _render(qr.get_matrix(), module_px), data
+
+
+def _pdf417(rng, length, module_px):
+    import pdf417gen
+
+    data = _payload(rng, length)
+    columns = 3 if length <= 16 else 6 if length <= 64 else 10
+    codes = pdf417gen.encode(data, columns=columns)
+    image = pdf417gen.render_image(codes, scale=module_px, padding=QUIET_ZONE * module_px)
+    return image.convert("L"), data
+
+
+def _datamatrix(rng, length, module_px):
+    try:
+        from pylibdmtx import pylibdmtx
+        data = _payload(rng, min(length, 100))
+        encoded = pylibdmtx.encode(data.encode('utf-8'))
+    except ImportError as e:
+        raise GeneratorUnavailable(f"pylibdmtx: {e}")
+    image = Image.frombytes('RGB', (encoded.width, encoded.height), encoded.pixels).convert("L")
+    # libdmtx draws 5 px per module
+    scale = module_px / 5
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.NEAREST), data
+
+
+def _aztec(rng, length, module_px):
+    if shutil.which("zint") is None:
+        raise GeneratorUnavailable("zint is not installed")
+    data = _payload(rng, length)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "aztec.png")
+        # Barcode 92 is Aztec in zint; --scale is in half-modules
+        subprocess.run(["zint", "--barcode=92", f"--data={data}", f"--output={path}",
+                        f"--scale={module_px / 2:g}"], check=True, capture_output=True)
+        return Image.open(path).convert("L"), data
+
+
+# symbology: (generator, decoder entry point)
+GENERATORS = {
+    'QRCODE': (_qrcode, 'qrcode'),
+    'CODE128': (_linear('code128'), 'barcode'),
+    'EAN13': (_linear('ean13'), 'barcode'),
+    'PDF417': (_pdf417, 'pdf417'),
+    'DATAMATRIX': (_datamatrix, 'datamatrix'),
+    'AZTEC': (_aztec, 'aztec'),
+}
+
+FIXED_LENGTH = {'EAN13'}
+
+
+def generate_corpus(out_dir, seed=DEFAULT_SEED, symbologies=None, module_sizes=MODULE_SIZES,
+                    payload_lengths=PAYLOAD_LENGTHS, samples=SAMPLES, severities=SEVERITIES,
+                    degradations=None):
+    """
+    Write the corpus images and manifest.json to `out_dir`
+
+    Args:
+        symbologies: Names from GENERATORS (default: all of them); ones
+            whose generator is unavailable are skipped with a warning
+        severities: Save every symbol at each of these degradation
+            severities (0 = clean)
+        degradations: Names from benchmark.degrade.DEGRADATIONS (default: all)
+
+    Returns:
+        The manifest dict
+    """
+    symbologies = symbologies or list(GENERATORS)
+    os.makedirs(out_dir, exist_ok=True)
+    images = []
+    skipped = {}
+
+    for symbology in symbologies:
+        generate, decoder = GENERATORS[symbology]
+        lengths = payload_lengths[:1] if symbology in FIXED_LENGTH else payload_lengths
+        try:
+            for module_px in module_sizes:
+                for length in lengths:
+                    for sample in range(samples):
+                        # One stream per image, so subsets stay reproducible
+                        rng = random.Random(f"{seed}:{symbology}:{module_px}:{length}:{sample}")
+                        image, payload = generate(rng, length, module_px)
+                        stem = f"{symbology.lower()}_{module_px}px_{length}c_{sample}"
+                        for severity in severities:
+                            pixels = degrade(image, severity, seed=rng.getrandbits(32),
+                                             kinds=degradations)
+                            name = f"{stem}.png" if not severity else f"{stem}_s{severity:g}.png"
+                            Image.fromarray(pixels).save(os.path.join(out_dir, name))
+                            images.append({
+                                'path': name,
+                                'symbology': symbology,
+                                'decoder': decoder,
+                                'payload': payload,
+                                'module_px': module_px,
+                                'payload_length': len(payload),
+                                'severity': severity,
+                                'width': pixels.shape[1],
+                                'height': pixels.shape[0],
+                            })
+        except GeneratorUnavailable as e:
+            skipped[symbology] = str(e)
+            print(f"⚠️ Skipping {symbology}: {e}")
+
+    manifest = {'seed': seed, 'severities': list(severities),
+                'degradations': degradations, 'images': images, 'skipped': skipped}
+    with open(os.path.join(out_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(corpus_dir):
+    with open(os.path.join(corpus_dir, MANIFEST), 'r', encoding='utf-8') as f:
+        return json.load(f)
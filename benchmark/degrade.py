@@ -0,0 +1,186 @@
+"""
+Image Degradation Simulator
+Turns clean generated symbols into camera-like inputs so the benchmark
+exercises the expensive tails of the cascades, not just their first
+method. Every step is a vectorized NumPy/OpenCV operation driven by a
+seeded generator and a severity in [0, 1] (0 = untouched).
+
+    degraded = degrade(image, severity=0.5, seed=7)
+    degraded = degrade(image, 0.8, seed=7, kinds=('blur', 'jpeg'))
+
+    python -m benchmark.degrade clean.png noisy.png --severity 0.6 --seed 3
+"""
+
+import argparse
+
+import cv2
+import numpy as np
+
+# Background value used where warps expose pixels outside the image
+BORDER = 255
+
+
+def _border(image):
+    """BORDER in every channel of `image` (a scalar would only fill blue)"""
+    return (BORDER,) * (image.shape[2] if image.ndim == 3 else 1)
+
+
+def blur(image, severity, rng):
+    """Gaussian defocus, or a motion streak in a random direction"""
+    if rng.random() < 0.5:
+        sigma = 0.3 + severity * 3.0
+        return cv2.GaussianBlur(image, (0, 0), sigma)
+    length = max(1, int(round(1 + severity * 12)))
+    kernel = np.zeros((length, length), np.float32)
+    kernel[length // 2, :] = 1.0 / length
+    center = (length / 2 - 0.5, length / 2 - 0.5)
+    rotation = cv2.getRotationMatrix2D(center, rng.uniform(0, 180), 1.0)
+    kernel = cv2.warpAffine(kernel, rotation, (length, length))
+    return cv2.filter2D(image, -1, kernel / max(kernel.sum(), 1e-6))
+
+
+def noise(image, severity, rng):
+    """Additive Gaussian sensor noise"""
+    sigma = severity * 40.0
+    noisy = image.astype(np.float32) + rng.normal(0.0, sigma, image.shape).astype(np.float32)
+    return np.clip(noisy, 0, 255).astype(np.uint8)
+
+
+def jpeg(image, severity, rng):
+    """Re-encode as JPEG at a quality that falls with severity"""
+    quality = int(round(95 - severity * 85))
+    ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        return image
+    return cv2.imdecode(buffer, cv2.IMREAD_UNCHANGED)
+
+
+def perspective(image, severity, rng):
+    """Move each corner inwards by up to 15% of the image size"""
+    h, w = image.shape[:2]
+    src = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    jitter = rng.uniform(0, severity * 0.15, (4, 2)) * np.float32([w, h])
+    inward = np.float32([[1, 1], [-1, 1], [-1, -1], [1, -1]])
+    dst = (src + jitter * inward).astype(np.float32)
+    matrix = cv2.getPerspectiveTransform(src, dst)
+    return cv2.warpPerspective(image, matrix, (w, h), flags=cv2.INTER_LINEAR,
+                               borderMode=cv2.BORDER_CONSTANT, borderValue=_border(image))
+
+
+def rotation(image, severity, rng):
+    """Rotate by up to 45 degrees either way, growing the canvas to fit"""
+    h, w = image.shape[:2]
+    angle = rng.uniform(-45, 45) * severity
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    new_w, new_h = int(h * sin + w * cos), int(h * cos + w * sin)
+    matrix[0, 2] += new_w / 2 - w / 2
+    matrix[1, 2] += new_h / 2 - h / 2
+    return cv2.warpAffine(image, matrix, (new_w, new_h), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=_border(image))
+
+
+def lighting(image, severity, rng):
+    """Darken one side of the image with a linear falloff"""
+    h, w = image.shape[:2]
+    angle = rng.uniform(0, 2 * np.pi)
+    ys, xs = np.mgrid[0:h, 0:w].astype(np.float32)
+    ramp = xs / max(w - 1, 1) * np.cos(angle) + ys / max(h - 1, 1) * np.sin(angle)
+    ramp = (ramp - ramp.min()) / max(float(ramp.max() - ramp.min()), 1e-6)
+    gain = 1.0 - severity * 0.7 * ramp
+    if image.ndim == 3:
+        gain = gain[..., None]
+    return np.clip(image.astype(np.float32) * gain, 0, 255).astype(np.uint8)
+
+
+def glare(image, severity, rng):
+    """Add a bright specular blob that washes out part of the symbol"""
+    h, w = image.shape[:2]
+    cx, cy = rng.uniform(0.2, 0.8) * w, rng.uniform(0.2, 0.8) * h
+    radius = max(1.0, rng.uniform(0.1, 0.3) * min(h, w))
+    ys, xs = np.mgrid[0:h, 0:w].astype(np.float32)
+    blob = np.exp(-((xs - cx) ** 2 + (ys - cy) ** 2) / (2 * radius ** 2)) * severity * 220
+    if image.ndim == 3:
+        blob = blob[..., None]
+    return np.clip(image.astype(np.float32) + blob, 0, 255).astype(np.uint8)
+
+
+def low_resolution(image, severity, rng):
+    """Downscale by up to 4x, as from a distant or cheap camera"""
+    factor = 1.0 / (1.0 + severity * 3.0)
+    h, w = image.shape[:2]
+    size = (max(8, int(w * factor)), max(8, int(h * factor)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def inversion(image, severity, rng):
+    """Light-on-dark print, with probability `severity`"""
+    return 255 - image if rng.random() < severity else image
+
+
+# Applied in this order, which roughly follows a camera pipeline: scene
+# geometry and lighting, optics, sensor, then compression
+DEGRADATIONS = {
+    'rotation': rotation,
+    'perspective': perspective,
+    'lighting': lighting,
+    'glare': glare,
+    'blur': blur,
+    'low_resolution': low_resolution,
+    'noise': noise,
+    'jpeg': jpeg,
+    'inversion': inversion,
+}
+
+
+def degrade(image, severity, seed=0, kinds=None):
+    """
+    Apply the degradations in `kinds` at `severity`
+
+    Args:
+        image: uint8 grayscale or BGR numpy array (or a PIL image)
+        severity: 0 (clean) to 1 (hardest)
+        seed: Seed for every random choice, so results are reproducible
+        kinds: Names from DEGRADATIONS (default: all); applied in the
+            DEGRADATIONS order
+
+    Returns:
+        Degraded uint8 numpy array
+    """
+    image = np.ascontiguousarray(np.asarray(image, dtype=np.uint8))
+    if severity <= 0:
+        return image
+    severity = min(float(severity), 1.0)
+    kinds = list(DEGRADATIONS) if kinds is None else kinds
+    unknown = [k for k in kinds if k not in DEGRADATIONS]
+    if unknown:
+        raise ValueError(f"Unknown degradation: {', '.join(unknown)}")
+
+    rng = np.random.default_rng(seed)
+    for name, step in DEGRADATIONS.items():
+        if name in kinds:
+            # Each step gets its own share of the severity, so the same seed
+            # does not degrade every image the same way
+            image = step(image, severity * rng.uniform(0.5, 1.0), rng)
+    return image
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Degrade an image like a real-world scan")
+    parser.add_argument("input", help="Clean image")
+    parser.add_argument("output", help="Where to write the degraded image")
+    parser.add_argument("--severity", type=float, default=0.5, help="0 (clean) to 1 (hardest)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kinds", type=lambda t: [k.strip() for k in t.split(",") if k.strip()],
+                        help=f"Comma-separated subset of {','.join(DEGRADATIONS)}")
+    args = parser.parse_args()
+
+    image = cv2.imread(args.input, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        parser.error(f"Could not load image '{args.input}'")
+    cv2.imwrite(args.output, degrade(image, args.severity, args.seed, args.kinds))
+    print(f"💾 Degraded image saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
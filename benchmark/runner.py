@@ -0,0 +1,250 @@
+"""
+Benchmark Runner
+Runs every decoder entry point and every cascade method over a corpus and
+reports latency percentiles, success rate, throughput and peak RSS.
+
+Two passes:
+    decoders  Each entry point (decode_qrcode, decode_barcode, ...) on the
+              images of its symbology, end to end, with the result cache off
+    methods   Each routed backend method and each method of the decoders'
+              own cascades, run on its own (no early exit), so every method
+              is timed on every image
+
+For degraded corpora (benchmark.degrade) every row is split by severity,
+which shows how much each cascade stage costs as inputs get worse.
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+from benchmark.corpus import load_manifest
+from decode_common.backends import route
+from decode_common.entrypoints import load_module, run_decoder
+from decode_common.image_context import ImageContext
+
+PERCENTILES = (50, 90, 99)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples):
+    """
+    Aggregate (latency_ms, success, error) samples
+
+    Returns:
+        Dict with runs, success_rate, errors, mean/p50/p90/p99 latency and
+        images_per_sec (sequential)
+    """
+    latencies = sorted(ms for ms, _, _ in samples)
+    total_ms = sum(latencies)
+    summary = {
+        'runs': len(samples),
+        'success_rate': round(sum(ok for _, ok, _ in samples) / len(samples), 3) if samples else 0.0,
+        'errors': sum(1 for _, _, error in samples if error),
+        'mean_ms': round(total_ms / len(latencies), 2) if latencies else None,
+    }
+    for pct in PERCENTILES:
+        value = percentile(latencies, pct)
+        summary[f'p{pct}_ms'] = round(value, 2) if value is not None else None
+    summary['images_per_sec'] = round(len(latencies) / (total_ms / 1000), 1) if total_ms else None
+    return summary
+
+
+def _payloads(result):
+    """Decoded payload strings from any of the result shapes the repo uses"""
+    if not isinstance(result, (list, tuple)):
+        return set()
+    payloads = set()
+    for item in result:
+        if isinstance(item, dict):
+            data = item.get('data')
+        elif isinstance(item, tuple) and len(item) == 2 and isinstance(item[1], str):
+            data = item[1]
+        else:
+            data = getattr(item, 'data', item)
+        if isinstance(data, bytes):
+            data = data.decode('utf-8', errors='replace')
+        if isinstance(data, str):
+            payloads.add(data.strip())
+    return payloads
+
+
+def _severity_label(entry, by_severity):
+    return f" @ s{entry.get('severity', 0):g}" if by_severity else ""
+
+
+@contextlib.contextmanager
+def _quiet():
+    """The decoders report progress (and tracebacks); keep them out of the report"""
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+def bench_decoders(corpus_dir, images, decoders=None, by_severity=False):
+    """Time each entry point end to end; returns {'decoder/SYMBOLOGY': summary}"""
+    groups = {}
+    for entry in images:
+        if decoders and entry['decoder'] not in decoders:
+            continue
+        key = (entry['decoder'], entry['symbology'], entry.get('severity', 0))
+        groups.setdefault(key, []).append(entry)
+
+    results = {}
+    for (decoder, symbology, _), entries in sorted(groups.items()):
+        label = f"{decoder}/{symbology}{_severity_label(entries[0], by_severity)}"
+        print(f"⏱️ {label} on {len(entries)} image(s)...", file=sys.stderr)
+        try:
+            load_module(decoder)
+        except Exception as e:
+            results[label] = {'runs': 0, 'error': f"Could not load decoder: {e}"}
+            continue
+
+        # Warm-up: the first call pays for lazy imports and backend probes
+        with _quiet(), contextlib.suppress(Exception):
+            run_decoder(decoder, os.path.join(corpus_dir, entries[0]['path']), cache=False)
+
+        samples = []
+        for entry in entries:
+            path = os.path.join(corpus_dir, entry['path'])
+            error = None
+            start = time.perf_counter()
+            try:
+                with _quiet():
+                    decoded = run_decoder(decoder, path, cache=False)
+            except Exception as e:
+                decoded, error = [], str(e)
+            elapsed = (time.perf_counter() - start) * 1000
+            samples.append((elapsed, entry['payload'] in _payloads(decoded), error))
+
+        summary = summarize(samples)
+        summary['peak_rss_mb'] = peak_rss_mb()
+        results[label] = summary
+    return results
+
+
+def _cascade_methods(ctx, decoder, symbology):
+    """(name, method) pairs: routed backends plus the decoder's own cascade"""
+    methods = [(f"route: {name}", method) for name, method in route(ctx, symbology)]
+    try:
+        module = load_module(decoder)
+    except Exception:
+        return methods
+    build_methods = getattr(module, 'build_methods', None)
+    if build_methods is not None:
+        methods += [(f"{decoder}: {name}", method) for name, method in build_methods(ctx)]
+    return methods
+
+
+def bench_methods(corpus_dir, images, decoders=None, by_severity=False):
+    """Time every cascade method on every image; returns {'method [SYMBOLOGY]': summary}"""
+    samples = {}
+    print(f"⏱️ Cascade methods on {len(images)} image(s)...", file=sys.stderr)
+    for entry in images:
+        if decoders and entry['decoder'] not in decoders:
+            continue
+        ctx = ImageContext(os.path.join(corpus_dir, entry['path']))
+        if ctx.image is None:
+            continue
+        for name, method in _cascade_methods(ctx, entry['decoder'], entry['symbology']):
+            error = None
+            start = time.perf_counter()
+            try:
+                with _quiet():
+                    success, result = method()
+            except Exception as e:
+                success, result, error = False, None, str(e)
+            elapsed = (time.perf_counter() - start) * 1000
+            ok = bool(success) and entry['payload'] in _payloads(result)
+            label = f"{name} [{entry['symbology']}]{_severity_label(entry, by_severity)}"
+            samples.setdefault(label, []).append((elapsed, ok, error))
+    return {name: summarize(runs) for name, runs in sorted(samples.items())}
+
+
+def run_benchmark(corpus_dir, decoders=None, methods=True):
+    """
+    Benchmark the decoders (and optionally every cascade method) on a corpus
+
+    Args:
+        corpus_dir: Directory written by generate_corpus
+        decoders: Entry point names to include (default: all in the corpus)
+        methods: Also time each cascade method on its own
+
+    Returns:
+        JSON-friendly report
+    """
+    manifest = load_manifest(corpus_dir)
+    images = manifest['images']
+    by_severity = any(entry.get('severity') for entry in images)
+    start = time.perf_counter()
+    report = {
+        'corpus': os.path.abspath(corpus_dir),
+        'seed': manifest.get('seed'),
+        'images': len(images),
+        'python': sys.version.split()[0],
+        'severities': manifest.get('severities', [0.0]),
+        'decoders': bench_decoders(corpus_dir, images, decoders, by_severity),
+    }
+    if methods:
+        report['methods'] = bench_methods(corpus_dir, images, decoders, by_severity)
+    report['elapsed_s'] = round(time.perf_counter() - start, 2)
+    report['peak_rss_mb'] = peak_rss_mb()
+    return report
+
+
+def format_table(rows, title):
+    """Fixed-width table of {name: summary} rows"""
+    columns = [('runs', 5), ('success_rate', 8), ('p50_ms', 9), ('p90_ms', 9),
+               ('p99_ms', 9), ('images_per_sec', 9), ('errors', 6)]
+    headers = ['runs', 'success', 'p50 ms', 'p90 ms', 'p99 ms', 'img/s', 'errors']
+    width = max([len(title)] + [len(name) for name in rows]) + 2
+    lines = [title.ljust(width) + "".join(h.rjust(w + 1) for h, (_, w) in zip(headers, columns))]
+    lines.append("-" * len(lines[0]))
+    for name, summary in rows.items():
+        if 'error' in summary:
+            lines.append(name.ljust(width) + f" {summary['error']}")
+            continue
+        cells = []
+        for key, w in columns:
+            value = summary.get(key)
+            if value is None:
+                text = "-"
+            elif key == 'success_rate':
+                text = f"{value:.0%}"
+            else:
+                text = f"{value:g}"
+            cells.append(text.rjust(w + 1))
+        lines.append(name.ljust(width) + "".join(cells))
+    return "\n".join(lines)
+
+
+def print_report(report, file=None):
+    file = file or sys.stdout
+    print("=" * 80, file=file)
+    print(f"BENCHMARK: {report['images']} images (seed {report['seed']}), "
+          f"{report['elapsed_s']} s, peak RSS {report['peak_rss_mb']} MB", file=file)
+    print("=" * 80, file=file)
+    print(format_table(report['decoders'], "decoder/symbology"), file=file)
+    if report.get('methods'):
+        print("", file=file)
+        print(format_table(report['methods'], "method [symbology]"), file=file)
+    print("=" * 80, file=file)
@@ -0,0 +1,154 @@
+import com.google.zxing.BinaryBitmap;
+import com.google.zxing.DecodeHintType;
+import com.google.zxing.MultiFormatReader;
+import com.google.zxing.NotFoundException;
+import com.google.zxing.Result;
+import com.google.zxing.ResultPoint;
+import com.google.zxing.client.j2se.BufferedImageLuminanceSource;
+import com.google.zxing.common.HybridBinarizer;
+import com.google.zxing.multi.GenericMultipleBarcodeReader;
+
+import javax.imageio.ImageIO;
+import java.awt.image.BufferedImage;
+import java.io.BufferedInputStream;
+import java.io.ByteArrayInputStream;
+import java.io.DataInputStream;
+import java.io.EOFException;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.PrintStream;
+import java.util.EnumMap;
+import java.util.Map;
+
+/**
+ * Long-lived ZXing decoder used by decode_common/zxing_worker.py.
+ *
+ * Protocol (stdin/stdout):
+ *   request  = 4-byte big-endian length + encoded image bytes (PNG, JPEG, ...)
+ *              a length of 0 is a health-check ping
+ *   response = one UTF-8 JSON line
+ *              {"ok":true,"results":[{"format":..,"text":..,"points":[[x,y],..]}]}
+ *              {"ok":true,"pong":true}
+ *              {"ok":false,"error":".."}
+ * A {"ok":true,"ready":true} line is written once at startup.
+ */
+public final class ZXingWorker {
+
+    public static void main(String[] args) throws IOException {
+        DataInputStream in = new DataInputStream(new BufferedInputStream(System.in));
+        PrintStream out = new PrintStream(new FileOutputStream(FileDescriptor.out), false, "UTF-8");
+
+        Map<DecodeHintType, Object> hints = new EnumMap<>(DecodeHintType.class);
+        hints.put(DecodeHintType.TRY_HARDER, Boolean.TRUE);
+        MultiFormatReader reader = new MultiFormatReader();
+        reader.setHints(hints);
+        GenericMultipleBarcodeReader multiReader = new GenericMultipleBarcodeReader(reader);
+
+        out.println("{\"ok\":true,\"ready\":true}");
+        out.flush();
+
+        while (true) {
+            int length;
+            try {
+                length = in.readInt();
+            } catch (EOFException e) {
+                return;
+            }
+            if (length == 0) {
+                out.println("{\"ok\":true,\"pong\":true}");
+            } else {
+                byte[] data = new byte[length];
+                in.readFully(data);
+                out.println(decode(multiReader, hints, data));
+            }
+            out.flush();
+        }
+    }
+
+    private static String decode(GenericMultipleBarcodeReader reader,
+                                 Map<DecodeHintType, Object> hints, byte[] data) {
+        try {
+            BufferedImage image = ImageIO.read(new ByteArrayInputStream(data));
+            if (image == null) {
+                return error("Unsupported image format");
+            }
+            BinaryBitmap bitmap = new BinaryBitmap(
+                    new HybridBinarizer(new BufferedImageLuminanceSource(image)));
+
+            Result[] results;
+            try {
+                results = reader.decodeMultiple(bitmap, hints);
+            } catch (NotFoundException e) {
+                results = new Result[0];
+            }
+
+            StringBuilder json = new StringBuilder("{\"ok\":true,\"results\":[");
+            for (int i = 0; i < results.length; i++) {
+                Result result = results[i];
+                if (i > 0) {
+                    json.append(',');
+                }
+                json.append("{\"format\":").append(quote(result.getBarcodeFormat().toString()));
+                json.append(",\"text\":").append(quote(result.getText()));
+                json.append(",\"points\":[");
+                ResultPoint[] points = result.getResultPoints();
+                if (points != null) {
+                    boolean first = true;
+                    for (ResultPoint point : points) {
+                        if (point == null) {
+                            continue;
+                        }
+                        if (!first) {
+                            json.append(',');
+                        }
+                        json.append('[').append(point.getX()).append(',').append(point.getY()).append(']');
+                        first = false;
+                    }
+                }
+                json.append("]}");
+            }
+            return json.append("]}").toString();
+        } catch (Exception e) {
+            return error(e.toString());
+        }
+    }
+
+    private static String error(String message) {
+        return "{\"ok\":false,\"error\":" + quote(message) + "}";
+    }
+
+    private static String quote(String value) {
+        if (value == null) {
+            return "null";
+        }
+        StringBuilder sb = new StringBuilder("\"");
+        for (int i = 0; i < value.length(); i++) {
+            char c = value.charAt(i);
+            switch (c) {
+                case '"':
+                    sb.append("\\\"");
+                    break;
+                case '\\':
+                    sb.append("\\\\");
+                    break;
+                case '\n':
+                    sb.append("\\n");
+                    break;
+                case '\r':
+                    sb.append("\\r");
+                    break;
+                case '\t':
+                    sb.append("\\t");
+                    break;
+                default:
+                    if (c < 0x20) {
+                        sb.append(String.format("\\u%04x", (int) c));
+                    } else {
+                        sb.append(c);
+                    }
+            }
+        }
+        return sb.append('"').toString();
+    }
+}
@@ -0,0 +1,3 @@
+"""
+Shared decoding helpers used by the symbology-specific decoder scripts
+"""
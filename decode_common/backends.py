@@ -0,0 +1,290 @@
+"""
+Decoding Backends
+Registry of the decoding libraries the scripts use and the symbologies each
+one can actually return. The router builds a cascade only from backends
+that can read the requested symbology, so e.g. an Aztec scan no longer
+spends six pyzbar passes on a format zbar does not implement.
+
+    methods = route(ImageContext("label.png"), 'AZTEC')
+    name, symbols = run_cascade(methods)
+"""
+
+import os
+import shutil
+import threading
+from functools import partial
+
+from decode_common.lazy import lazy, load
+from decode_common.result_cache import Symbol, polygon_rect
+from decode_common.symbologies import PROFILES, zbar_decode
+
+cv2 = lazy("cv2")
+np = lazy("numpy")
+pylibdmtx = lazy("pylibdmtx.pylibdmtx")
+pyztec = lazy("pyztec.aztec")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Directory with the ZXing JARs used for the local JVM worker
+ZXING_JAR_DIR = os.path.join(REPO_ROOT, "pdf417")
+
+# Everything zbar implements (it has no Aztec, MaxiCode or Data Matrix reader)
+ZBAR_SYMBOLOGIES = frozenset(name for names in PROFILES.values() for name in names)
+
+ZXING_SYMBOLOGIES = frozenset({
+    'AZTEC', 'MAXICODE', 'DATAMATRIX', 'PDF417', 'QRCODE',
+    'EAN13', 'EAN8', 'UPCA', 'UPCE', 'I25', 'CODABAR', 'CODE39', 'CODE93', 'CODE128',
+    'DATABAR', 'DATABAR_EXP',
+})
+
+# ZXing BarcodeFormat -> zbar-style symbology name
+ZXING_FORMATS = {
+    'AZTEC': 'AZTEC', 'MAXICODE': 'MAXICODE', 'DATA_MATRIX': 'DATAMATRIX',
+    'PDF_417': 'PDF417', 'QR_CODE': 'QRCODE', 'EAN_13': 'EAN13', 'EAN_8': 'EAN8',
+    'UPC_A': 'UPCA', 'UPC_E': 'UPCE', 'ITF': 'I25', 'CODABAR': 'CODABAR',
+    'CODE_39': 'CODE39', 'CODE_93': 'CODE93', 'CODE_128': 'CODE128',
+    'RSS_14': 'DATABAR', 'RSS_EXPANDED': 'DATABAR_EXP',
+}
+
+# Compact Aztec symbols have 1-4 layers
+AZTEC_COMPACT_LAYERS = (1, 2, 3, 4)
+
+
+def make_symbol(text, symbology, polygon=None):
+    """pyzbar-shaped Symbol for a backend that only returns text"""
+    polygon = [] if polygon is None else [(int(p[0]), int(p[1])) for p in polygon]
+    return Symbol(
+        data=text.encode('utf-8'),
+        type=symbology,
+        rect=polygon_rect(polygon),
+        polygon=polygon,
+        quality=None,
+        orientation=None,
+    )
+
+
+class Backend:
+    """
+    One decoding library and the symbologies it can read
+
+    Args:
+        name: Short name used in cascade method names
+        symbologies: Symbology names (zbar spelling) the library can return
+        decode: Callable (image, symbologies, timeout=None) -> list of
+            pyzbar-shaped symbols; `timeout` is in seconds and only honoured
+            by backends that can stop early
+        probe: Zero-argument callable that raises if the library is unusable
+        variants: ImageContext variants worth trying with this backend, in order
+    """
+
+    def __init__(self, name, symbologies, decode, probe, variants=('image',)):
+        self.name = name
+        self.symbologies = frozenset(symbologies)
+        self.decode = decode
+        self.probe = probe
+        self.variants = tuple(variants)
+        self._available = None
+        self._lock = threading.Lock()
+
+    def supports(self, symbology):
+        return symbology in self.symbologies
+
+    def available(self):
+        """True if the library imports (checked once per process)"""
+        with self._lock:
+            if self._available is None:
+                try:
+                    self.probe()
+                    self._available = True
+                except Exception:
+                    self._available = False
+            return self._available
+
+    def __repr__(self):
+        return f"Backend({self.name!r})"
+
+
+# pyzbar
+
+def _probe_pyzbar():
+    load("pyzbar.pyzbar")  # raises without libzbar
+
+
+def _decode_pyzbar(image, symbologies, timeout=None):
+    return zbar_decode(image, tuple(symbologies))
+
+
+# OpenCV QRCodeDetector
+
+def _probe_opencv_qr():
+    cv2.QRCodeDetector()
+
+
+def _decode_opencv_qr(image, symbologies, timeout=None):
+    data, points, _ = cv2.QRCodeDetector().detectAndDecode(image)
+    if not data:
+        return []
+    polygon = points.reshape(-1, 2) if points is not None else None
+    return [make_symbol(data, 'QRCODE', polygon)]
+
+
+# pylibdmtx
+
+def _probe_pylibdmtx():
+    load("pylibdmtx.pylibdmtx")
+
+
+def _decode_pylibdmtx(image, symbologies, timeout=None):
+    symbols = []
+    # libdmtx takes its timeout in milliseconds
+    found = (pylibdmtx.decode(image) if timeout is None
+             else pylibdmtx.decode(image, timeout=max(1, int(timeout * 1000))))
+    for obj in found:
+        rect = obj.rect
+        polygon = [(rect.left, rect.top), (rect.left + rect.width, rect.top),
+                   (rect.left + rect.width, rect.top + rect.height),
+                   (rect.left, rect.top + rect.height)]
+        symbols.append(Symbol(data=obj.data, type='DATAMATRIX', rect=polygon_rect(polygon),
+                              polygon=polygon, quality=None, orientation=None))
+    return symbols
+
+
+# pyztec
+
+def _probe_pyztec():
+    load("pyztec.aztec")
+
+
+def _decode_pyztec(image, symbologies, timeout=None):
+    """
+    pyztec samples a grid of exactly `layers * 4 + 11` modules from an image
+    that is nothing but the symbol, so crop to the dark pixels and try each
+    compact layer count
+    """
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    _, dark = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    points = cv2.findNonZero(dark)
+    if points is None:
+        return []
+    x, y, w, h = cv2.boundingRect(points)
+    crop = dark[y:y + h, x:x + w]
+    polygon = [(x, y), (x + w, y), (x + w, y + h), (x, y + h)]
+
+    for layers in AZTEC_COMPACT_LAYERS:
+        dimension = layers * 4 + 11
+        modules = cv2.resize(crop, (dimension, dimension), interpolation=cv2.INTER_AREA)
+        try:
+            text = "".join(pyztec.AztecBarcodeCompact(np.asarray(modules > 127)).decode())
+        except Exception:
+            continue
+        if text:
+            return [make_symbol(text, 'AZTEC', polygon)]
+    return []
+
+
+# ZXing (long-lived JVM worker)
+
+_zxing_pool = None
+
+# Seconds a ZXing worker gets per image when no deadline is set
+ZXING_TIMEOUT = 10
+
+
+def use_zxing_pool(pool):
+    """Send ZXing backend work to `pool` (e.g. a warm container pool)"""
+    global _zxing_pool
+    _zxing_pool = pool
+    # Availability depends on the pool; probe again on next use
+    BACKENDS["ZXing"]._available = None
+
+
+def _get_zxing_pool():
+    if _zxing_pool is not None:
+        return _zxing_pool
+    from decode_common.zxing_worker import shared_pool
+    return shared_pool(ZXING_JAR_DIR)
+
+
+def _probe_zxing():
+    if _zxing_pool is not None:
+        return
+    from decode_common.zxing_worker import BUILD_DIR, jar_classpath
+
+    jar_classpath(ZXING_JAR_DIR)
+    if shutil.which("java") is None:
+        raise RuntimeError("java not found")
+    built = os.path.exists(os.path.join(BUILD_DIR, "ZXingWorker.class"))
+    if not built and shutil.which("javac") is None:
+        raise RuntimeError("javac not found; the ZXing worker cannot be built")
+
+
+def _decode_zxing(image, symbologies, timeout=None):
+    ok, encoded = cv2.imencode(".png", image)
+    if not ok:
+        return []
+    symbols = []
+    timeout = ZXING_TIMEOUT if timeout is None else min(timeout, ZXING_TIMEOUT)
+    for barcode in _get_zxing_pool().decode_bytes(encoded.tobytes(), timeout=timeout):
+        symbology = ZXING_FORMATS.get(barcode['format'], barcode['format'])
+        if symbology in symbologies:
+            symbols.append(make_symbol(barcode['text'], symbology, barcode['points']))
+    return symbols
+
+
+BACKENDS = {}
+
+
+def register(backend):
+    """Add (or replace) a backend in the registry"""
+    BACKENDS[backend.name] = backend
+    return backend
+
+
+register(Backend("pyzbar", ZBAR_SYMBOLOGIES, _decode_pyzbar, _probe_pyzbar,
+                 variants=('image', 'gray', 'binary', 'otsu', 'adaptive')))
+register(Backend("OpenCV QRCodeDetector", {'QRCODE'}, _decode_opencv_qr, _probe_opencv_qr))
+register(Backend("pylibdmtx", {'DATAMATRIX'}, _decode_pylibdmtx, _probe_pylibdmtx,
+                 variants=('image', 'gray')))
+register(Backend("pyztec", {'AZTEC'}, _decode_pyztec, _probe_pyztec,
+                 variants=('gray',)))
+# ZXing binarizes on its own; one pass over the original image is enough
+register(Backend("ZXing", ZXING_SYMBOLOGIES, _decode_zxing, _probe_zxing))
+
+
+def capable_backends(symbology, names=None):
+    """
+    Registered backends that can read `symbology` and are installed
+
+    Args:
+        symbology: Symbology name, e.g. 'AZTEC'
+        names: Optional backend names to choose from, in preferred order
+    """
+    candidates = [BACKENDS[name] for name in names] if names else list(BACKENDS.values())
+    return [b for b in candidates if b.supports(symbology) and b.available()]
+
+
+def _attempt(backend, ctx, variant, symbology, deadline=None):
+    timeout = deadline.remaining_s() if deadline is not None else None
+    symbols = backend.decode(getattr(ctx, variant), (symbology,), timeout=timeout)
+    return bool(symbols), symbols
+
+
+def route(ctx, symbology, names=None, deadline=None):
+    """
+    Cascade methods for run_cascade(), built only from capable backends
+
+    Args:
+        ctx: ImageContext to decode
+        symbology: Symbology name, e.g. 'AZTEC'
+        names: Optional backend names to choose from, in preferred order
+        deadline: Optional Deadline; backends that can stop early get the
+            time left as their timeout
+
+    Returns:
+        List of (method_name, callable) pairs; empty if nothing installed
+        can read `symbology`
+    """
+    return [(f"{backend.name} + {variant}",
+             partial(_attempt, backend, ctx, variant, symbology, deadline))
+            for backend in capable_backends(symbology, names)
+            for variant in backend.variants]
@@ -0,0 +1,181 @@
+"""
+Batch Decoder
+Decodes many images across a process pool and streams one JSON line per
+image
+
+Usage:
+    python -m decode_common.batch qrcode scans/ "archive/*.jpg" one.png
+    python -m decode_common.batch barcode @filelist.txt --workers 8 -o results.jsonl
+
+Inputs may be directories (searched recursively), glob patterns, single
+files, or @files listing one path per line ("@-" reads the list from stdin).
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from decode_common import prefilter
+from decode_common.entrypoints import ENTRY_POINTS, load_module, run_decoder
+from decode_common.lazy import load_declared
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp'}
+
+_decoder_name = None
+_decoder_kwargs = {}
+_warm_up_error = None
+
+
+def iter_images(inputs):
+    """Expand directories, globs and @lists into image paths"""
+    for item in inputs:
+        if item.startswith("@"):
+            source = sys.stdin if item == "@-" else open(item[1:], 'r', encoding='utf-8')
+            with contextlib.ExitStack() as stack:
+                if source is not sys.stdin:
+                    stack.enter_context(source)
+                for line in source:
+                    line = line.strip()
+                    if line:
+                        yield line
+        elif os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                for name in sorted(files):
+                    if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                        yield os.path.join(root, name)
+        elif any(c in item for c in "*?["):
+            yield from sorted(glob.glob(item, recursive=True))
+        else:
+            yield item
+
+
+def _warm_up(decoder_name, decoder_kwargs=None):
+    """Pool initializer: import the decoder and its backends once per worker"""
+    global _decoder_name, _decoder_kwargs, _warm_up_error
+    _decoder_name = decoder_name
+    _decoder_kwargs = decoder_kwargs or {}
+    try:
+        import cv2
+        # Parallelism comes from the process pool; keep OpenCV single-threaded
+        cv2.setNumThreads(1)
+    except ImportError:
+        pass
+    try:
+        load_module(decoder_name)
+    except Exception as e:
+        # An initializer that raises makes the pool respawn workers forever;
+        # report the problem per image instead
+        _warm_up_error = f"Could not load decoder '{decoder_name}': {e}"
+        return
+    # The decoder imports its backends lazily; pay for them here, not on
+    # each worker's first image
+    load_declared()
+
+
+def decode_one(image_path):
+    """Decode one image in a worker; returns a JSON-friendly record"""
+    start = time.perf_counter()
+    record = {'path': image_path, 'decoder': _decoder_name}
+    if _warm_up_error:
+        record.update(ok=False, error=_warm_up_error, elapsed_ms=0.0)
+        return record
+    prefilter.last_check = None
+    try:
+        # The decoders report progress on stdout; keep it out of the stream
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = run_decoder(_decoder_name, image_path, **_decoder_kwargs)
+        record['ok'] = bool(results)
+        record['results'] = results
+    except Exception as e:
+        record['ok'] = False
+        record['error'] = str(e)
+    if prefilter.last_check is not None:
+        likelihood, action = prefilter.last_check
+        record['prefilter'] = {'action': action, 'score': likelihood.score}
+    record['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return record
+
+
+def run_batch(decoder_name, paths, out, workers=None, chunksize=4, budget_ms=None,
+              prefilter_threshold=None, decisions=None):
+    """
+    Decode `paths` on a process pool, writing JSON lines to `out`
+
+    Args:
+        budget_ms: Optional latency budget per image, passed to the decoder
+        prefilter_threshold: Optional code-likelihood threshold passed to
+            the decoder (default: the decoder's own)
+        decisions: Optional dict counting the pre-filter decisions
+            ("decode", "shorten", "skip") of the images
+
+    Returns:
+        (images, decoded, seconds)
+    """
+    images = decoded = 0
+    start = time.perf_counter()
+    decoder_kwargs = {'deadline': budget_ms} if budget_ms else {}
+    if prefilter_threshold is not None:
+        decoder_kwargs['prefilter'] = prefilter_threshold
+    with Pool(processes=workers, initializer=_warm_up,
+              initargs=(decoder_name, decoder_kwargs)) as pool:
+        for record in pool.imap_unordered(decode_one, paths, chunksize=chunksize):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            images += 1
+            decoded += record['ok']
+            if decisions is not None and 'prefilter' in record:
+                action = record['prefilter']['action']
+                decisions[action] = decisions.get(action, 0) + 1
+    return images, decoded, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode many images in parallel (JSONL output)")
+    parser.add_argument("decoder", choices=sorted(ENTRY_POINTS))
+    parser.add_argument("inputs", nargs="+",
+                        help="Directories, glob patterns, image files or @file lists")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("-o", "--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("--chunksize", type=int, default=4,
+                        help="Images handed to a worker at a time")
+    parser.add_argument("--budget-ms", type=float,
+                        help="Latency budget per image; slower methods are skipped")
+    parser.add_argument("--prefilter-threshold", type=float,
+                        help="Code likelihood below which images are skipped or get a "
+                             "shortened cascade (0 disables; default: the decoder's)")
+    args = parser.parse_args()
+
+    paths = list(iter_images(args.inputs))
+    if not paths:
+        print("Error: no images found", file=sys.stderr)
+        sys.exit(1)
+
+    decisions = {}
+    with contextlib.ExitStack() as stack:
+        out = (stack.enter_context(open(args.output, 'w', encoding='utf-8'))
+               if args.output else sys.stdout)
+        images, decoded, seconds = run_batch(args.decoder, paths, out,
+                                             workers=args.workers, chunksize=args.chunksize,
+                                             budget_ms=args.budget_ms,
+                                             prefilter_threshold=args.prefilter_threshold,
+                                             decisions=decisions)
+
+    rate = images / seconds if seconds else 0.0
+    print(f"{images} images, {decoded} decoded, {seconds:.2f} s "
+          f"({rate:.1f} images/s, {args.workers} workers)", file=sys.stderr)
+    checked = sum(decisions.values())
+    if checked:
+        skipped, shortened = decisions.get('skip', 0), decisions.get('shorten', 0)
+        print(f"Pre-filter: {skipped} skipped ({skipped / checked:.0%}), "
+              f"{shortened} shortened ({shortened / checked:.0%}) of {checked} images", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Cascade Executor
+Runs a list of decoding methods on a thread pool and returns the first
+success in preferred (list) order. Methods are submitted one at a time as
+workers free up, so nothing starts once the deadline has passed or an
+earlier method has succeeded.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from decode_common.deadline import gave_up
+from decode_common.trace import span
+
+DEFAULT_WORKERS = 4
+
+# Rough cost of the known-expensive methods, matched against the lower-case
+# method name: (name fragment, fixed ms, ms per megapixel). Other methods
+# count as cheap and are tried while any time is left
+COST_ESTIMATES = (
+    ("docker", 3000, 0),
+    ("zxing", 150, 100),
+    ("denois", 0, 1500),
+    ("deskew", 0, 60),
+)
+
+
+def _attempt(method):
+    """Run one method, turning exceptions into a failed attempt"""
+    try:
+        return method()
+    except Exception as e:
+        return False, str(e)
+
+
+def _call(method, name):
+    """_attempt() inside a trace span named after the method"""
+    with span(name, "method"):
+        return _attempt(method)
+
+
+def _recorded(name, method, stats):
+    """Wrap `method` so its outcome and cost are recorded in `stats`"""
+    def run():
+        start = time.perf_counter()
+        success, result = _attempt(method)
+        stats.record(name, success, (time.perf_counter() - start) * 1000)
+        return success, result
+    return run
+
+
+def estimated_costs(ctx):
+    """
+    Default `costs` for run_cascade(): name -> estimated milliseconds on
+    the image of `ctx` (None for cheap methods), from COST_ESTIMATES
+    """
+    shape = ctx.shape if ctx is not None else None
+    megapixels = shape[0] * shape[1] / 1e6 if shape is not None else 0.0
+
+    def cost(name):
+        name = name.lower()
+        for fragment, fixed_ms, ms_per_megapixel in COST_ESTIMATES:
+            if fragment in name:
+                return fixed_ms + ms_per_megapixel * megapixels
+        return None
+    return cost
+
+
+def run_cascade(methods, workers=DEFAULT_WORKERS, stats=None, deadline=None, costs=None):
+    """
+    Try decoding methods and return the preferred successful one
+
+    Args:
+        methods: List of (name, callable) pairs; each callable takes no
+            arguments and returns (success, result)
+        workers: Thread pool size; 1 runs the methods strictly in order
+        stats: Optional MethodStats used to reorder/prune the methods and
+            to record each attempt (the caller saves it)
+        deadline: Optional Deadline; methods expected to overrun it are
+            skipped and no new method starts once it has expired
+        costs: Optional callable name -> expected milliseconds (None if
+            unknown) used with `deadline`, e.g. estimated_costs(ctx); the
+            stats' mean cost takes precedence where it is known
+
+    Returns:
+        (name, result) of the earliest-listed method that succeeded,
+        (None, GaveUp) if the deadline ran out first, or (None, None) if
+        every method failed
+    """
+    if stats is not None:
+        estimate = costs
+        costs = lambda name: stats.mean_ms(name) or (estimate(name) if estimate else None)
+        methods = [(name, _recorded(name, method, stats))
+                   for name, method in stats.order(methods)]
+    elif deadline is not None and costs is not None:
+        # Cheapest first; methods of unknown cost keep their place up front
+        methods = sorted(methods, key=lambda m: costs(m[0]) or 0.0)
+
+    skipped = []
+    if deadline is not None:
+        fitting = []
+        for name, method in methods:
+            cost = costs(name) if costs is not None else None
+            (fitting if deadline.allows(cost) else skipped).append((name, method))
+        methods = fitting
+        skipped = [name for name, _ in skipped]
+
+    if workers <= 1 or len(methods) <= 1:
+        attempted = []
+        for name, method in methods:
+            if deadline is not None:
+                cost = costs(name) if costs is not None else None
+                if deadline.expired:
+                    return None, gave_up(deadline, name, attempted, skipped)
+                if not deadline.allows(cost):
+                    skipped.append(name)
+                    continue
+            success, result = _call(method, name)
+            attempted.append(name)
+            if success:
+                return name, result
+        if skipped:
+            return None, gave_up(deadline, skipped[0], attempted, skipped)
+        return None, None
+
+    executor = ThreadPoolExecutor(max_workers=min(workers, len(methods)))
+    try:
+        outcomes = [None] * len(methods)
+        running = {}
+        attempted = []
+        # Next method to submit, lowest index that has not failed yet, and
+        # lowest index that succeeded; a success is only returned once
+        # every method listed before it has finished without success
+        submit, head, best = 0, 0, len(methods)
+
+        while True:
+            # Fill free workers in list order, checking the budget before
+            # each start; nothing after a success needs to run
+            while len(running) < workers and submit < best:
+                name, method = methods[submit]
+                if deadline is not None:
+                    if deadline.expired:
+                        break
+                    if not deadline.allows(costs(name) if costs is not None else None):
+                        skipped.append(name)
+                        outcomes[submit] = (False, None)
+                        submit += 1
+                        continue
+                running[executor.submit(_call, method, name)] = submit
+                submit += 1
+
+            while head < submit and outcomes[head] is not None:
+                success, result = outcomes[head]
+                if success:
+                    return methods[head][0], result
+                head += 1
+
+            if not running:
+                break
+            if deadline is not None and deadline.expired:
+                return None, gave_up(deadline, methods[head][0], attempted, skipped)
+
+            timeout = deadline.remaining_s() if deadline is not None else None
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                outcomes[i] = future.result()
+                attempted.append(methods[i][0])
+                if outcomes[i][0]:
+                    best = min(best, i)
+
+        if submit < len(methods):
+            # The deadline passed before the rest could start
+            return None, gave_up(deadline, methods[submit][0], attempted, skipped)
+        if skipped:
+            return None, gave_up(deadline, skipped[0], attempted, skipped)
+        return None, None
+    finally:
+        # Methods still running finish in the background; their results
+        # are ignored
+        executor.shutdown(wait=False)
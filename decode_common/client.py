@@ -0,0 +1,120 @@
+"""
+Decode Client
+Thin front end for the decode daemon (decode_common.daemon). It only uses
+the standard library, so it starts in a few ms; the daemon runs the
+decoder script with the given arguments and the client prints exactly
+what the script would have printed. Without a daemon the script runs
+in-process, as if it had been called directly.
+
+Usage:
+    python -m decode_common.client barcode label.png
+    python -m decode_common.client qrcode photo.jpg --budget-ms 50
+    cat scan.png | python -m decode_common.client datamatrix -
+"""
+
+import json
+import os
+import socket
+import sys
+
+from decode_common.entrypoints import ENTRY_POINTS, REPO_ROOT
+
+# Image argument that means "read the image bytes from stdin"
+STDIN_IMAGE = "-"
+
+
+def default_socket_path():
+    """Socket the daemon listens on ($DECODE_DAEMON_SOCKET overrides it)"""
+    path = os.environ.get("DECODE_DAEMON_SOCKET")
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    return os.path.join(runtime_dir, f"decode-daemon-{uid}.sock")
+
+
+def script_path(decoder_name):
+    return os.path.join(REPO_ROOT, ENTRY_POINTS[decoder_name][0])
+
+
+def send_request(request, body=b"", socket_path=None):
+    """
+    Run one request on the daemon
+
+    Returns:
+        The daemon's reply ({'stdout', 'stderr', 'exit_code'}), or None if
+        no daemon is listening
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(socket_path or default_socket_path())
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+        request = dict(request, size=len(body))
+        sock.sendall(json.dumps(request).encode('utf-8') + b"\n" + body)
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        sock.close()
+    if not chunks:
+        # Daemon worker died mid-request
+        return None
+    return json.loads(b"".join(chunks).decode('utf-8'))
+
+
+def run_in_process(decoder_name, args, body=None):
+    """Run the decoder script here, as if it had been called directly"""
+    import runpy
+    import tempfile
+
+    path = None
+    if body is not None:
+        fd, path = tempfile.mkstemp(prefix="decode_", suffix=".img")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+        args = [path if arg == STDIN_IMAGE else arg for arg in args]
+    sys.argv = [script_path(decoder_name)] + list(args)
+    try:
+        runpy.run_path(sys.argv[0], run_name="__main__")
+        return 0
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        if path:
+            os.unlink(path)
+
+
+def decode(decoder_name, args, socket_path=None):
+    """
+    Run decoder script `decoder_name` with `args`, on the daemon if one is
+    listening; returns the script's exit code
+    """
+    body = sys.stdin.buffer.read() if STDIN_IMAGE in args else None
+    request = {'decoder': decoder_name, 'args': list(args), 'cwd': os.getcwd(),
+               'stdin_image': body is not None}
+    reply = send_request(request, body or b"", socket_path)
+    if reply is None:
+        return run_in_process(decoder_name, args, body)
+    sys.stdout.write(reply['stdout'])
+    sys.stderr.write(reply['stderr'])
+    return reply['exit_code']
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ENTRY_POINTS:
+        print(f"Usage: python -m decode_common.client <{'|'.join(ENTRY_POINTS)}> "
+              f"<image|-> [decoder options]", file=sys.stderr)
+        sys.exit(2)
+    sys.exit(decode(sys.argv[1], sys.argv[2:]))
+
+
+if __name__ == "__main__":
+    main()
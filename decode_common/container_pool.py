@@ -0,0 +1,104 @@
+"""
+Warm Container Pool
+Keeps N long-running ZXing containers (built from AZTech/Dockerfile) and
+sends them images over stdin, instead of `docker run --rm` per image
+
+    docker build -t zxing-decoder EncodingDecoding/AZTech
+    pool = warm_container_pool(jar_dir, size=4)
+    pool.decode_file("label.png")
+"""
+
+import itertools
+import os
+import subprocess
+import sys
+
+from decode_common.zxing_worker import ZXingWorker, ZXingWorkerPool, compile_worker
+
+DEFAULT_IMAGE = "zxing-decoder"
+
+# JAR locations inside the image built from AZTech/Dockerfile
+CONTAINER_CLASSPATH = ":".join([
+    "/usr/local/bin/zxing-javase.jar",
+    "/usr/local/bin/zxing-core.jar",
+    "/worker",
+])
+
+# Recycle containers periodically so leaks inside the JVM cannot build up
+DEFAULT_MAX_JOBS = 500
+DEFAULT_HEALTH_INTERVAL = 30
+
+FAKE_WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_zxing_worker.py")
+
+
+class DockerRunner:
+    """
+    Starts ZXing workers inside long-running Docker containers
+
+    The worker class is compiled on the host (needs the JARs in `jar_dir`
+    and a JDK) and mounted read-only into each container.
+
+    Args:
+        jar_dir: Directory holding the ZXing JARs used to compile the worker
+        image: Docker image built from AZTech/Dockerfile
+    """
+
+    _counter = itertools.count(1)
+
+    def __init__(self, jar_dir, image=DEFAULT_IMAGE):
+        self.jar_dir = jar_dir
+        self.image = image
+        self._build_dir = None
+
+    def start(self):
+        if self._build_dir is None:
+            self._build_dir = compile_worker(self.jar_dir)
+        name = f"zxing-worker-{os.getpid()}-{next(self._counter)}"
+        command = [
+            "docker", "run", "-i", "--rm", "--name", name,
+            "-v", f"{self._build_dir}:/worker:ro",
+            "--entrypoint", "java",
+            self.image,
+            "-cp", CONTAINER_CLASSPATH, "ZXingWorker",
+        ]
+        # Killing the docker client does not stop the container itself
+        cleanup = lambda: subprocess.run(["docker", "rm", "-f", name],
+                                         capture_output=True, timeout=30)
+        return ZXingWorker(command, cleanup=cleanup)
+
+
+class FakeRunner:
+    """
+    Starts fake workers (plain Python, no Java/Docker) with canned answers
+
+    Args:
+        text: Decoded text every image returns
+        symbology: Format reported for every image
+        delay: Seconds each answer takes
+        exit_after: Images after which each worker crashes (None = never)
+    """
+
+    def __init__(self, text="FAKE", symbology="MAXICODE", delay=0.0, exit_after=None):
+        self.command = [sys.executable, FAKE_WORKER,
+                        "--text", text, "--format", symbology, "--delay", str(delay)]
+        if exit_after is not None:
+            self.command += ["--exit-after", str(exit_after)]
+        self.started = 0
+
+    def start(self):
+        self.started += 1
+        return ZXingWorker(self.command)
+
+
+def warm_container_pool(jar_dir, size=2, image=DEFAULT_IMAGE,
+                        max_jobs=DEFAULT_MAX_JOBS, health_interval=DEFAULT_HEALTH_INTERVAL,
+                        runner=None):
+    """
+    Start `size` ZXing containers up front and return the pool
+
+    Pass `runner=FakeRunner()` to exercise the pool without Docker.
+    """
+    pool = ZXingWorkerPool(runner or DockerRunner(jar_dir, image), size=size,
+                           max_jobs=max_jobs, health_interval=health_interval)
+    pool.warm()
+    return pool
@@ -0,0 +1,228 @@
+"""
+Decode Daemon
+Pre-forked Unix-socket server that keeps cv2, PIL, pyzbar and every
+decoder script imported, so a CLI decode costs the decode itself instead
+of the imports. The parent warms everything up, binds the socket and
+forks workers that accept connections directly; a worker that dies is
+replaced.
+
+Each request runs a decoder script's command line (the same arguments the
+script takes) and returns what it printed, so decode_common.client can
+reproduce the script's output exactly.
+
+Usage:
+    python -m decode_common.daemon --workers 4 &
+    python -m decode_common.client barcode label.png
+
+Unix only (needs os.fork and AF_UNIX sockets).
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+
+from decode_common.client import STDIN_IMAGE, default_socket_path, script_path
+from decode_common.entrypoints import ENTRY_POINTS, load_module
+from decode_common import trace
+from decode_common.lazy import flush_report, load
+
+DEFAULT_WORKERS = 2
+
+# Workers are replaced after this many requests, bounding any slow leaks
+MAX_REQUESTS_PER_WORKER = 1000
+
+_code = {}
+
+
+def warm_up():
+    """Import the backends and decoder scripts once, before forking"""
+    try:
+        # Parallelism comes from the worker processes
+        load("cv2").setNumThreads(1)
+    except ImportError:
+        pass
+    for module in ("numpy", "PIL.Image", "pyzbar.pyzbar", "pylibdmtx.pylibdmtx"):
+        try:
+            load(module)
+        except ImportError:
+            pass
+    for name in ENTRY_POINTS:
+        try:
+            load_module(name)
+        except Exception as e:
+            print(f"⚠️ Could not preload decoder '{name}': {e}", file=sys.stderr)
+        path = script_path(name)
+        with open(path, 'r', encoding='utf-8') as f:
+            _code[name] = compile(f.read(), path, 'exec')
+
+
+def run_script(decoder_name, args, cwd):
+    """
+    Run a decoder script's __main__ block with `args`, capturing its output
+
+    Returns:
+        (stdout, stderr, exit code)
+    """
+    out, err = io.StringIO(), io.StringIO()
+    saved_argv, saved_path, saved_cwd = sys.argv, list(sys.path), os.getcwd()
+    exit_code = 0
+    try:
+        os.chdir(cwd)
+        sys.argv = [script_path(decoder_name)] + list(args)
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            try:
+                exec(_code[decoder_name], {'__name__': '__main__',
+                                           '__file__': sys.argv[0]})
+            except SystemExit as e:
+                if isinstance(e.code, int):
+                    exit_code = e.code
+                elif e.code is not None:
+                    print(e.code, file=sys.stderr)
+                    exit_code = 1
+            except Exception:
+                import traceback
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                # --trace and --startup-report print at exit, which a
+                # worker only reaches through os._exit; report now, and
+                # stop tracing so the next request starts untraced
+                trace.flush()
+                flush_report()
+    finally:
+        # The scripts extend sys.path on every run
+        sys.argv, sys.path[:] = saved_argv, saved_path
+        os.chdir(saved_cwd)
+    return out.getvalue(), err.getvalue(), exit_code
+
+
+def handle(conn):
+    """Serve one client connection"""
+    stream = conn.makefile('rb')
+    request = json.loads(stream.readline().decode('utf-8'))
+    body = stream.read(request.get('size', 0))
+    decoder_name = request.get('decoder')
+    args = request.get('args', [])
+
+    if decoder_name not in ENTRY_POINTS:
+        reply = {'stdout': "", 'stderr': f"Unknown decoder '{decoder_name}'\n", 'exit_code': 2}
+    else:
+        path = None
+        if request.get('stdin_image'):
+            fd, path = tempfile.mkstemp(prefix="decode_", suffix=".img")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+            args = [path if arg == STDIN_IMAGE else arg for arg in args]
+        try:
+            stdout, stderr, exit_code = run_script(decoder_name, args,
+                                                   request.get('cwd') or os.getcwd())
+        finally:
+            if path:
+                os.unlink(path)
+        reply = {'stdout': stdout, 'stderr': stderr, 'exit_code': exit_code}
+    conn.sendall(json.dumps(reply, ensure_ascii=False).encode('utf-8'))
+
+
+def worker_loop(listener):
+    """Accept and serve connections until the request quota is used up"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for _ in range(MAX_REQUESTS_PER_WORKER):
+        conn, _ = listener.accept()
+        with conn:
+            try:
+                handle(conn)
+            except Exception as e:
+                print(f"❌ Request failed: {e}", file=sys.stderr)
+    os._exit(0)
+
+
+def spawn(listener):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            worker_loop(listener)
+        finally:
+            os._exit(1)
+    return pid
+
+
+def serve(socket_path=None, workers=DEFAULT_WORKERS):
+    """Warm up, bind `socket_path` and keep `workers` forked workers running"""
+    if not hasattr(os, 'fork') or not hasattr(socket, 'AF_UNIX'):
+        raise OSError("The decode daemon needs os.fork and Unix sockets")
+    socket_path = socket_path or default_socket_path()
+
+    warm_up()
+
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            raise OSError(f"A daemon is already listening on {socket_path}")
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Left over from a daemon that did not shut down cleanly
+            os.unlink(socket_path)
+        finally:
+            probe.close()
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    listener.listen(64)
+
+    children = set()
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    try:
+        children.update(spawn(listener) for _ in range(workers))
+        print(f"Decode daemon listening on {socket_path} ({workers} workers)", file=sys.stderr)
+        while children:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            children.discard(pid)
+            if not stopping:
+                children.add(spawn(listener))
+    finally:
+        listener.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-forked decode daemon (Unix socket)")
+    parser.add_argument("--socket", default=default_socket_path(),
+                        help="Socket path (default: $DECODE_DAEMON_SOCKET or a per-user path)")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Worker processes")
+    args = parser.parse_args()
+
+    try:
+        serve(args.socket, args.workers)
+    except OSError as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Decode Deadlines
+Latency budgets for "anytime" decoding: the cascade skips methods that
+cannot finish in the time left and, when the budget runs out, reports the
+stage it gave up at instead of running to the end.
+
+    deadline = Deadline(150)            # 150 ms per parcel
+    name, result = run_cascade(methods, deadline=deadline)
+    if isinstance(result, GaveUp):
+        print(result)                   # gave up at 'denoised' after 151 ms
+"""
+
+import time
+from collections import namedtuple
+
+
+class Deadline:
+    """
+    A latency budget that starts counting when it is created
+
+    Args:
+        budget_ms: Milliseconds available for the whole decode
+    """
+
+    def __init__(self, budget_ms):
+        self.budget_ms = float(budget_ms)
+        self.start = time.monotonic()
+
+    def elapsed_ms(self):
+        return (time.monotonic() - self.start) * 1000
+
+    def remaining_ms(self):
+        return max(0.0, self.budget_ms - self.elapsed_ms())
+
+    def remaining_s(self):
+        return self.remaining_ms() / 1000
+
+    @property
+    def expired(self):
+        return self.remaining_ms() <= 0
+
+    def allows(self, cost_ms):
+        """True if a step expected to take `cost_ms` (None = unknown) can still run"""
+        if self.expired:
+            return False
+        return cost_ms is None or cost_ms <= self.remaining_ms()
+
+    def timeout(self, default):
+        """`default` seconds, capped by the time left (for subprocess/worker timeouts)"""
+        return min(default, self.remaining_s())
+
+    def __repr__(self):
+        return f"Deadline({self.budget_ms:g} ms, {self.remaining_ms():.0f} ms left)"
+
+
+def deadline_of(value):
+    """None, a Deadline, or a budget in milliseconds -> Deadline or None"""
+    if value is None or isinstance(value, Deadline):
+        return value
+    return Deadline(value)
+
+
+class GaveUp(namedtuple('GaveUp', 'stage attempted skipped elapsed_ms budget_ms')):
+    """
+    Partial result of a decode that ran out of budget
+
+    Fields:
+        stage: Name of the first method that could not run (None if the
+            budget ran out while the last method was still running)
+        attempted: Names of the methods that ran to completion
+        skipped: Names of the methods skipped because they would not fit
+        elapsed_ms: Time spent before giving up
+        budget_ms: The budget that was exceeded
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        stage = f"'{self.stage}'" if self.stage else "the last stage"
+        return (f"gave up at {stage} after {self.elapsed_ms:.0f} ms "
+                f"(budget {self.budget_ms:g} ms, {len(self.attempted)} method(s) tried, "
+                f"{len(self.skipped)} skipped)")
+
+
+def gave_up(deadline, stage, attempted, skipped):
+    return GaveUp(stage, list(attempted), list(skipped),
+                  round(deadline.elapsed_ms(), 1), deadline.budget_ms)
@@ -0,0 +1,88 @@
+"""
+Decoder Entry Points
+Locates the symbology-specific decoder scripts and loads their decode
+functions, so batch/service code can call them without running the CLIs
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+
+from decode_common.result import DecodeResult, cascade_results
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name: (script relative to the repo root, decode function, extra kwargs
+#        for unattended use, default symbology)
+ENTRY_POINTS = {
+    'qrcode': ("EncodingDecoding/QRCode/decode_qrcode.py", "decode_qrcode",
+               {'workers': 1, 'output_file': None, 'quiet': True}, 'QRCODE'),
+    'barcode': ("EncodingDecoding/Barcode/decode_barcode.py", "decode_barcode",
+                {'workers': 1, 'output_file': None, 'quiet': True}, None),
+    'aztec': ("EncodingDecoding/AZTech/decode_aztec.py", "decode_aztec",
+              {'workers': 1, 'output_file': None, 'quiet': True}, 'AZTEC'),
+    'datamatrix': ("EncodingDecoding/DataMatrix/decode_datamatrix.py", "decode_datamatrix",
+                   {'output_file': None, 'quiet': True}, 'DATAMATRIX'),
+    'pdf417': ("pdf417/comprehensive_decoder.py", "decode_pdf417",
+               {'workers': 1}, 'PDF417'),
+}
+
+_modules = {}
+_lock = threading.Lock()
+
+
+def load_module(name):
+    """Import the decoder script behind entry point `name` (once per process)"""
+    if name not in ENTRY_POINTS:
+        raise KeyError(f"Unknown decoder '{name}', expected one of: {', '.join(ENTRY_POINTS)}")
+    with _lock:
+        if name not in _modules:
+            script = os.path.join(REPO_ROOT, ENTRY_POINTS[name][0])
+            spec = importlib.util.spec_from_file_location(f"_decoder_{name}", script)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[spec.name] = module
+            spec.loader.exec_module(module)
+            _modules[name] = module
+        return _modules[name]
+
+
+def load_decoder(name):
+    """Decode function of entry point `name`"""
+    return getattr(load_module(name), ENTRY_POINTS[name][1])
+
+
+def run_decoder(name, image_path, **kwargs):
+    """
+    Call a decoder unattended (no decoded_*.txt, single-threaded cascade)
+    and normalize its return value
+
+    Returns:
+        List of {'type', 'data', 'method', 'polygon'} dicts (empty if
+        nothing was decoded); 'polygon' is a list of [x, y] points
+    """
+    _, func_name, defaults, symbology = ENTRY_POINTS[name]
+    decode = load_decoder(name)
+    return normalize_results(name, decode(image_path, **{**defaults, **kwargs}), symbology)
+
+
+def normalize_results(name, result, symbology=None):
+    if not result:
+        return []
+    if name == 'pdf417':
+        method_name, results = result
+        if not method_name:
+            return []
+        # Record dicts, or raw CommandLineRunner output
+        result = cascade_results(method_name, results, symbology)
+
+    normalized = []
+    for item in result:
+        if isinstance(item, DecodeResult):
+            normalized.append({'type': item.symbology or symbology, 'data': item.text,
+                               'method': item.method, 'polygon': [list(p) for p in item.polygon]})
+        elif isinstance(item, tuple):
+            normalized.append({'type': item[0], 'data': item[1]})
+        else:
+            normalized.append({'type': symbology, 'data': item})
+    return normalized
@@ -0,0 +1,55 @@
+"""
+Fake ZXing Worker
+Speaks the ZXingWorker protocol without Java or Docker and answers every
+image with a canned result; used through container_pool.FakeRunner in tests
+
+Usage: python fake_zxing_worker.py [--text T] [--format F] [--delay S] [--exit-after N]
+"""
+
+import argparse
+import json
+import struct
+import sys
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake ZXing worker")
+    parser.add_argument("--text", default="FAKE")
+    parser.add_argument("--format", default="MAXICODE")
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="Seconds to wait before answering each image")
+    parser.add_argument("--exit-after", type=int,
+                        help="Exit (simulating a crash) after this many images")
+    args = parser.parse_args()
+
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout
+
+    def reply(message):
+        stdout.write(json.dumps(message) + "\n")
+        stdout.flush()
+
+    reply({"ok": True, "ready": True})
+    jobs = 0
+    while True:
+        header = stdin.read(4)
+        if len(header) < 4:
+            return
+        (length,) = struct.unpack(">i", header)
+        if length == 0:
+            reply({"ok": True, "pong": True})
+            continue
+
+        stdin.read(length)
+        if args.exit_after is not None and jobs >= args.exit_after:
+            sys.exit(1)
+        time.sleep(args.delay)
+        jobs += 1
+        reply({"ok": True, "results": [
+            {"format": args.format, "text": args.text, "points": [[0.0, 0.0]]}
+        ]})
+
+
+if __name__ == "__main__":
+    main()
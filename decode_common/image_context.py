@@ -0,0 +1,194 @@
+"""
+Image Context
+Loads an image once and lazily builds the preprocessed variants used by
+the decoding cascades, so every method reads from the same memoized data
+"""
+
+import threading
+
+from decode_common.lazy import lazy
+from decode_common.orientation import deskew_angle, estimate_skew, rotate
+from decode_common.trace import span
+
+cv2 = lazy("cv2")
+np = lazy("numpy")
+Image = lazy("PIL.Image")
+
+
+class ImageContext:
+    """
+    Holds a decoded image and its derived variants
+
+    Args:
+        image_path: Path to the image file (loaded on first access)
+        image: Already decoded BGR image, used instead of reading the file
+        offset: (x, y) of this image's top-left corner in the original
+            image (non-zero for crops)
+        scale: Size of this image relative to the original (not 1 for
+            pyramid levels); original = offset + point / scale
+        loader: Callable producing the image on first access, used instead
+            of reading the file
+    """
+
+    def __init__(self, image_path=None, image=None, offset=(0, 0), scale=1.0, loader=None):
+        self.image_path = image_path
+        self.offset = offset
+        self.scale = scale
+        self._loader = loader
+        self._image = image
+        self._loaded = image is not None
+        self._variants = {}
+        # Variants may be requested from several cascade threads at once;
+        # each one is built under its own lock so it is only computed once
+        self._guard = threading.Lock()
+        self._locks = {}
+
+    @classmethod
+    def of(cls, source):
+        """Return `source` if it is already a context, otherwise wrap the path"""
+        if isinstance(source, cls):
+            return source
+        return cls(image_path=source)
+
+    @property
+    def image(self):
+        """Original BGR image, or None if the file could not be read"""
+        if not self._loaded:
+            with self._lock_for("image"):
+                if not self._loaded:
+                    with span("load image", "io"):
+                        if self._loader is not None:
+                            self._image = self._loader()
+                        else:
+                            self._image = cv2.imread(self.image_path)
+                    self._loaded = True
+        return self._image
+
+    @property
+    def shape(self):
+        return None if self.image is None else self.image.shape
+
+    def crop(self, region):
+        """Context for the (x, y, w, h) `region`, keeping original coordinates in `offset`"""
+        x, y, w, h = region
+        return ImageContext(
+            image=np.ascontiguousarray(self.image[y:y + h, x:x + w]),
+            offset=(self.offset[0] + x / self.scale, self.offset[1] + y / self.scale),
+            scale=self.scale,
+        )
+
+    def scaled(self, factor):
+        """Context for this image resized by `factor`, resized on first use (1.0 returns self)"""
+        if factor == 1.0:
+            return self
+
+        def load():
+            h, w = self.image.shape[:2]
+            size = (max(1, int(round(w * factor))), max(1, int(round(h * factor))))
+            interpolation = cv2.INTER_AREA if factor < 1.0 else cv2.INTER_LINEAR
+            return cv2.resize(self.image, size, interpolation=interpolation)
+
+        return ImageContext(offset=self.offset, scale=self.scale * factor, loader=load)
+
+    def _lock_for(self, name):
+        with self._guard:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def variant(self, name, builder):
+        """Return the memoized variant `name`, building it on first use"""
+        if name not in self._variants:
+            with self._lock_for(name):
+                if name not in self._variants:
+                    with span(name, "preprocess"):
+                        self._variants[name] = builder()
+        return self._variants[name]
+
+    @property
+    def pil(self):
+        """RGB PIL image built from the already decoded pixels"""
+        return self.variant(
+            "pil", lambda: Image.fromarray(cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB))
+        )
+
+    @property
+    def gray(self):
+        return self.variant("gray", lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def binary(self):
+        return self.variant(
+            "binary", lambda: cv2.threshold(self.gray, 127, 255, cv2.THRESH_BINARY)[1]
+        )
+
+    @property
+    def binary_inv(self):
+        return self.variant(
+            "binary_inv", lambda: cv2.threshold(self.gray, 127, 255, cv2.THRESH_BINARY_INV)[1]
+        )
+
+    @property
+    def inverted(self):
+        """Grayscale with light and dark swapped, for light-on-dark symbols"""
+        return self.variant("inverted", lambda: cv2.bitwise_not(self.gray))
+
+    @property
+    def otsu(self):
+        return self.variant(
+            "otsu",
+            lambda: cv2.threshold(self.gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1],
+        )
+
+    @property
+    def adaptive(self):
+        return self.variant(
+            "adaptive",
+            lambda: cv2.adaptiveThreshold(
+                self.gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+            ),
+        )
+
+    @property
+    def equalized(self):
+        return self.variant("equalized", lambda: cv2.equalizeHist(self.gray))
+
+    @property
+    def clahe(self):
+        def build():
+            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+            return clahe.apply(self.gray)
+
+        return self.variant("clahe", build)
+
+    @property
+    def denoised(self):
+        return self.variant(
+            "denoised", lambda: cv2.fastNlMeansDenoisingColored(self.image, None, 10, 10, 7, 21)
+        )
+
+    @property
+    def sharpened(self):
+        def build():
+            kernel = np.array([[-1, -1, -1],
+                               [-1, 9, -1],
+                               [-1, -1, -1]])
+            return cv2.filter2D(self.image, -1, kernel)
+
+        return self.variant("sharpened", build)
+
+    def rotated(self, angle):
+        """Image rotated counter-clockwise by `angle` degrees (exact for right angles)"""
+        return self.variant(f"rotated_{angle}", lambda: rotate(self.image, angle))
+
+    def rotated_gray(self, angle):
+        return self.variant(f"rotated_gray_{angle}", lambda: rotate(self.gray, angle))
+
+    @property
+    def skew(self):
+        """Estimated Skew(angle, confidence) of the content (see decode_common.orientation)"""
+        return self.variant("skew", lambda: estimate_skew(self.gray))
+
+    @property
+    def deskewed(self):
+        """Grayscale straightened by the estimated skew, or None if it is straight enough"""
+        angle = deskew_angle(self.skew)
+        return None if angle is None else self.rotated_gray(angle)
@@ -0,0 +1,156 @@
+"""
+Lazy Backend Imports
+cv2, numpy, PIL and the barcode libraries cost tens to hundreds of ms to
+import, while --help, a cache hit or a missing file never touch them.
+Modules declared here are imported on first attribute access, and every
+import is timed so a script can print where its startup time went.
+
+    cv2 = lazy("cv2")                 # nothing imported yet
+    gray = cv2.cvtColor(...)          # cv2 imported (and timed) here
+
+    python decode_qrcode.py label.png --startup-report
+"""
+
+import importlib
+import sys
+import threading
+import time
+
+_lock = threading.RLock()
+_declared = []
+
+# module name -> import time in ms / error message
+IMPORT_TIMES = {}
+IMPORT_ERRORS = {}
+
+# Reference point for the startup report
+LOADED_AT = time.perf_counter()
+
+# Set by report_at_exit(), cleared once flush_report() has printed
+_report_pending = False
+_report_registered = False
+
+
+def load(name):
+    """
+    Import `name` (once) and record how long it took
+
+    Raises:
+        ImportError: If the module (or a library it wraps) is missing; the
+            error is remembered so later calls fail without retrying
+    """
+    module = sys.modules.get(name)
+    if module is not None and name in IMPORT_TIMES:
+        return module
+    with _lock:
+        if name in IMPORT_ERRORS:
+            raise ImportError(IMPORT_ERRORS[name])
+        if name in IMPORT_TIMES:
+            return sys.modules[name]
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(name)
+        except Exception as e:
+            # pyzbar/pylibdmtx raise ImportError or OSError when the
+            # native library is missing
+            IMPORT_ERRORS[name] = str(e) if isinstance(e, ImportError) else f"{type(e).__name__}: {e}"
+            raise ImportError(IMPORT_ERRORS[name]) from e
+        IMPORT_TIMES[name] = (time.perf_counter() - start) * 1000
+        return module
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access"""
+
+    __slots__ = ('_name', '_module')
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = load(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy(name):
+    """Declare `name` as a lazily imported module"""
+    with _lock:
+        if name not in _declared:
+            _declared.append(name)
+    return LazyModule(name)
+
+
+def load_declared():
+    """
+    Import every module declared so far, skipping missing ones
+
+    Pool initializers call this after loading a decoder script, so its
+    backends are imported once per worker rather than on the first image.
+
+    Returns:
+        Names of the modules that could be imported
+    """
+    with _lock:
+        names = list(_declared)
+    loaded = []
+    for name in names:
+        try:
+            load(name)
+        except ImportError:
+            # Recorded in IMPORT_ERRORS; the decoder reports it per image
+            continue
+        loaded.append(name)
+    return loaded
+
+
+def startup_report(file=None):
+    """Print import timings of the declared modules (to stderr by default)"""
+    file = file or sys.stderr
+    with _lock:
+        names = list(_declared) + [n for n in IMPORT_TIMES if n not in _declared]
+        times = dict(IMPORT_TIMES)
+        errors = dict(IMPORT_ERRORS)
+
+    print("\n" + "=" * 80, file=file)
+    print("STARTUP REPORT", file=file)
+    print("=" * 80, file=file)
+    for name in names:
+        if name in times:
+            status = f"{times[name]:8.1f} ms"
+        elif name in errors:
+            status = f"  failed   ({errors[name]})"
+        elif name in sys.modules:
+            # Pulled in by another backend (numpy by cv2, say)
+            status = "  imported indirectly"
+        else:
+            status = "  not imported"
+        print(f"  {name:<24}{status}", file=file)
+    print(f"\nBackend imports: {sum(times.values()):.1f} ms, "
+          f"{(time.perf_counter() - LOADED_AT) * 1000:.1f} ms since startup", file=file)
+    print("=" * 80, file=file)
+
+
+def report_at_exit():
+    """Print the startup report when the process exits (for --startup-report)"""
+    import atexit
+    global _report_pending, _report_registered
+
+    _report_pending = True
+    if not _report_registered:
+        _report_registered = True
+        atexit.register(flush_report)
+
+
+def flush_report():
+    """Print the report requested by report_at_exit() now (long-lived processes never exit)"""
+    global _report_pending
+    if _report_pending:
+        _report_pending = False
+        startup_report()
@@ -0,0 +1,191 @@
+"""
+Candidate-Region Localization
+Finds the parts of a large image that look like a barcode (dense, strong
+gradients that survive a morphological close) so the preprocessing cascade
+runs on small crops instead of the whole frame. Results decoded from a crop
+are shifted back into original-image coordinates. The full frame is only
+decoded when no candidate is found.
+
+    methods = localized_methods(ctx, build_methods)
+    name, result = run_cascade(methods)
+"""
+
+from collections import namedtuple
+
+from decode_common.lazy import lazy
+from decode_common.method_stats import MethodName
+from decode_common.trace import traced
+
+cv2 = lazy("cv2")
+np = lazy("numpy")
+
+Region = namedtuple('Region', 'x y width height')
+
+# Below this many pixels the full frame is cheap enough to decode directly
+LOCALIZE_MIN_PIXELS = 2_000_000
+
+# Localization itself runs on a copy downscaled to this long side
+WORK_SIZE = 1024
+
+DEFAULT_MAX_REGIONS = 4
+
+# Quiet-zone padding added around each candidate, as a fraction of its size
+MARGIN = 0.15
+
+# Candidates smaller than this fraction of the frame are noise, larger
+# ones are as good as the full frame
+MIN_AREA = 0.0005
+MAX_AREA = 0.6
+
+
+@traced("find regions", "localize")
+def find_regions(gray, max_regions=DEFAULT_MAX_REGIONS, work_size=WORK_SIZE, margin=MARGIN):
+    """
+    Candidate code regions of a grayscale image
+
+    Args:
+        gray: Grayscale image
+        max_regions: Maximum number of regions returned
+        work_size: Long side of the downscaled copy used for the search
+        margin: Padding added around each region, relative to its size
+
+    Returns:
+        List of Region in original-image coordinates, strongest first
+    """
+    height, width = gray.shape[:2]
+    scale = min(1.0, work_size / max(height, width))
+    small = gray if scale == 1.0 else cv2.resize(
+        gray, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+    # Bars and modules give strong gradients in x, y or both
+    gx = cv2.Scharr(small, cv2.CV_32F, 1, 0)
+    gy = cv2.Scharr(small, cv2.CV_32F, 0, 1)
+    gradient = cv2.blur(np.abs(gx) + np.abs(gy), (9, 9))
+    gradient = cv2.normalize(gradient, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    _, mask = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    # Merge modules into solid blobs, then drop thin text strokes
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    mask = cv2.erode(mask, None, iterations=4)
+    mask = cv2.dilate(mask, None, iterations=4)
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    frame_area = small.shape[0] * small.shape[1]
+    scored = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        area = w * h
+        if not MIN_AREA * frame_area <= area <= MAX_AREA * frame_area:
+            continue
+        # Favour large blobs that are mostly edges
+        score = area * float(gradient[y:y + h, x:x + w].mean())
+        scored.append((score, x, y, w, h))
+    scored.sort(reverse=True)
+
+    regions = []
+    for _, x, y, w, h in scored[:max_regions]:
+        pad_x, pad_y = int(w * margin), int(h * margin)
+        x0 = max(0, int((x - pad_x) / scale))
+        y0 = max(0, int((y - pad_y) / scale))
+        x1 = min(width, int((x + w + pad_x) / scale))
+        y1 = min(height, int((y + h + pad_y) / scale))
+        regions.append(Region(x0, y0, x1 - x0, y1 - y0))
+    return regions
+
+
+def _shift_point(point, dx, dy, scale):
+    x, y = int(round(dx + point[0] / scale)), int(round(dy + point[1] / scale))
+    if hasattr(point, '_fields'):
+        return type(point)(x, y)
+    if isinstance(point, tuple):
+        return (x, y)
+    return [x, y]
+
+
+def _shift_points(points, dx, dy, scale):
+    return [_shift_point(p, dx, dy, scale) for p in points]
+
+
+def _shift_rect(rect, dx, dy, scale):
+    left, top = int(round(dx + rect[0] / scale)), int(round(dy + rect[1] / scale))
+    width, height = int(round(rect[2] / scale)), int(round(rect[3] / scale))
+    if hasattr(rect, '_replace'):
+        return rect._replace(left=left, top=top, width=width, height=height)
+    return [left, top, width, height]
+
+
+def shift_result(result, offset, scale=1.0):
+    """
+    Move decoded symbols from crop (or pyramid level) to original-image
+    coordinates: original = offset + point / scale
+
+    Handles lists of pyzbar-style namedtuples and of result dicts with
+    'polygon'/'rect' keys; anything else is returned unchanged.
+    """
+    dx, dy = offset
+    if ((dx, dy) == (0, 0) and scale == 1.0) or not isinstance(result, list):
+        return result
+    shifted = []
+    for item in result:
+        if hasattr(item, '_replace'):
+            changes = {}
+            if getattr(item, 'polygon', None):
+                changes['polygon'] = _shift_points(item.polygon, dx, dy, scale)
+            if getattr(item, 'rect', None) is not None:
+                changes['rect'] = _shift_rect(item.rect, dx, dy, scale)
+            item = item._replace(**changes)
+        elif isinstance(item, dict):
+            item = dict(item)
+            if item.get('polygon'):
+                item['polygon'] = _shift_points(item['polygon'], dx, dy, scale)
+            if item.get('rect') is not None:
+                item['rect'] = _shift_rect(item['rect'], dx, dy, scale)
+        shifted.append(item)
+    return shifted
+
+
+def in_parent(method, ctx, parent):
+    """
+    Wrap a cascade method run on `ctx` (a crop or rescaled copy of
+    `parent`) so its results use `parent`'s coordinates
+    """
+    offset = ((ctx.offset[0] - parent.offset[0]) * parent.scale,
+              (ctx.offset[1] - parent.offset[1]) * parent.scale)
+    scale = ctx.scale / parent.scale
+
+    def run():
+        success, result = method()
+        return success, shift_result(result, offset, scale) if success else result
+    return run
+
+
+def localized_methods(ctx, build_methods, max_regions=DEFAULT_MAX_REGIONS,
+                      min_pixels=LOCALIZE_MIN_PIXELS):
+    """
+    Cascade methods for the candidate crops only (the full frame when the
+    image is small or no candidate is found)
+
+    Args:
+        ctx: ImageContext of the full image
+        build_methods: Callable (ctx) -> list of (name, callable) pairs, the
+            same cascade a decoder would run on the whole image
+        max_regions: Maximum number of candidate crops
+        min_pixels: Images smaller than this skip localization
+
+    Returns:
+        List of (name, callable) pairs for run_cascade(); results from
+        crops are already in original-image coordinates
+    """
+    if ctx.image is None:
+        return build_methods(ctx)
+    height, width = ctx.shape[:2]
+    if height * width < min_pixels:
+        return build_methods(ctx)
+
+    methods = []
+    for i, region in enumerate(find_regions(ctx.gray, max_regions), 1):
+        crop = ctx.crop(region)
+        methods += [(MethodName(f"region {i}: {name}", name), in_parent(method, crop, ctx))
+                    for name, method in build_methods(crop)]
+    return methods or build_methods(ctx)
@@ -0,0 +1,229 @@
+"""
+Method Statistics
+Records per-symbology success rate and cost of every cascade method in a
+small JSON file and uses it to order (and prune) the cascade by expected
+cost-to-success
+
+Operator controls:
+    python -m decode_common.method_stats show  --file stats.json
+    python -m decode_common.method_stats pin   --file stats.json --symbology PDF417
+    python -m decode_common.method_stats unpin --file stats.json --symbology PDF417
+    python -m decode_common.method_stats reset --file stats.json [--symbology PDF417]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+
+# Methods are only pruned after this many attempts without a single success
+MIN_TRIALS = 20
+
+
+class MethodName(str):
+    """
+    Display name of a method run on a derived image (a candidate crop, a
+    pyramid level), e.g. "region 2: Otsu's threshold @ 0.5x"; statistics
+    and pins use `base` ("Otsu's threshold"), which recurs on every image
+    """
+
+    def __new__(cls, label, base):
+        name = super().__new__(cls, label)
+        name.base = base_name(base)
+        return name
+
+
+def base_name(name):
+    """Name the statistics are kept under (see MethodName)"""
+    return getattr(name, 'base', name)
+
+
+def load_stats_file(path):
+    """Return the raw {symbology: profile} mapping stored in `path`"""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # A corrupt stats file must never stop decoding
+        return {}
+
+
+class MethodStats:
+    """
+    Success/cost statistics for the methods of one symbology
+
+    Args:
+        path: JSON file the statistics are stored in (shared by all symbologies)
+        symbology: Profile name, e.g. "PDF417" or "MAXICODE"
+        min_trials: Attempts without success after which a method is pruned
+    """
+
+    def __init__(self, path, symbology, min_trials=MIN_TRIALS):
+        self.path = path
+        self.symbology = symbology
+        self.min_trials = min_trials
+        self._lock = threading.Lock()
+        self._data = load_stats_file(path)
+        self._profile = self._data.setdefault(symbology, {"pinned": None, "methods": {}})
+
+    def save(self):
+        """Write the statistics atomically"""
+        if not self.path:
+            return
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+    @property
+    def pinned(self):
+        return self._profile["pinned"]
+
+    def record(self, name, success, elapsed_ms):
+        """Record one attempt of method `name`"""
+        with self._lock:
+            entry = self._profile["methods"].setdefault(
+                base_name(name), {"attempts": 0, "successes": 0, "total_ms": 0.0}
+            )
+            entry["attempts"] += 1
+            entry["successes"] += int(bool(success))
+            entry["total_ms"] += elapsed_ms
+
+    def mean_ms(self, name):
+        """Mean milliseconds per attempt of `name`, or None if never attempted"""
+        entry = self._profile["methods"].get(base_name(name))
+        if not entry or not entry["attempts"]:
+            return None
+        return entry["total_ms"] / entry["attempts"]
+
+    def expected_cost(self, name):
+        """
+        Expected milliseconds spent per success of `name`
+
+        Uses a Laplace-smoothed success rate so unseen methods sort between
+        proven winners and proven losers instead of at either extreme.
+        Returns None for methods without any recorded attempt.
+        """
+        entry = self._profile["methods"].get(base_name(name))
+        if not entry or not entry["attempts"]:
+            return None
+        mean_ms = entry["total_ms"] / entry["attempts"]
+        success_rate = (entry["successes"] + 1) / (entry["attempts"] + 2)
+        return mean_ms / success_rate
+
+    def is_pruned(self, name):
+        entry = self._profile["methods"].get(base_name(name))
+        return bool(entry) and entry["attempts"] >= self.min_trials and entry["successes"] == 0
+
+    def order(self, methods):
+        """
+        Reorder a list of (name, callable) pairs
+
+        A pinned profile is applied verbatim (methods missing from the pin
+        are dropped; the learned order is used if the pin matches none of
+        them). Otherwise methods without data run first, in their listed
+        order, so each one gets measured at least once; the rest are
+        sorted by expected cost per success. Pruned methods are removed,
+        but never all of them.
+        """
+        if self.pinned:
+            rank = {name: i for i, name in enumerate(self.pinned)}
+            pinned = [m for m in methods if base_name(m[0]) in rank]
+            if pinned:
+                return sorted(pinned, key=lambda m: rank[base_name(m[0])])
+
+        kept = [m for m in methods if not self.is_pruned(m[0])] or list(methods)
+        measured = [m for m in kept if self.expected_cost(m[0]) is not None]
+        unmeasured = [m for m in kept if self.expected_cost(m[0]) is None]
+        measured.sort(key=lambda m: self.expected_cost(m[0]))
+        return unmeasured + measured
+
+    def pin(self, names=None):
+        """
+        Freeze the method order (current learned order if `names` is None)
+
+        Raises:
+            ValueError: There is nothing to pin (no names given and nothing
+                recorded yet)
+        """
+        with self._lock:
+            if names is None:
+                methods = [(name, None) for name in self._profile["methods"]]
+                names = [name for name, _ in self.order(methods)]
+            names = [name for name in names if name]
+            if not names:
+                raise ValueError(f"Nothing to pin for {self.symbology}: no methods recorded yet")
+            self._profile["pinned"] = names
+
+    def unpin(self):
+        with self._lock:
+            self._profile["pinned"] = None
+
+    def reset(self):
+        """Forget everything recorded for this symbology"""
+        with self._lock:
+            self._profile["pinned"] = None
+            self._profile["methods"] = {}
+
+    def summary(self):
+        """Rows of (name, attempts, success rate, mean ms, expected cost) in cascade order"""
+        rows = []
+        methods = [(name, None) for name in self._profile["methods"]]
+        for name, _ in self.order(methods):
+            entry = self._profile["methods"][name]
+            rows.append((
+                name,
+                entry["attempts"],
+                entry["successes"] / entry["attempts"] if entry["attempts"] else 0.0,
+                entry["total_ms"] / entry["attempts"] if entry["attempts"] else 0.0,
+                self.expected_cost(name),
+            ))
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and control cascade method statistics")
+    parser.add_argument("action", choices=["show", "pin", "unpin", "reset"])
+    parser.add_argument("--file", required=True, help="Statistics JSON file")
+    parser.add_argument("--symbology", help="Profile to act on (default: all for show/reset)")
+    parser.add_argument("--methods", help="Comma-separated explicit order for 'pin'")
+    args = parser.parse_args()
+
+    if args.symbology:
+        symbologies = [args.symbology]
+    else:
+        if args.action in ("pin", "unpin"):
+            parser.error(f"--symbology is required for '{args.action}'")
+        symbologies = list(load_stats_file(args.file))
+
+    for symbology in symbologies:
+        stats = MethodStats(args.file, symbology)
+        if args.action == "pin":
+            try:
+                stats.pin(args.methods.split(",") if args.methods else None)
+            except ValueError as e:
+                print(f"❌ {e}")
+                sys.exit(1)
+        elif args.action == "unpin":
+            stats.unpin()
+        elif args.action == "reset":
+            stats.reset()
+
+        if args.action != "show":
+            stats.save()
+
+        print("=" * 80)
+        print(f"{symbology}" + (f"  (pinned: {', '.join(stats.pinned)})" if stats.pinned else ""))
+        print("=" * 80)
+        for name, attempts, rate, mean_ms, cost in stats.summary():
+            flag = "  [pruned]" if stats.is_pruned(name) else ""
+            print(f"  {name:<40} {attempts:>6} tries  {rate:6.1%}  "
+                  f"{mean_ms:8.1f} ms  {cost:10.1f} ms/success{flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Find-All Decoding
+Decodes every symbol on a page (a sheet of labels, a pallet photo) instead
+of stopping at the first method that finds anything. Results from all
+preprocessing variants and candidate regions are merged, and a symbol seen
+twice (same payload, overlapping polygon) is only reported once.
+
+    symbols = find_all(ctx, build_methods, build_region_methods)
+
+Variants are only tried while some candidate region (see
+decode_common.localize) has no symbol in it yet; each region left over
+after the full-frame pass gets its own cascade on a crop. An image with no
+candidate regions at all (one code filling the frame) gets that cascade on
+the full frame instead.
+"""
+
+from decode_common.cascade import estimated_costs, run_cascade
+from decode_common.localize import find_regions, in_parent
+from decode_common.lazy import lazy
+from decode_common.trace import span
+
+cv2 = lazy("cv2")
+np = lazy("numpy")
+
+# Polygons overlapping at least this much (intersection over union) with
+# the same payload are the same symbol
+DEDUP_IOU = 0.3
+
+# A sheet can hold far more codes than the single-symbol cascades look for
+MAX_REGIONS = 64
+
+
+def _get(item, key):
+    return item.get(key) if isinstance(item, dict) else getattr(item, key, None)
+
+
+def payload(item):
+    """Payload of a decoded symbol (namedtuple or dict) as bytes"""
+    data = _get(item, 'data')
+    return data.encode('utf-8') if isinstance(data, str) else data
+
+
+def polygon(item):
+    """Corner points of a decoded symbol as a float32 array (None if unknown)"""
+    points = _get(item, 'polygon')
+    if points is not None and len(points) >= 3:
+        return np.array([(p[0], p[1]) for p in points], dtype=np.float32)
+    rect = _get(item, 'rect')
+    if rect is None or not rect[2] or not rect[3]:
+        return None
+    x, y, w, h = rect
+    return np.array([(x, y), (x + w, y), (x + w, y + h), (x, y + h)], dtype=np.float32)
+
+
+def iou(a, b):
+    """Intersection over union of two polygons (their convex hulls)"""
+    a, b = cv2.convexHull(a), cv2.convexHull(b)
+    union = cv2.contourArea(a) + cv2.contourArea(b)
+    if union <= 0:
+        return 0.0
+    intersection, _ = cv2.intersectConvexConvex(a, b)
+    return intersection / (union - intersection) if union > intersection else 1.0
+
+
+def is_duplicate(item, other, threshold=DEDUP_IOU):
+    """Same payload, and the same place on the page when both have polygons"""
+    if payload(item) != payload(other):
+        return False
+    a, b = polygon(item), polygon(other)
+    if a is None or b is None:
+        return True
+    return iou(a, b) >= threshold
+
+
+def merge(found, new, threshold=DEDUP_IOU):
+    """Append the symbols of `new` not already in `found`; returns how many were added"""
+    added = 0
+    for item in new or []:
+        if not any(is_duplicate(item, other, threshold) for other in found):
+            found.append(item)
+            added += 1
+    return added
+
+
+def _center(item):
+    points = polygon(item)
+    return None if points is None else points.mean(axis=0)
+
+
+def unresolved(regions, found):
+    """Regions that do not contain the center of any symbol found so far"""
+    centers = [c for c in (_center(item) for item in found) if c is not None]
+    return [r for r in regions
+            if not any(r.x <= cx < r.x + r.width and r.y <= cy < r.y + r.height
+                       for cx, cy in centers)]
+
+
+def find_all(ctx, build_methods, build_region_methods=None, max_regions=MAX_REGIONS,
+             deadline=None, threshold=DEDUP_IOU):
+    """
+    Every symbol in an image, de-duplicated across variants and regions
+
+    Args:
+        ctx: ImageContext of the full image
+        build_methods: Callable (ctx) -> list of (name, callable) pairs, the
+            cascade run on the full frame (may use multi-symbol detectors)
+        build_region_methods: Callable (ctx) -> list of (name, callable)
+            pairs run on the crop of each unresolved region, which holds a
+            single symbol (default: build_methods)
+        max_regions: Maximum number of candidate regions tracked
+        deadline: Optional Deadline; whatever was found when it runs out
+            is returned
+        threshold: IoU above which two reads of one payload are merged
+
+    Returns:
+        List of decoded symbols in original-image coordinates (empty if
+        nothing was found)
+    """
+    if ctx.image is None:
+        return []
+    build_region_methods = build_region_methods or build_methods
+    regions = find_regions(ctx.gray, max_regions)
+    found = []
+
+    # Full frame: every method may find a different subset of the symbols;
+    # stop as soon as each candidate region holds one
+    for name, method in build_methods(ctx):
+        if deadline is not None and deadline.expired:
+            return found
+        with span(name, "method"):
+            try:
+                success, result = method()
+            except Exception:
+                success, result = False, None
+        if success:
+            merge(found, result, threshold)
+        if found and not unresolved(regions, found):
+            return found
+
+    if not regions and not found:
+        # No candidate regions (e.g. a code filling the frame): the
+        # single-symbol cascade on the full frame is the only one left
+        name, result = run_cascade(build_region_methods(ctx), workers=1, deadline=deadline,
+                                   costs=estimated_costs(ctx))
+        return list(result) if name else found
+
+    # Regions nothing landed in: a cascade of their own, on a crop
+    for region in unresolved(regions, found):
+        if deadline is not None and deadline.expired:
+            break
+        crop = ctx.crop(region)
+        methods = [(name, in_parent(method, crop, ctx))
+                   for name, method in build_region_methods(crop)]
+        name, result = run_cascade(methods, workers=1, deadline=deadline,
+                                   costs=estimated_costs(crop))
+        if name:
+            merge(found, result, threshold)
+    return found
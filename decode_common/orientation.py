@@ -0,0 +1,101 @@
+"""
+Orientation
+Exact right-angle rotations and a single skew estimate, instead of
+interpolating the whole image for every angle of a blind sweep.
+
+    skew = estimate_skew(ctx.gray)        # Skew(angle=12.5, confidence=0.8)
+    upright = rotate(ctx.gray, -skew.angle)
+
+Multiples of 90° are transposes/flips (cv2.rotate): no interpolation and
+no cropped corners. Other angles grow the canvas so nothing is cut off.
+The skew is the dominant gradient direction modulo 90° (bars and module
+edges come in perpendicular pairs), taken as the weighted circular mean
+of four times the gradient angle.
+"""
+
+import math
+from collections import namedtuple
+
+from decode_common.lazy import lazy
+from decode_common.trace import traced
+
+cv2 = lazy("cv2")
+np = lazy("numpy")
+
+Skew = namedtuple('Skew', 'angle confidence')
+
+# Long side of the copy the skew is estimated on
+WORK_SIZE = 512
+
+# Smaller skews are left to the decoders, which tolerate a few degrees
+MIN_SKEW = 3.0
+
+# Below this agreement of the gradient directions there is no dominant angle
+MIN_CONFIDENCE = 0.3
+
+
+def _right_angles():
+    # Counter-clockwise, like cv2.getRotationMatrix2D with a positive angle
+    return {90: cv2.ROTATE_90_COUNTERCLOCKWISE, 180: cv2.ROTATE_180,
+            270: cv2.ROTATE_90_CLOCKWISE}
+
+
+def rotate(image, angle):
+    """
+    Image rotated counter-clockwise by `angle` degrees
+
+    Right angles are exact; other angles are interpolated onto a canvas
+    large enough for the whole image, with the edge pixels repeated
+    """
+    angle = angle % 360
+    if angle == 0:
+        return image
+    right_angles = _right_angles()
+    if angle in right_angles:
+        return cv2.rotate(image, right_angles[angle])
+
+    h, w = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    new_w, new_h = int(math.ceil(h * sin + w * cos)), int(math.ceil(h * cos + w * sin))
+    matrix[0, 2] += new_w / 2 - w / 2
+    matrix[1, 2] += new_h / 2 - h / 2
+    return cv2.warpAffine(image, matrix, (new_w, new_h), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_REPLICATE)
+
+
+@traced("skew", "orientation")
+def estimate_skew(gray, work_size=WORK_SIZE):
+    """
+    Counter-clockwise rotation of the image content, modulo 90°
+
+    Returns:
+        Skew(angle, confidence): angle in (-45, 45] degrees; confidence in
+        [0, 1] is how well the gradient directions agree (0 for no edges)
+    """
+    height, width = gray.shape[:2]
+    scale = min(1.0, work_size / max(height, width))
+    if scale < 1.0:
+        gray = cv2.resize(gray, (max(1, int(width * scale)), max(1, int(height * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+    gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+    magnitude, direction = cv2.cartToPolar(gx, gy)
+    total = float(magnitude.sum())
+    if total <= 0:
+        return Skew(0.0, 0.0)
+    c = float((magnitude * np.cos(4 * direction)).sum())
+    s = float((magnitude * np.sin(4 * direction)).sum())
+    # Image y points down, so a counter-clockwise turn lowers the gradient angle
+    angle = -math.degrees(math.atan2(s, c)) / 4
+    if angle <= -45:
+        angle += 90
+    return Skew(round(angle, 2), round(math.hypot(c, s) / total, 3))
+
+
+def deskew_angle(skew, min_skew=MIN_SKEW, min_confidence=MIN_CONFIDENCE):
+    """Rotation that straightens an image with `skew`, or None if it needs none"""
+    if skew.confidence < min_confidence or abs(skew.angle) < min_skew:
+        return None
+    return -skew.angle
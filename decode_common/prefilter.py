@@ -0,0 +1,276 @@
+"""
+Code-Likelihood Pre-Filter
+A few milliseconds of image statistics that tell whether an image can
+contain a barcode at all, so blank pages and code-free photos do not pay
+for the full cascade (rotations, denoising, ZXing, Docker).
+
+Three cues, computed on a downscaled, contrast-stretched grayscale copy:
+    gradient    Share of edge pixels in the densest tile; bars and modules
+                pack many edges into a small area
+    coherence   Structure-tensor coherence of that tile; 1D barcodes have
+                one dominant edge direction
+    finders     Rows and columns crossing a dark-light-dark 1:1:3:1:1 run,
+                the signature of QR finder patterns
+
+The few densest tiles are scored and the best one counts; a tile that
+looks like printed text (little ink, no module grid) scores TEXT_SCORE.
+
+    likelihood = code_likelihood(ctx.gray)
+    action = decide(likelihood.score, threshold)   # "decode", "shorten" or "skip"
+
+The decoders call screen() once per image (--prefilter-threshold, 0 to
+disable); batch runs log the share of skipped images.
+"""
+
+from collections import namedtuple
+
+from decode_common.lazy import lazy
+from decode_common.pyramid import estimate_module
+from decode_common.trace import traced
+
+cv2 = lazy("cv2")
+np = lazy("numpy")
+
+Likelihood = namedtuple('Likelihood', 'score gradient coherence finders')
+
+# Long side of the copy the statistics are computed on
+WORK_SIZE = 512
+
+# Tile size (work-image pixels) edge density is measured over
+TILE = 16
+
+# Canny hysteresis thresholds (Sobel L1 magnitude); a 20-level step is an edge
+EDGE_LOW, EDGE_HIGH = 40, 80
+
+# Contrast is stretched between these percentiles before edge detection,
+# by at most MAX_GAIN: a 10-level step still counts as an edge, sensor
+# noise on a blank page does not
+STRETCH_LOW, STRETCH_HIGH = 1, 99
+MAX_GAIN = 2.0
+
+# Share of edge pixels in a tile of a clean symbol; denser tiles score 1
+FULL_DENSITY = 0.2
+
+# Densest tiles scored; the best one sets the score
+PEAKS = 16
+
+# Text: ink share (of the lesser colour) and module-grid fit below these
+# (codes are about half dark and fit a grid); a text patch scores at most
+# TEXT_SCORE, which shortens the cascade at the default threshold
+TEXT_INK = 0.3
+TEXT_GRID_FIT = 0.35
+TEXT_SCORE = 0.15
+
+# Finder-pattern rows needed to vouch for a QR code on their own
+FINDER_ROWS = 6
+
+# Tolerance of each run in the 1:1:3:1:1 finder ratio, in modules
+FINDER_TOLERANCE = 0.5
+
+# Largest finder module (work-image pixels): a version 1 QR code filling the frame
+MAX_MODULE = WORK_SIZE // 21
+
+# Below this edge density finder hits are thresholding noise, not modules
+MIN_FINDER_GRADIENT = 0.05
+
+# Default score below which the cascade is shortened; below half of it
+# the image is skipped (0 disables the pre-filter)
+DEFAULT_THRESHOLD = 0.2
+SKIP_RATIO = 0.5
+
+# Methods kept when the cascade is shortened (the plain passes at its head)
+SHORT_CASCADE = 2
+
+
+def _tile_means(values, tiles):
+    return cv2.resize(values, tiles, interpolation=cv2.INTER_AREA)
+
+
+def stretch(gray, low=STRETCH_LOW, high=STRETCH_HIGH, max_gain=MAX_GAIN):
+    """Contrast-stretched copy of a uint8 image, centred on its percentile range"""
+    counts = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel().cumsum()
+    lo, hi = (int(np.searchsorted(counts, counts[-1] * p / 100.0)) for p in (low, high))
+    gain = min(max_gain, 255.0 / max(1, hi - lo))
+    return cv2.convertScaleAbs(gray, alpha=gain, beta=127.5 - gain * (lo + hi) / 2)
+
+
+def _peaks(density, count=PEAKS):
+    """Indices of the `count` densest tiles, at least two tiles apart"""
+    density = density.copy()
+    peaks = []
+    for _ in range(min(count, density.size)):
+        y, x = np.unravel_index(int(np.argmax(density)), density.shape)
+        if peaks and density[y, x] <= 0:
+            break
+        peaks.append((y, x))
+        density[max(0, y - 1):y + 2, max(0, x - 1):x + 2] = -1
+    return peaks
+
+
+def _window(gray, peak, tile):
+    """Full-resolution pixels of the 3x3 work-image tiles around `peak`"""
+    y, x = (int(max(0, (i - 1) * tile)) for i in peak)
+    size = int(3 * tile)
+    return gray[y:y + size, x:x + size]
+
+
+def looks_like_text(gray):
+    """
+    True if a dense patch looks like printed text rather than a symbol:
+    ink covers well under half of it and its strokes do not fall on a
+    module grid
+    """
+    if gray.size == 0:
+        return False
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    ink = min(float((binary == 0).mean()), float((binary > 0).mean()))
+    return ink < TEXT_INK and estimate_module(gray, step=2).confidence < TEXT_GRID_FIT
+
+
+def finder_rows(binary, step=2, max_module=MAX_MODULE, enough=FINDER_ROWS):
+    """Rows of a binary image (dark = 0) crossing a 1:1:3:1:1 finder pattern, up to `enough`"""
+    ratio = np.array([1, 1, 3, 1, 1], dtype=np.float32)
+    tolerance = FINDER_TOLERANCE * np.array([1, 1, 1.5, 1, 1], dtype=np.float32)
+    hits = 0
+    for row in binary[::step]:
+        edges = np.flatnonzero(np.diff(row.astype(np.int8))) + 1
+        if len(edges) < 6:
+            continue
+        runs = np.diff(edges).astype(np.float32)
+        # Windows of five runs starting on a dark one
+        windows = np.lib.stride_tricks.sliding_window_view(runs, 5)
+        windows = windows[row[edges[:len(windows)]] == 0]
+        module = windows.sum(axis=1, keepdims=True) / 7.0
+        match = np.all(np.abs(windows - ratio * module) < tolerance * module, axis=1)
+        if np.any(match & (module[:, 0] >= 1) & (module[:, 0] <= max_module)):
+            hits += 1
+            if hits >= enough:
+                break
+    return hits
+
+
+@traced("code likelihood", "prefilter")
+def code_likelihood(gray, work_size=WORK_SIZE):
+    """
+    Score how likely a grayscale image is to contain a barcode
+
+    Returns:
+        Likelihood(score, gradient, coherence, finders); score is in [0, 1]
+    """
+    height, width = gray.shape[:2]
+    scale = min(1.0, work_size / max(height, width))
+    small = gray if scale == 1.0 else cv2.resize(
+        gray, (max(1, int(width * scale)), max(1, int(height * scale))),
+        interpolation=cv2.INTER_AREA)
+
+    # Sensor noise would otherwise pass for fine modules; faint symbols
+    # get their contrast stretched so the fixed edge thresholds see them
+    small = stretch(cv2.GaussianBlur(small, (3, 3), 0))
+    gx = cv2.Scharr(small, cv2.CV_32F, 1, 0)
+    gy = cv2.Scharr(small, cv2.CV_32F, 0, 1)
+    # Thin edges: smooth shading gives a few contours, modules a dense mesh
+    edges = (cv2.Canny(small, EDGE_LOW, EDGE_HIGH) > 0).astype(np.float32)
+
+    tiles = (max(1, small.shape[1] // TILE), max(1, small.shape[0] // TILE))
+    density = _tile_means(edges, tiles)
+    # A symbol spans several tiles; average 2x2 neighbourhoods so one
+    # noisy tile cannot carry the score
+    if min(density.shape) > 1:
+        density = cv2.blur(density, (2, 2))
+    structure = [_tile_means(values, tiles) for values in (gx * gx, gy * gy, gx * gy)]
+
+    # The densest tiles may be text next to the symbol; score a few of them
+    score, gradient, coherence = 0.0, 0.0, 0.0
+    for peak in _peaks(density):
+        tile_gradient = float(density[peak])
+        jxx, jyy, jxy = (values[peak] for values in structure)
+        trace = jxx + jyy
+        tile_coherence = float(np.sqrt((jxx - jyy) ** 2 + 4 * jxy ** 2) / trace) if trace > 0 else 0.0
+
+        tile_score = min(1.0, tile_gradient / FULL_DENSITY)
+        if tile_gradient > 0.5 * FULL_DENSITY:
+            # Dense and strongly oriented: bars of a 1D code
+            tile_score = max(tile_score, min(1.0, tile_coherence))
+        if tile_score > TEXT_SCORE and looks_like_text(_window(gray, peak, TILE / scale)):
+            tile_score = TEXT_SCORE
+        if tile_score > score or not gradient:
+            score, gradient, coherence = tile_score, tile_gradient, tile_coherence
+        if score >= 1.0:
+            break
+
+    # Finder rows only matter while the score is not settled
+    finders = 0
+    if score < 1.0 and gradient >= MIN_FINDER_GRADIENT:
+        _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        # A finder pattern crosses rows and columns alike; text mostly rows
+        finders = finder_rows(binary)
+        if finders:
+            finders = finder_rows(binary.T, enough=finders)
+        score = max(score, min(1.0, finders / FINDER_ROWS))
+    return Likelihood(round(score, 3), round(gradient, 3), round(coherence, 3), finders)
+
+
+def decide(score, threshold=DEFAULT_THRESHOLD):
+    """"decode" (full cascade), "shorten" (plain passes only) or "skip" """
+    if not threshold or score >= threshold:
+        return "decode"
+    return "skip" if score < threshold * SKIP_RATIO else "shorten"
+
+
+def shorten(methods, keep=SHORT_CASCADE):
+    """The first `keep` cascade methods: the cheap plain passes"""
+    return methods[:keep]
+
+
+# Decisions taken in this process, for skip-rate logging
+DECISIONS = {"decode": 0, "shorten": 0, "skip": 0}
+
+# The last check in this process: (Likelihood, action)
+last_check = None
+
+
+def check(ctx, threshold=DEFAULT_THRESHOLD):
+    """
+    Score an ImageContext and decide what to run; the decision is counted
+    in DECISIONS and kept in `last_check`
+
+    Returns:
+        (Likelihood, action)
+    """
+    global last_check
+    likelihood = code_likelihood(ctx.gray)
+    action = decide(likelihood.score, threshold)
+    DECISIONS[action] += 1
+    last_check = (likelihood, action)
+    return likelihood, action
+
+
+def skip_rates():
+    """Share of checked images per decision, e.g. {'skip': 0.25, ...}"""
+    total = sum(DECISIONS.values())
+    return {action: round(count / total, 3) if total else 0.0
+            for action, count in DECISIONS.items()}
+
+
+def describe(likelihood, action, threshold=DEFAULT_THRESHOLD):
+    return (f"code likelihood {likelihood.score:.2f} (edges {likelihood.gradient:.2f}, "
+            f"coherence {likelihood.coherence:.2f}, finder rows {likelihood.finders}) "
+            f"vs threshold {threshold:g}: {action}")
+
+
+def screen(ctx, threshold=DEFAULT_THRESHOLD):
+    """
+    check() an image and report a skipped or shortened cascade on the
+    console; a falsy threshold disables the pre-filter
+
+    Returns:
+        "decode", "shorten" or "skip"
+    """
+    if not threshold:
+        return "decode"
+    likelihood, action = check(ctx, threshold)
+    if action == "skip":
+        print(f"⏭️ Skipped: {describe(likelihood, action, threshold)}")
+    elif action == "shorten":
+        print(f"✂️ Shortened cascade: {describe(likelihood, action, threshold)}")
+    return action
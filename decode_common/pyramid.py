@@ -0,0 +1,154 @@
+"""
+Multi-Scale Pyramid
+Estimates the barcode module size (narrowest bar/space run) and decodes at
+the cheapest scale where modules are still about 2-4 px wide. Other
+scales are only tried, nearest first, when that one fails.
+
+    methods = pyramid_methods(ctx, build_methods, build_level=build_cheap_methods)
+    name, result = run_cascade(methods)
+
+Rescaled levels only run the cheap methods (binarize + zbar); the full
+cascade runs once, at native resolution. The pyramid is only climbed when
+the run lengths really are multiples of one module width, and upscaled
+levels are capped in size.
+"""
+
+from collections import namedtuple
+
+from decode_common.lazy import lazy
+from decode_common.localize import in_parent
+from decode_common.method_stats import MethodName
+from decode_common.trace import traced
+
+np = lazy("numpy")
+
+# Scales the pyramid may use, smallest first
+PYRAMID_SCALES = (0.25, 0.5, 1.0, 2.0)
+
+# Decoders need modules at least this wide; more only costs time. With a
+# ladder of halvings the chosen scale then gives modules of 2-4 px
+MIN_MODULE_PX = 2.0
+
+# Every n-th row/column is enough to measure run lengths
+SAMPLE_STEP = 4
+
+# Percentile of the run lengths taken as the module size (narrow elements
+# are the most frequent runs inside a code, background runs are long)
+MODULE_PERCENTILE = 20
+
+# A run within this many modules of a whole number of modules fits the grid
+MODULE_TOLERANCE = 0.25
+
+# Share of runs fitting the module grid needed before other scales are
+# tried; codes score ~1, text and photos well below 0.5
+MIN_CONFIDENCE = 0.5
+
+# Upscaled levels larger than this are skipped (never 2x a multi-MP frame)
+MAX_LEVEL_PIXELS = 4_000_000
+
+ModuleEstimate = namedtuple('ModuleEstimate', 'size confidence')
+
+
+def _run_lengths(lines):
+    """Lengths of constant runs along the rows of a 0/1 array"""
+    width = lines.shape[1]
+    changes = np.flatnonzero(np.diff(lines, axis=1).ravel())
+    if changes.size < 2:
+        return np.empty(0)
+    rows = changes // (width - 1)
+    runs = np.diff(changes)
+    # Drop the "runs" that span two rows
+    return runs[rows[1:] == rows[:-1]]
+
+
+@traced("module size", "pyramid")
+def estimate_module(gray, step=SAMPLE_STEP):
+    """
+    Estimated module width and how well the image fits it
+
+    Args:
+        gray: Grayscale image (usually a candidate crop)
+        step: Sample every `step`-th row and column
+
+    Returns:
+        ModuleEstimate(size, confidence): size in pixels (None if the
+        image has no structure); confidence is the share of short runs
+        that are a whole number of modules long
+    """
+    if gray is None or gray.size == 0:
+        return ModuleEstimate(None, 0.0)
+    binary = (gray > gray.mean()).astype(np.int8)
+    runs = np.concatenate([
+        _run_lengths(binary[::step]),
+        _run_lengths(binary[:, ::step].T),
+    ])
+    if runs.size < 8:
+        return ModuleEstimate(None, 0.0)
+    size = float(np.percentile(runs, MODULE_PERCENTILE))
+    modules = runs[runs <= 8 * size] / size
+    fits = np.abs(modules - np.round(modules)) < MODULE_TOLERANCE
+    return ModuleEstimate(size, round(float(fits.mean()), 3) if modules.size else 0.0)
+
+
+def estimate_module_size(gray, step=SAMPLE_STEP):
+    """Estimated module width in pixels, or None if the image has no structure"""
+    return estimate_module(gray, step).size
+
+
+def choose_scales(module_size, scales=PYRAMID_SCALES, confidence=1.0, pixels=None,
+                  max_pixels=MAX_LEVEL_PIXELS):
+    """
+    Scales to try, in order: the cheapest one that keeps modules at least
+    MIN_MODULE_PX wide, then its neighbours in the ladder (larger first),
+    then native resolution if it is not among them
+
+    Only native resolution is returned when the module size is unknown or
+    its confidence is below MIN_CONFIDENCE; upscales that would exceed
+    `max_pixels` (for an image of `pixels` pixels) are dropped
+    """
+    if module_size is None or confidence < MIN_CONFIDENCE:
+        return [1.0]
+    scales = sorted(s for s in scales
+                    if s <= 1.0 or pixels is None or pixels * s * s <= max_pixels)
+    usable = [s for s in scales if module_size * s >= MIN_MODULE_PX]
+    best = usable[0] if usable else scales[-1]
+
+    i = scales.index(best)
+    order = [best] + scales[i + 1:i + 2] + scales[max(0, i - 1):i]
+    if 1.0 not in order:
+        order.append(1.0)
+    return order
+
+
+def pyramid_methods(ctx, build_methods, scales=PYRAMID_SCALES, build_level=None):
+    """
+    Cascade methods for each pyramid scale, best scale first
+
+    Args:
+        ctx: ImageContext to decode (full image or a candidate crop)
+        build_methods: Callable (ctx) -> list of (name, callable) pairs,
+            the full cascade, run at native resolution
+        scales: Scale ladder to choose from
+        build_level: Callable (ctx) -> list of (name, callable) pairs run
+            on rescaled levels; should hold only cheap methods (default:
+            build_methods)
+
+    Returns:
+        List of (name, callable) pairs for run_cascade(); results are in
+        `ctx` coordinates, and the first scale that succeeds wins
+    """
+    if ctx.image is None:
+        return build_methods(ctx)
+
+    build_level = build_level or build_methods
+    height, width = ctx.shape[:2]
+    module = estimate_module(ctx.gray)
+    methods = []
+    for scale in choose_scales(module.size, scales, module.confidence, height * width):
+        level = ctx.scaled(scale)
+        if scale == 1.0:
+            methods += build_methods(level)
+        else:
+            methods += [(MethodName(f"{name} @ {scale:g}x", name), in_parent(method, level, ctx))
+                        for name, method in build_level(level)]
+    return methods
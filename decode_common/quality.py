@@ -0,0 +1,166 @@
+"""
+Image Quality Analyzer
+Measures blur, noise, contrast, lighting and polarity in a few
+milliseconds and picks the one or two preprocessing recipes most likely
+to make a symbol readable, instead of trying every variant in a fixed
+order.
+
+    features = analyze(ctx.gray)
+    for condition, recipe in plan(features):
+        image = recipe_image(ctx, recipe)
+
+Recipes are ImageContext variants ("otsu", "adaptive", "denoised", ...),
+so a recipe chosen here and tried again by a later cascade is only built
+once. POLICY is checked top to bottom; the first recipe of every matching
+row comes before any second choice, and an image no row matches gets the
+CLEAN recipes.
+"""
+
+from collections import namedtuple
+
+from decode_common.lazy import lazy
+from decode_common.trace import traced
+
+cv2 = lazy("cv2")
+np = lazy("numpy")
+
+Features = namedtuple('Features', 'sharpness noise contrast brightness unevenness inverted')
+
+# Long side of the copy the features are measured on; large enough that
+# blur and noise survive the downscale
+WORK_SIZE = 1024
+
+# Cells per side of the grid the background light is sampled on
+LIGHT_GRID = 4
+
+# Share of the image width treated as border (quiet zone) for polarity
+BORDER = 0.04
+
+# Thresholds, calibrated on generated symbols degraded with benchmark.degrade
+NOISY = 8.0           # noise sigma (gray levels)
+BLURRED = 0.05        # Laplacian variance / intensity variance
+UNEVEN = 0.35         # background light spread / contrast
+LOW_CONTRAST = 100    # 5th-95th percentile spread (gray levels)
+
+# Recipes returned by plan() unless asked otherwise
+MAX_RECIPES = 2
+
+# (condition, test, recipes in order of preference)
+POLICY = (
+    ("inverted", lambda f: f.inverted, ("inverted", "binary_inv")),
+    ("noisy", lambda f: f.noise >= NOISY, ("otsu", "denoised")),
+    ("blurred", lambda f: f.sharpness < BLURRED, ("sharpened", "otsu")),
+    ("uneven lighting", lambda f: f.unevenness >= UNEVEN, ("adaptive", "clahe")),
+    ("low contrast", lambda f: f.contrast < LOW_CONTRAST, ("clahe", "equalized")),
+)
+
+# Recipes for an image no POLICY row matches
+CLEAN = ("clean", ("gray", "otsu"))
+
+
+def _percentiles(gray, percents):
+    """Percentiles of a uint8 image from its histogram (no sort)"""
+    counts = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel().cumsum()
+    return [int(np.searchsorted(counts, counts[-1] * p / 100.0)) for p in percents]
+
+
+@traced("quality features", "quality")
+def analyze(gray, work_size=WORK_SIZE):
+    """
+    Quality feature vector of a grayscale image
+
+    Returns:
+        Features(sharpness, noise, contrast, brightness, unevenness, inverted):
+            sharpness   Laplacian variance relative to the intensity variance
+            noise       Sensor noise sigma in gray levels
+            contrast    Spread between the 5th and 95th percentile
+            brightness  Median gray level
+            unevenness  Spread of the background light relative to the contrast
+            inverted    True if the border (quiet zone) is darker than the symbol
+    """
+    height, width = gray.shape[:2]
+    scale = min(1.0, work_size / max(height, width))
+    if scale < 1.0:
+        gray = cv2.resize(gray, (max(1, int(width * scale)), max(1, int(height * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    gray = np.ascontiguousarray(gray)
+    low, median, high = _percentiles(gray, (5, 50, 95))
+    contrast = float(high - low)
+
+    # Polarity: a symbol sits on its quiet zone, so the border shows the background
+    band = max(1, int(min(gray.shape[:2]) * BORDER))
+    border = np.concatenate([gray[:band].ravel(), gray[-band:].ravel(),
+                             gray[:, :band].ravel(), gray[:, -band:].ravel()])
+    inverted = contrast > 0 and float(np.median(border)) < (low + high) / 2
+
+    variance = float(cv2.meanStdDev(gray)[1][0, 0]) ** 2
+    laplacian = float(cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S))[1][0, 0]) ** 2
+    sharpness = laplacian / variance if variance > 0 else 0.0
+
+    # Noise: local deviation in the flattest quarter of the image, where
+    # module edges do not count
+    values = gray.astype(np.float32)
+    mean = cv2.blur(values, (3, 3))
+    local = cv2.sqrt(cv2.max(cv2.blur(values * values, (3, 3)) - mean * mean, 0))
+    # Quarter gray levels keep the sigma on the 8-bit histogram scale
+    noise = _percentiles(cv2.convertScaleAbs(local, alpha=4), (25,))[0] / 4.0
+
+    # Background light: the bright end of each cell of a coarse grid; a
+    # cell is always wider than a module, so it holds some background.
+    # Every other pixel is plenty for a percentile
+    sample = gray[::2, ::2]
+    cells = []
+    for band in np.array_split(sample, LIGHT_GRID, axis=0):
+        for cell in np.array_split(band, LIGHT_GRID, axis=1):
+            if cell.size:
+                cells.append(float(np.percentile(cell, 10 if inverted else 90)))
+    unevenness = float(max(cells) - min(cells)) / contrast if contrast > 0 else 0.0
+
+    return Features(round(sharpness, 3), round(noise, 2), round(contrast, 1), round(float(median), 1),
+                    round(unevenness, 3), bool(inverted))
+
+
+def features_of(ctx):
+    """analyze() an ImageContext once; later calls reuse the result"""
+    return ctx.variant("quality", lambda: analyze(ctx.gray))
+
+
+def _matches(features):
+    matches = [(condition, recipes) for condition, test, recipes in POLICY if test(features)]
+    return matches or [CLEAN]
+
+
+def conditions(features):
+    """Names of the POLICY rows matching `features` ("clean" if none does)"""
+    return [condition for condition, _ in _matches(features)]
+
+
+def plan(features, limit=MAX_RECIPES):
+    """
+    The preprocessing recipes most likely to work on an image
+
+    Returns:
+        Up to `limit` (condition, recipe) pairs, best first
+    """
+    matches = _matches(features)
+    chosen = []
+    for rank in range(max(len(recipes) for _, recipes in matches)):
+        for condition, recipes in matches:
+            if rank < len(recipes) and all(recipes[rank] != r for _, r in chosen):
+                chosen.append((condition, recipes[rank]))
+                if len(chosen) >= limit:
+                    return chosen
+    return chosen
+
+
+def recipe_image(ctx, recipe):
+    """The ImageContext variant a recipe names, e.g. ctx.otsu for "otsu\""""
+    return getattr(ctx, recipe)
+
+
+def describe(features):
+    return (f"sharpness {features.sharpness:.2f}, noise {features.noise:.1f}, "
+            f"contrast {features.contrast:.0f}, brightness {features.brightness:.0f}, "
+            f"unevenness {features.unevenness:.2f}, "
+            f"{'light-on-dark' if features.inverted else 'dark-on-light'}")
@@ -0,0 +1,185 @@
+"""
+Decode Results
+One compact result type shared by the decoders, and a streaming JSONL/CSV
+writer for machine-readable output
+
+    python decode_qrcode.py label.png --format jsonl
+    python decode_barcode.py shelf.jpg --format csv > results.csv
+"""
+
+import base64
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+FORMATS = ("text", "jsonl", "csv")
+
+CSV_FIELDS = ("image", "symbology", "text", "method", "quality", "polygon", "timings")
+
+
+def text_of(data):
+    """Payload bytes as text (UTF-8, falling back to Latin-1)"""
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+
+def _corners(polygon, rect):
+    """Corner points as (x, y) tuples, from the rect when there is no polygon"""
+    if polygon is not None and len(polygon):
+        return tuple((int(p[0]), int(p[1])) for p in polygon)
+    if rect is None:
+        return ()
+    x, y, w, h = rect
+    return ((int(x), int(y)), (int(x + w), int(y)), (int(x + w), int(y + h)), (int(x), int(y + h)))
+
+
+@dataclass(slots=True)
+class DecodeResult:
+    """
+    One decoded symbol
+
+    Unpacks like the (type, data) tuples the decoders used to return:
+    `symbology, text = result`.
+
+    Args:
+        data: Raw payload bytes
+        text: Payload as text
+        symbology: e.g. "QRCODE", "CODE128"
+        polygon: Corner points as (x, y) tuples
+        quality: Backend quality score, if it reports one
+        method: Cascade method that decoded it ("cache" for cached hits)
+        timings: Stage name -> milliseconds
+        image: Path of the decoded image
+    """
+    data: bytes
+    text: str
+    symbology: str = None
+    polygon: tuple = ()
+    quality: int = None
+    method: str = None
+    timings: dict = None
+    image: str = None
+
+    @classmethod
+    def from_symbol(cls, obj, method=None, timings=None, image=None, symbology=None):
+        """
+        Result from a pyzbar/pylibdmtx-style decoded object; `symbology`
+        names objects without a type (pylibdmtx), and the corners come
+        from the rect when there is no polygon
+        """
+        return cls(
+            data=obj.data,
+            text=text_of(obj.data),
+            symbology=getattr(obj, 'type', None) or symbology,
+            polygon=_corners(getattr(obj, 'polygon', None), getattr(obj, 'rect', None)),
+            quality=getattr(obj, 'quality', None),
+            method=method,
+            timings=timings,
+            image=image,
+        )
+
+    @classmethod
+    def from_record(cls, record, method=None, timings=None, image=None, symbology=None):
+        """Result from a {'type', 'data', 'polygon', 'rect', 'quality'} dict with text data"""
+        return cls(
+            data=record['data'].encode('utf-8'),
+            text=record['data'],
+            symbology=record.get('type') or symbology,
+            polygon=_corners(record.get('polygon'), record.get('rect')),
+            quality=record.get('quality'),
+            method=method,
+            timings=timings,
+            image=image,
+        )
+
+    @classmethod
+    def from_text(cls, text, symbology, method=None, timings=None, image=None):
+        """Result from a backend that only reports text (ZXing command line, Docker)"""
+        return cls(data=text.encode('utf-8'), text=text, symbology=symbology,
+                   method=method, timings=timings, image=image)
+
+    def __iter__(self):
+        yield self.symbology
+        yield self.text
+
+    def to_dict(self):
+        """JSON-friendly record ('type'/'data' keys, as in batch and service output)"""
+        record = {
+            'image': self.image,
+            'type': self.symbology,
+            'data': self.text,
+            'polygon': [list(p) for p in self.polygon],
+            'quality': self.quality,
+            'method': self.method,
+            'timings': self.timings,
+        }
+        if self.text.encode('utf-8') != self.data:
+            # Not UTF-8: keep the exact bytes as well
+            record['data_b64'] = base64.b64encode(self.data).decode('ascii')
+        return record
+
+
+class ResultWriter:
+    """
+    Streams DecodeResults as JSON lines or CSV rows, flushing per image
+
+    Args:
+        out: Text stream to write to
+        fmt: "jsonl" or "csv"
+    """
+
+    def __init__(self, out, fmt="jsonl"):
+        if fmt not in ("jsonl", "csv"):
+            raise ValueError(f"Unknown format '{fmt}', expected jsonl or csv")
+        self.out = out
+        self.fmt = fmt
+        self._csv = None
+
+    def write(self, results):
+        for result in results:
+            if self.fmt == "jsonl":
+                self.out.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+                continue
+            if self._csv is None:
+                self._csv = csv.writer(self.out)
+                self._csv.writerow(CSV_FIELDS)
+            self._csv.writerow([
+                result.image, result.symbology, result.text, result.method,
+                "" if result.quality is None else result.quality,
+                ";".join(f"{x} {y}" for x, y in result.polygon),
+                ";".join(f"{name}={ms}" for name, ms in (result.timings or {}).items()),
+            ])
+        self.out.flush()
+
+
+def cascade_results(method, result, symbology=None, image=None, timings=None):
+    """
+    DecodeResults for a successful cascade whose methods return record
+    dicts (see DecodeResult.from_record) or raw text
+    """
+    if isinstance(result, str):
+        return [DecodeResult.from_text(result.strip(), symbology, method, timings, image)]
+    return [DecodeResult.from_record(r, method, timings, image, symbology) for r in result]
+
+
+def timings_since(start):
+    """{'total_ms': ...} since a time.perf_counter() reading"""
+    return {'total_ms': round((time.perf_counter() - start) * 1000, 2)}
+
+
+@contextlib.contextmanager
+def silenced():
+    """Discard the decoders' console report (for --format jsonl/csv)"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def write_results(results, fmt, out=None):
+    """Write `results` (a list of DecodeResults, or None) to `out` (default: stdout)"""
+    ResultWriter(out or sys.stdout, fmt).write(results or [])
@@ -0,0 +1,177 @@
+"""
+Decode Result Cache
+Content-addressed cache of decode results, keyed by the SHA-256 of the
+image bytes plus the decoder configuration. A bounded in-memory LRU sits in
+front of an optional SQLite tier; a hit never touches OpenCV.
+
+The process-wide default cache is in-memory only unless the environment
+variable DECODE_CACHE_DB names a SQLite file.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict, namedtuple
+
+DEFAULT_MAX_ENTRIES = 1024
+
+# Same shape as pyzbar's Decoded, so cached hits go through the existing
+# process_results() functions unchanged
+Symbol = namedtuple('Symbol', 'data type rect polygon quality orientation')
+Rect = namedtuple('Rect', 'left top width height')
+Point = namedtuple('Point', 'x y')
+
+
+def polygon_rect(polygon):
+    """Axis-aligned bounding Rect of a list of (x, y) points"""
+    if not polygon:
+        return Rect(0, 0, 0, 0)
+    xs = [p[0] for p in polygon]
+    ys = [p[1] for p in polygon]
+    return Rect(int(min(xs)), int(min(ys)), int(max(xs) - min(xs)), int(max(ys) - min(ys)))
+
+
+def symbol_record(obj):
+    """JSON-friendly record of a pyzbar/pylibdmtx-style decoded object"""
+    polygon = [[int(p[0]), int(p[1])] for p in getattr(obj, 'polygon', None) or []]
+    rect = getattr(obj, 'rect', None)
+    return {
+        'type': getattr(obj, 'type', None),
+        'data': base64.b64encode(obj.data).decode('ascii'),
+        'rect': list(rect) if rect is not None else list(polygon_rect(polygon)),
+        'polygon': polygon,
+        'quality': getattr(obj, 'quality', None),
+    }
+
+
+def text_record(text, symbology, polygon=None, quality=None):
+    """Record for a backend that only returns text and corner points"""
+    polygon = [[int(p[0]), int(p[1])] for p in polygon or []]
+    return {
+        'type': symbology,
+        'data': base64.b64encode(text.encode('utf-8')).decode('ascii'),
+        'rect': list(polygon_rect(polygon)),
+        'polygon': polygon,
+        'quality': quality,
+    }
+
+
+def record_symbol(record):
+    """Rebuild a Symbol from a record made by symbol_record()"""
+    polygon = [Point(*p) for p in record.get('polygon') or []]
+    rect = Rect(*record['rect']) if record.get('rect') else polygon_rect(polygon)
+    return Symbol(
+        data=base64.b64decode(record['data']),
+        type=record.get('type'),
+        rect=rect,
+        polygon=polygon,
+        quality=record.get('quality'),
+        orientation=None,
+    )
+
+
+class ResultCache:
+    """
+    Two-tier decode result cache
+
+    Args:
+        max_entries: Size of the in-memory LRU
+        db_path: Optional SQLite file for the persistent tier
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, db_path=None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def key(image_bytes, config):
+        """Cache key for encoded image bytes decoded with `config`"""
+        return f"{hashlib.sha256(image_bytes).hexdigest()}:{config}"
+
+    @classmethod
+    def key_for_file(cls, image_path, config):
+        with open(image_path, 'rb') as f:
+            return cls.key(f.read(), config)
+
+    def get(self, key):
+        """Stored value for `key`, or None on a miss"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Store a JSON-serializable value"""
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)",
+                    (key, json.dumps(value)),
+                )
+                self._db.commit()
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        """Hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._memory),
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_cache():
+    """Process-wide cache shared by the decoders"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache(db_path=os.environ.get("DECODE_CACHE_DB"))
+        return _default_cache
@@ -0,0 +1,486 @@
+"""
+Decode Service
+Local HTTP service that keeps the decoders loaded in a process pool, so
+callers pay the Python/OpenCV/pyzbar start-up cost once instead of per
+image. Concurrent requests for the same decoder are coalesced into small
+batches before they are handed to a worker.
+
+Usage:
+    python -m decode_common.service --port 8765 --workers 4
+    curl --data-binary @label.png http://127.0.0.1:8765/decode/qrcode
+    curl --data-binary @label.png "http://127.0.0.1:8765/decode/pdf417?budget_ms=300"
+
+budget_ms counts from the moment the request is queued: time spent waiting
+for a worker, or behind earlier images of the same batch, is taken off the
+budget the decoder sees.
+
+Endpoints:
+    POST /decode/<decoder>   Raw image bytes in, JSON out; <decoder> is one
+                             of the batch decoders (qrcode, barcode, aztec,
+                             datamatrix, pdf417)
+    GET  /health             Queue depth and counters
+
+Responses carry the payloads with their type and polygon, plus queue and
+decode timings. When more than MAX_PENDING requests are waiting the
+service answers 503 with Retry-After instead of queueing without bound.
+SIGINT/SIGTERM stop accepting connections and let queued requests finish.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import signal
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from decode_common.entrypoints import ENTRY_POINTS, load_module, run_decoder
+from decode_common.lazy import load_declared
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Requests handed to a worker at once, and how long the first request of a
+# batch waits for company when it takes the last free worker (with other
+# workers free, a batch is only this worker's share of the queue)
+MAX_BATCH = 8
+BATCH_WINDOW_MS = 5
+
+# Requests queued or decoding before new ones get 503
+MAX_PENDING = 64
+
+MAX_BODY_BYTES = 20 * 1024 * 1024
+MAX_HEADER_LINES = 100
+
+# Idle keep-alive connections are closed after this long
+IDLE_TIMEOUT_S = 30
+
+# How long shutdown waits for queued requests
+SHUTDOWN_GRACE_S = 30
+
+STATUS_TEXT = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    """Error answered with `status` and a JSON {'error': message} body"""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+# --- worker processes -------------------------------------------------------
+
+def charge(kwargs, waited_ms):
+    """Decoder kwargs with `waited_ms` taken off the request's budget (if it has one)"""
+    if kwargs.get('deadline') is None:
+        return kwargs
+    return {**kwargs, 'deadline': max(0.0, kwargs['deadline'] - waited_ms)}
+
+
+def _warm_up(decoder_names):
+    """Pool initializer: import every decoder and its backends once per worker"""
+    try:
+        import cv2
+        # Parallelism comes from the process pool; keep OpenCV single-threaded
+        cv2.setNumThreads(1)
+    except ImportError:
+        pass
+    for name in decoder_names:
+        try:
+            load_module(name)
+        except Exception:
+            # Reported per request by decode_batch
+            pass
+    # The decoders import their backends lazily
+    load_declared()
+
+
+def decode_batch(decoder_name, items):
+    """
+    Decode a batch of images in a worker
+
+    Args:
+        decoder_name: Entry point name, e.g. 'qrcode'
+        items: List of (image bytes, decoder kwargs); a 'deadline' budget
+            is charged for the time spent on the items before it
+
+    Returns:
+        One record per item: {'ok', 'results' or 'error', 'decode_ms'}
+    """
+    records = []
+    batch_start = time.perf_counter()
+    for data, kwargs in items:
+        start = time.perf_counter()
+        kwargs = charge(kwargs, (start - batch_start) * 1000)
+        # The decoders read from a path
+        fd, path = tempfile.mkstemp(prefix="decode_", suffix=".img")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            # The decoders report progress on stdout; keep it out of the service
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = run_decoder(decoder_name, path, **kwargs)
+            record = {'ok': bool(results), 'results': results}
+        except Exception as e:
+            record = {'ok': False, 'error': str(e)}
+        finally:
+            os.unlink(path)
+        record['decode_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        records.append(record)
+    return records
+
+
+# --- HTTP ---------------------------------------------------------------------
+
+async def read_request(reader, max_body_bytes=MAX_BODY_BYTES):
+    """
+    Read one HTTP/1.1 request
+
+    Returns:
+        (method, path, query dict, headers dict, body bytes), or None if the
+        client closed the connection between requests
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode('latin-1').split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode('latin-1').partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HTTPError(400, "Too many headers")
+
+    body = b""
+    if method == "POST":
+        if 'content-length' not in headers:
+            raise HTTPError(411, "Content-Length is required")
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > max_body_bytes:
+            raise HTTPError(413, f"Image larger than {max_body_bytes} bytes")
+        body = await reader.readexactly(length)
+
+    url = urlsplit(target)
+    query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+    return method, url.path, query, headers, body
+
+
+async def write_response(writer, status, payload, keep_alive=True, headers=None):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    lines = [
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+
+
+# --- service ------------------------------------------------------------------
+
+class DecodeService:
+    """
+    Micro-batching HTTP front end for a pool of decoder processes
+
+    Args:
+        host, port: Address to listen on (port 0 picks a free port)
+        workers: Decoder processes (default: CPU count)
+        max_batch: Requests handed to a worker at once
+        batch_window_ms: Extra wait for more requests once a worker is free
+        max_pending: Requests queued or decoding before new ones get 503
+        max_body_bytes: Largest accepted image
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None,
+                 max_batch=MAX_BATCH, batch_window_ms=BATCH_WINDOW_MS,
+                 max_pending=MAX_PENDING, max_body_bytes=MAX_BODY_BYTES):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.batch_window_ms = batch_window_ms
+        self.max_pending = max_pending
+        self.max_body_bytes = max_body_bytes
+
+        self.pending = 0
+        self.served = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batched_requests = 0
+
+        self._pool = None
+        self._server = None
+        self._queues = {}
+        self._batchers = []
+        self._free_workers = None
+        self._idle_workers = 0
+        self._idle = set()
+        self._drained = None
+        self._closing = False
+
+    async def start(self):
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up,
+                                         initargs=(tuple(ENTRY_POINTS),))
+        self._free_workers = asyncio.Semaphore(self.workers)
+        self._idle_workers = self.workers
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._queues = {name: asyncio.Queue() for name in ENTRY_POINTS}
+        self._batchers = [asyncio.create_task(self._batcher(name)) for name in self._queues]
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def decode(self, decoder_name, data, kwargs=None):
+        """Queue one image; returns its record once its batch is decoded"""
+        if self._closing:
+            self.rejected += 1
+            raise HTTPError(503, "Shutting down")
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPError(503, "Too many pending requests", {'Retry-After': '1'})
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending += 1
+        self._drained.clear()
+        try:
+            await self._queues[decoder_name].put((data, kwargs or {}, future, time.perf_counter()))
+            return await future
+        finally:
+            self.pending -= 1
+            if not self.pending:
+                self._drained.set()
+
+    async def _batcher(self, decoder_name):
+        """Collect requests into batches while the workers are busy"""
+        requests = self._queues[decoder_name]
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await requests.get()]
+            await self._free_workers.acquire()
+            self._idle_workers -= 1
+            # Whatever queued up while we waited for a worker joins the batch,
+            # but only this worker's share of it: a burst is spread over every
+            # idle worker instead of decoded one after another on this one.
+            # The window only waits for company when no other worker is idle
+            if self._idle_workers:
+                limit = min(self.max_batch,
+                            math.ceil((1 + requests.qsize()) / (1 + self._idle_workers)))
+                window_ends = loop.time()
+            else:
+                limit = self.max_batch
+                window_ends = loop.time() + self.batch_window_ms / 1000
+            while len(batch) < limit:
+                try:
+                    batch.append(requests.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = window_ends - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(requests.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            asyncio.create_task(self._run_batch(decoder_name, batch))
+
+    async def _run_batch(self, decoder_name, batch):
+        loop = asyncio.get_running_loop()
+        dispatched = time.perf_counter()
+        self.batches += 1
+        self.batched_requests += len(batch)
+        # The budget started when the request was queued
+        items = [(data, charge(kwargs, (dispatched - queued) * 1000))
+                 for data, kwargs, _, queued in batch]
+        try:
+            records = await loop.run_in_executor(self._pool, decode_batch, decoder_name, items)
+        except Exception as e:
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(HTTPError(500, f"Worker failed: {e}"))
+            return
+        finally:
+            self._idle_workers += 1
+            self._free_workers.release()
+
+        for (_, _, future, queued), record in zip(batch, records):
+            record['queue_ms'] = round((dispatched - queued) * 1000, 2)
+            record['batch_size'] = len(batch)
+            if not future.done():
+                future.set_result(record)
+
+    async def _handle(self, reader, writer):
+        try:
+            while not self._closing:
+                self._idle.add(writer)
+                try:
+                    request = await asyncio.wait_for(
+                        read_request(reader, self.max_body_bytes), IDLE_TIMEOUT_S)
+                finally:
+                    self._idle.discard(writer)
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    status, payload = await self._route(method, path, query, body)
+                    extra = {}
+                except HTTPError as e:
+                    status, payload, extra = e.status, {'error': str(e)}, e.headers
+                await write_response(writer, status, payload,
+                                     keep_alive and not self._closing, extra)
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            # Unreadable request: answer and drop the connection
+            with contextlib.suppress(ConnectionError):
+                await write_response(writer, e.status, {'error': str(e)}, False, e.headers)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, query, body):
+        if path == "/health":
+            if method != "GET":
+                raise HTTPError(405, "Use GET")
+            return 200, self.health()
+
+        parts = path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "decode":
+            raise HTTPError(404, f"Unknown path: {path}")
+        decoder_name = parts[1]
+        if decoder_name not in ENTRY_POINTS:
+            raise HTTPError(404, f"Unknown decoder '{decoder_name}', expected one of: "
+                                 f"{', '.join(ENTRY_POINTS)}")
+        if method != "POST":
+            raise HTTPError(405, "POST the raw image bytes")
+        if not body:
+            raise HTTPError(400, "Empty body; POST the raw image bytes")
+
+        kwargs = {}
+        if 'budget_ms' in query:
+            try:
+                kwargs['deadline'] = float(query['budget_ms'])
+            except ValueError:
+                raise HTTPError(400, "budget_ms must be a number")
+
+        start = time.perf_counter()
+        record = await self.decode(decoder_name, body, kwargs)
+        self.served += 1
+        payload = {
+            'decoder': decoder_name,
+            'ok': record['ok'],
+            'results': record.get('results', []),
+            'timings': {
+                'queue_ms': record['queue_ms'],
+                'decode_ms': record['decode_ms'],
+                'total_ms': round((time.perf_counter() - start) * 1000, 2),
+            },
+            'batch_size': record['batch_size'],
+        }
+        if 'error' in record:
+            payload['error'] = record['error']
+        return 200, payload
+
+    def health(self):
+        return {
+            'status': "draining" if self._closing else "ok",
+            'workers': self.workers,
+            'pending': self.pending,
+            'served': self.served,
+            'rejected': self.rejected,
+            'batches': self.batches,
+            'mean_batch_size': (round(self.batched_requests / self.batches, 2)
+                                if self.batches else 0.0),
+        }
+
+    async def shutdown(self, grace=SHUTDOWN_GRACE_S):
+        """Stop accepting connections, let queued requests finish, stop the pool"""
+        self._closing = True
+        self._server.close()
+        for writer in list(self._idle):
+            writer.close()
+        try:
+            await asyncio.wait_for(self._drained.wait(), grace)
+        except asyncio.TimeoutError:
+            pass
+        for task in self._batchers:
+            task.cancel()
+        await asyncio.gather(*self._batchers, return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self._pool.shutdown(wait=True, cancel_futures=True))
+
+
+async def serve(**kwargs):
+    """Run a DecodeService until SIGINT/SIGTERM, then shut it down gracefully"""
+    service = await DecodeService(**kwargs).start()
+    print(f"Decode service listening on http://{service.host}:{service.port} "
+          f"({service.workers} workers)", file=sys.stderr)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows: Ctrl+C arrives as KeyboardInterrupt instead
+            pass
+    try:
+        await stop.wait()
+    finally:
+        print("Shutting down, finishing queued requests...", file=sys.stderr)
+        await service.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP decode service")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="Decoder processes (default: CPU count)")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH,
+                        help="Requests handed to a worker at once")
+    parser.add_argument("--batch-window-ms", type=float, default=BATCH_WINDOW_MS,
+                        help="Extra wait for more requests before dispatching a batch")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                        help="Requests queued or decoding before new ones get 503")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(host=args.host, port=args.port, workers=args.workers,
+                          max_batch=args.max_batch, batch_window_ms=args.batch_window_ms,
+                          max_pending=args.max_pending))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Stream Decoder
+Decodes a live camera, a video file or a network stream (anything
+cv2.VideoCapture opens). A capture thread feeds a small bounded queue,
+dropping the oldest frame when the decoders fall behind, and a pool of
+worker threads decodes whatever is freshest.
+
+    with StreamDecoder(0, frame_decoder('QRCODE')) as stream:
+        for result in stream.results():
+            print(result.index, [s.data for s in result.symbols])
+"""
+
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+
+from decode_common.backends import route
+from decode_common.cascade import estimated_costs, run_cascade
+from decode_common.deadline import Deadline
+from decode_common.image_context import ImageContext
+
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 2
+
+# Number of recent frames FPS and latency are measured over
+STATS_WINDOW = 60
+
+FrameResult = namedtuple('FrameResult', 'index captured_at symbols latency_ms')
+FrameResult.__doc__ = """
+Outcome of decoding one frame
+
+Fields:
+    index: Frame number in the stream (dropped frames leave gaps)
+    captured_at: time.monotonic() when the frame was read
+    symbols: pyzbar-shaped symbols found in the frame (may be empty)
+    latency_ms: Capture-to-result time
+"""
+
+_END = object()
+
+
+def open_capture(source):
+    """cv2.VideoCapture for a device index, file path or stream URL"""
+    import cv2
+
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise IOError(f"Could not open video source: {source}")
+    return capture
+
+
+def frame_decoder(symbology='QRCODE', backends=None, budget_ms=None):
+    """
+    Per-frame decode function built from the backend router
+
+    Args:
+        symbology: Symbology to look for, e.g. 'QRCODE'
+        backends: Optional backend names to use, in preferred order
+        budget_ms: Optional latency budget per frame
+
+    Returns:
+        Callable (frame) -> list of symbols
+    """
+    def decode(frame):
+        deadline = Deadline(budget_ms) if budget_ms else None
+        ctx = ImageContext(image=frame)
+        name, symbols = run_cascade(route(ctx, symbology, backends, deadline=deadline),
+                                    workers=1, deadline=deadline, costs=estimated_costs(ctx))
+        return symbols if name else []
+    return decode
+
+
+class StreamDecoder:
+    """
+    Decodes frames from a video source on a worker pool
+
+    Args:
+        source: Device index, file path or URL for cv2.VideoCapture, or an
+            already opened capture object (anything with read()/release())
+        decode_frame: Callable (frame) -> list of symbols
+        workers: Decoder threads
+        queue_size: Frames buffered between capture and decoders; when full
+            the oldest frame is dropped
+        on_result: Optional callback receiving every FrameResult; an
+            exception it raises is counted in `callback_errors` and the
+            stream goes on
+        realtime: For file sources, read at the file's frame rate instead of
+            as fast as possible (so drops behave as with a live camera)
+    """
+
+    def __init__(self, source, decode_frame, workers=DEFAULT_WORKERS,
+                 queue_size=DEFAULT_QUEUE_SIZE, on_result=None, realtime=False):
+        self.source = source
+        self.decode_frame = decode_frame
+        self.workers = workers
+        self.on_result = on_result
+        self.realtime = realtime
+
+        self.frames_read = 0
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+        self.callback_errors = 0
+
+        self._frames = queue.Queue(maxsize=queue_size)
+        self._results = queue.Queue()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._recent = deque(maxlen=STATS_WINDOW)
+        self._started_at = None
+        self._capture = None
+
+    def start(self):
+        if hasattr(self.source, 'read'):
+            self._capture = self.source
+        else:
+            self._capture = open_capture(self.source)
+        self._started_at = time.monotonic()
+        self._threads = [threading.Thread(target=self._read_frames, daemon=True)]
+        self._threads += [threading.Thread(target=self._decode_frames, daemon=True)
+                          for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _put_latest(self, item):
+        """Queue `item`, dropping the oldest queued frame if the queue is full"""
+        while True:
+            try:
+                self._frames.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._frames.get_nowait()
+                    with self._lock:
+                        self.frames_dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _read_frames(self):
+        interval = 0.0
+        if self.realtime:
+            import cv2
+            fps = self._capture.get(cv2.CAP_PROP_FPS) if hasattr(self._capture, 'get') else 0
+            interval = 1.0 / fps if fps and fps > 0 else 0.0
+
+        index = 0
+        next_at = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                ok, frame = self._capture.read()
+                if not ok:
+                    break
+                with self._lock:
+                    self.frames_read += 1
+                self._put_latest((index, time.monotonic(), frame))
+                index += 1
+                if interval:
+                    next_at += interval
+                    time.sleep(max(0.0, next_at - time.monotonic()))
+        finally:
+            # One end marker per worker; they must not be dropped
+            for _ in range(self.workers):
+                self._frames.put(_END)
+
+    def _decode_frames(self):
+        try:
+            while True:
+                item = self._frames.get()
+                if item is _END:
+                    return
+                index, captured_at, frame = item
+                try:
+                    symbols = self.decode_frame(frame)
+                except Exception:
+                    symbols = []
+                done = time.monotonic()
+                result = FrameResult(index, captured_at, symbols, (done - captured_at) * 1000)
+                with self._lock:
+                    self.frames_decoded += 1
+                    self._recent.append((done, result.latency_ms))
+                if self.on_result is not None:
+                    try:
+                        self.on_result(result)
+                    except Exception as e:
+                        with self._lock:
+                            self.callback_errors += 1
+                        print(f"⚠️ on_result failed on frame {index}: {e}")
+                self._results.put(result)
+        finally:
+            # results() counts one end marker per worker, however it stopped
+            self._results.put(_END)
+
+    def results(self):
+        """Yield FrameResults as they complete, until the stream ends"""
+        finished = 0
+        while finished < self.workers:
+            result = self._results.get()
+            if result is _END:
+                finished += 1
+                continue
+            yield result
+
+    def wait(self):
+        """Block until the source is exhausted and every queued frame is decoded"""
+        for thread in self._threads:
+            thread.join()
+
+    def stop(self):
+        """Stop reading; frames already queued are still decoded"""
+        self._stop.set()
+
+    def close(self):
+        self.stop()
+        self.wait()
+        if self._capture is not None and hasattr(self._capture, 'release'):
+            self._capture.release()
+
+    def stats(self):
+        """Throughput and latency over the last STATS_WINDOW decoded frames"""
+        with self._lock:
+            recent = list(self._recent)
+            counts = {
+                'frames_read': self.frames_read,
+                'frames_decoded': self.frames_decoded,
+                'frames_dropped': self.frames_dropped,
+                'callback_errors': self.callback_errors,
+            }
+        latencies = sorted(latency for _, latency in recent)
+        fps = 0.0
+        if len(recent) > 1 and recent[-1][0] > recent[0][0]:
+            fps = (len(recent) - 1) / (recent[-1][0] - recent[0][0])
+        counts.update(
+            fps=round(fps, 1),
+            latency_ms_mean=round(sum(latencies) / len(latencies), 1) if latencies else None,
+            latency_ms_p95=round(latencies[int(0.95 * (len(latencies) - 1))], 1) if latencies else None,
+            elapsed_s=round(time.monotonic() - self._started_at, 2) if self._started_at else 0.0,
+        )
+        return counts
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
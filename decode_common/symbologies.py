@@ -0,0 +1,53 @@
+"""
+Symbology Profiles
+Named sets of zbar symbologies per entry point, so pyzbar only runs the
+scanners a decoder actually wants and results of other types are dropped
+"""
+
+from functools import lru_cache
+
+from decode_common.lazy import lazy
+
+pyzbar = lazy("pyzbar.pyzbar")
+
+PROFILES = {
+    'qrcode': ('QRCODE',),
+    'barcode': ('EAN13', 'EAN8', 'UPCA', 'UPCE', 'ISBN10', 'ISBN13', 'I25',
+                'CODABAR', 'CODE39', 'CODE93', 'CODE128', 'DATABAR', 'DATABAR_EXP'),
+    'pdf417': ('PDF417',),
+}
+
+
+def parse_symbols(text):
+    """'qrcode,ean13' -> ('QRCODE', 'EAN13'); a profile name expands to its set"""
+    names = []
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        names.extend(PROFILES.get(item.lower(), (item.upper(),)))
+    return tuple(names)
+
+
+@lru_cache(maxsize=None)
+def zbar_symbols(names):
+    """ZBarSymbol members for a tuple of names (names zbar lacks are ignored)"""
+    return [pyzbar.ZBarSymbol[name] for name in names if name in pyzbar.ZBarSymbol.__members__]
+
+
+def zbar_decode(image, names):
+    """
+    Run pyzbar restricted to `names` and keep only results of those types
+
+    Args:
+        image: Image accepted by pyzbar (PIL image or numpy array)
+        names: Tuple of symbology names, e.g. PROFILES['qrcode']; None scans everything
+    """
+    if names is None:
+        return pyzbar.decode(image)
+    symbols = zbar_symbols(tuple(names))
+    if not symbols:
+        # zbar cannot read any of these; scanning everything would only
+        # produce results that get filtered out
+        return []
+    return [obj for obj in pyzbar.decode(image, symbols=symbols) if obj.type in names]
@@ -0,0 +1,264 @@
+"""
+Stage Tracing
+Lightweight spans around image loading, preprocessing variants, cascade
+methods and external decoders, exportable as Chrome trace-event JSON
+(chrome://tracing or https://ui.perfetto.dev) and summarized as
+per-stage latency histograms.
+
+Tracing is off by default; a disabled span() is one global check and a
+shared no-op context manager.
+
+    from decode_common import trace
+    trace.enable()
+    with trace.span("CLAHE", "preprocess"):
+        ...
+    trace.export_chrome_trace("trace.json")
+    trace.print_summary()
+
+    python decode_qrcode.py label.png --trace trace.json
+    DECODE_TRACE=trace.json python comprehensive_decoder.py scan.png
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# Upper bounds (ms) of the summary histogram buckets; the last bucket is open
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Events kept per process; later spans are counted but dropped
+MAX_EVENTS = 1_000_000
+
+_enabled = False
+_events = []
+_dropped = 0
+_origin_ns = time.perf_counter_ns()
+_thread_names = {}
+
+# Export set up by trace_to(), run by flush() (at exit unless called earlier)
+_pending = None
+_registered = False
+
+
+class _Span:
+    __slots__ = ('name', 'cat', 'args', 'start')
+
+    def __init__(self, name, cat, args):
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _dropped
+        duration = time.perf_counter_ns() - self.start
+        if not _enabled:
+            # Outlived the trace (a cascade thread still running after flush())
+            return False
+        if len(_events) >= MAX_EVENTS:
+            _dropped += 1
+            return False
+        thread = threading.current_thread()
+        _thread_names.setdefault(thread.ident, thread.name)
+        # list.append is atomic, so cascade threads need no lock here
+        _events.append((self.name, self.cat, self.start, duration, thread.ident,
+                        self.args if exc_type is None else dict(self.args or {}, error=exc_type.__name__)))
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name, cat="stage", args=None):
+    """
+    Context manager timing one stage
+
+    Args:
+        name: Stage name, e.g. "CLAHE enhancement"
+        cat: Category shown in the trace viewer ("io", "preprocess",
+            "method", "external", "decode", ...)
+        args: Optional dict stored with the event
+    """
+    if not _enabled:
+        return _NO_SPAN
+    return _Span(name, cat, args)
+
+
+def traced(name=None, cat="decode"):
+    """Decorator wrapping every call of a function in a span"""
+    def wrap(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(label, cat, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return wrap
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Forget every recorded span"""
+    global _dropped
+    del _events[:]
+    _dropped = 0
+
+
+def events():
+    """Recorded spans as (name, cat, start_ns, duration_ns, thread id, args)"""
+    return list(_events)
+
+
+def chrome_trace():
+    """Recorded spans as a Chrome trace-event document"""
+    pid = os.getpid()
+    recorded = events()
+    tids = {}
+    trace_events = []
+    for name, cat, start, duration, ident, args in recorded:
+        tid = tids.setdefault(ident, len(tids) + 1)
+        event = {'name': name, 'cat': cat, 'ph': "X", 'pid': pid, 'tid': tid,
+                 'ts': (start - _origin_ns) / 1000, 'dur': duration / 1000}
+        if args:
+            event['args'] = args
+        trace_events.append(event)
+    for ident, tid in tids.items():
+        trace_events.append({'name': "thread_name", 'ph': "M", 'pid': pid, 'tid': tid,
+                             'args': {'name': _thread_names.get(ident, str(ident))}})
+    return {'traceEvents': trace_events, 'displayTimeUnit': "ms",
+            'otherData': {'dropped_events': _dropped}}
+
+
+def export_chrome_trace(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(chrome_trace(), f)
+
+
+def _bucket_label(index):
+    if index < len(BUCKETS_MS):
+        return f"<{BUCKETS_MS[index]}ms"
+    return f">={BUCKETS_MS[-1]}ms"
+
+
+def summary():
+    """
+    Aggregate the spans per (category, name)
+
+    Returns:
+        {"cat/name": {'name', 'cat', 'count', 'total_ms', 'mean_ms', 'p50_ms', 'p95_ms',
+        'max_ms', 'histogram': {bucket label: count}}}, slowest total first
+    """
+    grouped = {}
+    for name, cat, _, duration, _, _ in events():
+        grouped.setdefault((cat, name), []).append(duration / 1e6)
+
+    result = {}
+    for (cat, name), durations in sorted(grouped.items(), key=lambda kv: -sum(kv[1])):
+        durations.sort()
+        histogram = {}
+        for ms in durations:
+            index = next((i for i, bound in enumerate(BUCKETS_MS) if ms < bound), len(BUCKETS_MS))
+            label = _bucket_label(index)
+            histogram[label] = histogram.get(label, 0) + 1
+        result[f"{cat}/{name}"] = {
+            'name': name,
+            'cat': cat,
+            'count': len(durations),
+            'total_ms': round(sum(durations), 3),
+            'mean_ms': round(sum(durations) / len(durations), 3),
+            'p50_ms': round(durations[len(durations) // 2], 3),
+            'p95_ms': round(durations[int(0.95 * (len(durations) - 1))], 3),
+            'max_ms': round(durations[-1], 3),
+            'histogram': histogram,
+        }
+    return result
+
+
+def print_summary(file=None):
+    """Per-stage table (slowest total first) with its latency histogram"""
+    file = file or sys.stderr
+    stages = summary()
+    print("\n" + "=" * 80, file=file)
+    print("STAGE TIMINGS", file=file)
+    print("=" * 80, file=file)
+    if not stages:
+        print("  (no spans recorded)", file=file)
+    for s in stages.values():
+        print(f"  {s['name'][:40]:<40} {s['cat']:<10} x{s['count']:<4} total {s['total_ms']:9.1f} ms  "
+              f"p50 {s['p50_ms']:.1f}  p95 {s['p95_ms']:.1f}  max {s['max_ms']:.1f}", file=file)
+        print("      " + "  ".join(f"{label}:{count}" for label, count in s['histogram'].items()),
+              file=file)
+    if _dropped:
+        print(f"  ({_dropped} spans dropped after {MAX_EVENTS})", file=file)
+    print("=" * 80, file=file)
+
+
+def trace_to(path, summarize=True):
+    """Enable tracing and, at exit, write the Chrome trace to `path` (and print the summary)"""
+    import atexit
+    global _pending, _registered
+
+    def finish():
+        export_chrome_trace(path)
+        if summarize:
+            print_summary()
+        print(f"💾 Trace saved to: {path}", file=sys.stderr)
+
+    enable()
+    _pending = finish
+    if not _registered:
+        _registered = True
+        atexit.register(flush)
+
+
+def flush():
+    """
+    Write the trace requested by trace_to() now, then stop tracing and
+    forget the spans; for long-lived processes (the decode daemon) that
+    serve one traced request after another and never run atexit hooks
+    """
+    global _pending
+    finish, _pending = _pending, None
+    if finish is None:
+        return
+    try:
+        finish()
+    finally:
+        disable()
+        reset()
+
+
+if os.environ.get("DECODE_TRACE"):
+    trace_to(os.environ["DECODE_TRACE"])
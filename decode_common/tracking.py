@@ -0,0 +1,258 @@
+"""
+Cross-Frame Symbol Tracking
+Keeps the payload and polygon of symbols decoded in a video and follows
+them with sparse optical flow, so a code that stays in view is decoded
+once instead of on every frame. A decode only runs when localization
+(every few frames) finds a region no track covers and that did not just
+fail to decode, when a track's confidence drops, or (optionally) every N
+frames as a safety net.
+
+    tracker = SymbolTracker(frame_decoder('QRCODE'))
+    for frame in frames:
+        for symbol in tracker.update(frame):
+            print(symbol.track_id, symbol.data, symbol.decoded)
+"""
+
+import itertools
+from collections import namedtuple
+
+from decode_common.lazy import lazy
+from decode_common.localize import find_regions, shift_result
+
+cv2 = lazy("cv2")
+np = lazy("numpy")
+
+# Tracks whose confidence falls below this are re-decoded
+MIN_CONFIDENCE = 0.6
+
+# Tracks that fail to re-decode this many times in a row are dropped
+MAX_LOST = 3
+
+# Features followed per symbol
+MAX_FEATURES = 40
+
+# Search regions for new symbols every n frames (1 = every frame)
+LOCALIZE_EVERY = 5
+
+# A region that failed to decode is not tried again for this many frames
+# while localization keeps finding it in the same place (IoU at least
+# FAILED_IOU); text, logos and textures would otherwise cost a decode on
+# every search
+FAILED_FRAMES = 15
+FAILED_IOU = 0.5
+
+# Padding around a track when it is re-decoded, relative to its size
+REDECODE_MARGIN = 0.25
+
+# Pyramidal Lucas-Kanade window and levels
+LK_WINDOW = (21, 21)
+LK_LEVELS = 3
+
+def _lk_params():
+    # cv2 constants, so only read once OpenCV is imported
+    return dict(winSize=LK_WINDOW, maxLevel=LK_LEVELS,
+                criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.01))
+
+
+TrackedSymbol = namedtuple('TrackedSymbol', 'track_id data type polygon confidence decoded')
+TrackedSymbol.__doc__ = """
+A symbol visible in the current frame
+
+Fields:
+    track_id: Stable id for as long as the symbol is followed
+    data: Payload bytes from the last successful decode
+    type: Symbology
+    polygon: Corner points in frame coordinates (list of (x, y))
+    confidence: Share of the track's features that followed the motion
+    decoded: True if the payload was (re)decoded on this frame
+"""
+
+
+def _iou(a, b):
+    """Intersection over union of two Regions"""
+    w = min(a.x + a.width, b.x + b.width) - max(a.x, b.x)
+    h = min(a.y + a.height, b.y + b.height) - max(a.y, b.y)
+    if w <= 0 or h <= 0:
+        return 0.0
+    intersection = w * h
+    return intersection / (a.width * a.height + b.width * b.height - intersection)
+
+
+class Track:
+    """State of one followed symbol"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, symbol, gray):
+        self.id = next(self._ids)
+        self.lost = 0
+        self.refresh(symbol, gray)
+
+    def refresh(self, symbol, gray):
+        """Adopt a fresh decode of this symbol and re-seed its features"""
+        self.data = symbol.data
+        self.type = symbol.type
+        self.polygon = np.float32([(p[0], p[1]) for p in symbol.polygon]).reshape(-1, 2)
+        if len(self.polygon) < 3:
+            # Backends that only report a rect
+            x, y, w, h = symbol.rect
+            self.polygon = np.float32([(x, y), (x + w, y), (x + w, y + h), (x, y + h)])
+        self.confidence = 1.0
+        self.lost = 0
+        mask = np.zeros(gray.shape[:2], np.uint8)
+        cv2.fillPoly(mask, [self.polygon.astype(np.int32)], 255)
+        self.points = cv2.goodFeaturesToTrack(gray, MAX_FEATURES, 0.01, 3, mask=mask)
+        self.seeded = 0 if self.points is None else len(self.points)
+
+    def follow(self, prev_gray, gray):
+        """Move the polygon with the features' motion; updates confidence"""
+        if self.points is None or self.seeded < 3:
+            self.confidence = 0.0
+            return
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, self.points, None,
+                                                    **_lk_params())
+        good = status.reshape(-1) == 1
+        if good.sum() < 3:
+            self.confidence = 0.0
+            return
+        matrix, inliers = cv2.estimateAffinePartial2D(self.points[good], moved[good])
+        if matrix is None:
+            self.confidence = 0.0
+            return
+        self.polygon = cv2.transform(self.polygon.reshape(-1, 1, 2), matrix).reshape(-1, 2)
+        self.points = moved[good].reshape(-1, 1, 2)
+        self.confidence = float(inliers.sum()) / self.seeded
+
+    def bounds(self, shape, margin=0.0):
+        """Padded (x, y, w, h) of the polygon, clipped to a frame of `shape`"""
+        x, y, w, h = cv2.boundingRect(self.polygon.astype(np.int32))
+        pad_x, pad_y = int(w * margin), int(h * margin)
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1, y1 = min(shape[1], x + w + pad_x), min(shape[0], y + h + pad_y)
+        return x0, y0, max(0, x1 - x0), max(0, y1 - y0)
+
+    def covers(self, region):
+        cx = region.x + region.width / 2
+        cy = region.y + region.height / 2
+        return cv2.pointPolygonTest(self.polygon.reshape(-1, 1, 2), (cx, cy), False) >= 0
+
+    def as_symbol(self, decoded):
+        polygon = [(int(round(x)), int(round(y))) for x, y in self.polygon]
+        return TrackedSymbol(self.id, self.data, self.type, polygon,
+                             round(self.confidence, 2), decoded)
+
+
+class SymbolTracker:
+    """
+    Follows decoded symbols through consecutive frames
+
+    Frames must be passed in order, so use one tracker per stream (and a
+    single stream worker).
+
+    Args:
+        decode_frame: Callable (image) -> list of pyzbar-shaped symbols,
+            e.g. stream.frame_decoder('QRCODE')
+        min_confidence: Re-decode a track when its confidence drops below this
+        localize_every: Look for new regions every n frames (also while
+            nothing is followed yet)
+        full_decode_every: Also decode the whole frame every n frames
+            (None = only decode regions localization points at)
+    """
+
+    def __init__(self, decode_frame, min_confidence=MIN_CONFIDENCE,
+                 localize_every=LOCALIZE_EVERY, full_decode_every=None):
+        self.decode_frame = decode_frame
+        self.min_confidence = min_confidence
+        self.localize_every = localize_every
+        self.full_decode_every = full_decode_every
+        self.tracks = []
+        self.frames = 0
+        self.decodes = 0
+        self._prev_gray = None
+        self._failed = []
+
+    def _decode(self, frame, region=None):
+        """Decode `frame` or the (x, y, w, h) `region` of it, in frame coordinates"""
+        self.decodes += 1
+        if region is None:
+            return self.decode_frame(frame)
+        x, y, w, h = region
+        if w == 0 or h == 0:
+            return []
+        crop = np.ascontiguousarray(frame[y:y + h, x:x + w])
+        return shift_result(list(self.decode_frame(crop)), (x, y))
+
+    def _recently_failed(self, region):
+        return any(_iou(region, failed) >= FAILED_IOU for failed, _ in self._failed)
+
+    def _decode_region(self, frame, region, gray, decoded_ids):
+        """Decode a localized region unless it failed recently; remember failures"""
+        if self._recently_failed(region):
+            return
+        symbols = self._decode(frame, region)
+        if symbols:
+            self._adopt(symbols, gray, decoded_ids)
+        else:
+            self._failed.append((region, self.frames + FAILED_FRAMES))
+
+    def _adopt(self, symbols, gray, decoded_ids):
+        for symbol in symbols:
+            track = next((t for t in self.tracks if t.data == symbol.data), None)
+            if track is None:
+                track = Track(symbol, gray)
+                self.tracks.append(track)
+            else:
+                track.refresh(symbol, gray)
+            decoded_ids.add(track.id)
+
+    def update(self, frame):
+        """
+        Process the next frame
+
+        Returns:
+            List of TrackedSymbol for the symbols visible in `frame`
+        """
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        decoded_ids = set()
+
+        if self._prev_gray is not None:
+            for track in self.tracks:
+                track.follow(self._prev_gray, gray)
+
+        # Tracks that lost confidence: decode just around them
+        for track in list(self.tracks):
+            if track.confidence >= self.min_confidence:
+                continue
+            symbols = self._decode(frame, track.bounds(gray.shape, REDECODE_MARGIN))
+            if symbols:
+                self._adopt(symbols, gray, decoded_ids)
+            if track.id not in decoded_ids:
+                track.lost += 1
+                if track.lost >= MAX_LOST:
+                    self.tracks.remove(track)
+
+        self._failed = [(region, until) for region, until in self._failed if until > self.frames]
+        if self.full_decode_every and self.frames % self.full_decode_every == 0:
+            self._adopt(self._decode(frame), gray, decoded_ids)
+        elif self.frames % self.localize_every == 0:
+            # New symbols show up as regions no track covers; with nothing
+            # followed yet, the whole frame if localization finds nothing
+            regions = find_regions(gray)
+            for region in regions:
+                if not any(track.covers(region) for track in self.tracks):
+                    self._decode_region(frame, region, gray, decoded_ids)
+            if not regions and not self.tracks:
+                self._adopt(self._decode(frame), gray, decoded_ids)
+
+        self._prev_gray = gray
+        self.frames += 1
+        return [track.as_symbol(track.id in decoded_ids) for track in self.tracks
+                if track.lost == 0]
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'decodes': self.decodes,
+            'tracks': len(self.tracks),
+            'decodes_per_frame': round(self.decodes / self.frames, 3) if self.frames else 0.0,
+        }
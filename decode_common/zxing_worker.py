@@ -0,0 +1,355 @@
+"""
+ZXing Worker Pool
+Keeps long-lived ZXing JVM processes (ZXingWorker.java over the bundled
+core/javase JARs) and sends them image bytes over a pipe, instead of
+starting `java ... CommandLineRunner` for every image
+"""
+
+import atexit
+import json
+import os
+import queue
+import struct
+import subprocess
+import threading
+import time
+
+from decode_common.trace import span
+
+JAVASE_JAR = "javase-3.5.0.jar"
+CORE_JAR = "core-3.5.0.jar"
+
+WORKER_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ZXingWorker.java")
+BUILD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "build")
+
+# Seconds allowed for JVM startup before a worker is considered broken
+STARTUP_TIMEOUT = 30
+
+
+# jar_dir -> why the worker class could not be compiled; javac is not run
+# again in this process
+_compile_errors = {}
+
+
+class ZXingWorkerError(Exception):
+    """Raised when a worker cannot be started or stops responding"""
+
+
+class ZXingStartupError(ZXingWorkerError):
+    """Raised when no worker can be started (no JDK, missing JARs, JVM failing at startup)"""
+
+
+def jar_classpath(jar_dir):
+    """ZXing JAR paths in `jar_dir`, raising ZXingWorkerError if any is missing"""
+    jars = [os.path.join(jar_dir, jar) for jar in (JAVASE_JAR, CORE_JAR)]
+    missing = [jar for jar in jars if not os.path.exists(jar)]
+    if missing:
+        raise ZXingStartupError(f"ZXing JAR files not found: {', '.join(missing)}")
+    return jars
+
+
+def compile_worker(jar_dir):
+    """
+    Compile ZXingWorker.java into BUILD_DIR if the class is missing or stale
+
+    Raises:
+        ZXingStartupError: javac is missing or failed (remembered for the
+            rest of the process, so it is not retried for every image)
+    """
+    class_file = os.path.join(BUILD_DIR, "ZXingWorker.class")
+    if (os.path.exists(class_file)
+            and os.path.getmtime(class_file) >= os.path.getmtime(WORKER_SOURCE)):
+        return BUILD_DIR
+    if jar_dir in _compile_errors:
+        raise ZXingStartupError(_compile_errors[jar_dir])
+
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    classpath = os.pathsep.join(jar_classpath(jar_dir))
+    # Target Java 8 so the class also runs on the JRE 8 Docker image
+    base = ["javac", "-cp", classpath, "-d", BUILD_DIR, WORKER_SOURCE]
+    try:
+        result = subprocess.run(base[:1] + ["--release", "8"] + base[1:],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            # javac 8 does not know --release
+            result = subprocess.run(base, capture_output=True, text=True)
+    except FileNotFoundError:
+        _compile_errors[jar_dir] = "javac not found; a JDK is needed to build the ZXing worker"
+        raise ZXingStartupError(_compile_errors[jar_dir])
+    if result.returncode != 0:
+        _compile_errors[jar_dir] = f"Could not compile ZXing worker: {result.stderr.strip()}"
+        raise ZXingStartupError(_compile_errors[jar_dir])
+    return BUILD_DIR
+
+
+def local_worker_command(jar_dir):
+    """Command that starts one ZXing worker on the local JVM"""
+    build_dir = compile_worker(jar_dir)
+    classpath = os.pathsep.join(jar_classpath(jar_dir) + [build_dir])
+    return ["java", "-cp", classpath, "ZXingWorker"]
+
+
+class LocalRunner:
+    """Starts ZXing workers on the local JVM"""
+
+    def __init__(self, jar_dir):
+        self.jar_dir = jar_dir
+        self._command = None
+
+    def start(self):
+        if self._command is None:
+            self._command = local_worker_command(self.jar_dir)
+        return ZXingWorker(self._command)
+
+
+class ZXingWorker:
+    """
+    One running ZXing worker process
+
+    Args:
+        command: Command line that starts a process speaking the worker protocol
+        cleanup: Optional callable run after the process is stopped (e.g. to
+            remove a container that outlives its client process)
+    """
+
+    def __init__(self, command, cleanup=None):
+        self.command = command
+        self.cleanup = cleanup
+        self.jobs = 0
+        self.last_used = time.monotonic()
+        try:
+            self._process = subprocess.Popen(
+                command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except FileNotFoundError as e:
+            raise ZXingStartupError(f"Could not start ZXing worker: {e}")
+
+        # Reading happens on a thread so timeouts also work for pipes on Windows
+        self._lines = queue.Queue()
+        self._reader = threading.Thread(target=self._read_lines, daemon=True)
+        self._reader.start()
+
+        try:
+            ready = self._response(STARTUP_TIMEOUT)
+        except ZXingWorkerError as e:
+            raise ZXingStartupError(str(e))
+        if not ready.get("ready"):
+            self.close()
+            raise ZXingStartupError(f"Unexpected worker handshake: {ready}")
+
+    def _read_lines(self):
+        for line in self._process.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def _response(self, timeout):
+        try:
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            self.close()
+            raise ZXingWorkerError(f"ZXing worker did not answer within {timeout} s")
+        if line is None:
+            self.close()
+            raise ZXingWorkerError("ZXing worker exited")
+        return json.loads(line.decode('utf-8'))
+
+    def _request(self, payload, timeout):
+        try:
+            self._process.stdin.write(struct.pack(">i", len(payload)) + payload)
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            self.close()
+            raise ZXingWorkerError(f"ZXing worker is gone: {e}")
+        return self._response(timeout)
+
+    @property
+    def alive(self):
+        return self._process.poll() is None
+
+    def ping(self, timeout=5):
+        """Health check; returns True if the worker answers"""
+        try:
+            return bool(self._request(b"", timeout).get("pong"))
+        except ZXingWorkerError:
+            return False
+
+    def decode_bytes(self, data, timeout=10):
+        """
+        Decode an encoded image (PNG, JPEG, ...)
+
+        Returns:
+            List of {'format', 'text', 'points'} dicts (empty if nothing found)
+
+        Raises:
+            ValueError: The worker could not read the image
+            ZXingWorkerError: The worker died or timed out
+        """
+        if not data:
+            raise ValueError("Empty image data")
+        response = self._request(data, timeout)
+        self.jobs += 1
+        self.last_used = time.monotonic()
+        if not response.get("ok"):
+            # The worker is fine, the image is not
+            raise ValueError(response.get("error", "Unknown ZXing error"))
+        return response["results"]
+
+    def close(self):
+        if self.alive:
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=2)
+            except Exception:
+                self._process.kill()
+        if self.cleanup is not None:
+            cleanup, self.cleanup = self.cleanup, None
+            try:
+                cleanup()
+            except Exception:
+                pass
+
+
+class ZXingWorkerPool:
+    """
+    A fixed-size pool of ZXing workers
+
+    Workers are started lazily (or up front with `warm`); a worker that
+    fails or times out is discarded and replaced on the next request.
+
+    Args:
+        runner: Object whose start() returns a new ZXingWorker
+            (LocalRunner, container_pool.DockerRunner, container_pool.FakeRunner)
+        size: Maximum number of concurrent workers
+        max_jobs: Recycle a worker after this many images (None = never)
+        health_interval: Ping a worker that has been idle for this many
+            seconds before handing it out (None = never)
+    """
+
+    def __init__(self, runner, size=2, max_jobs=None, health_interval=None):
+        self.runner = runner
+        self.size = size
+        self.max_jobs = max_jobs
+        self.health_interval = health_interval
+        self._idle = queue.Queue()
+        self._slots = threading.Semaphore(size)
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def _start(self):
+        worker = self.runner.start()
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _discard(self, worker):
+        worker.close()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+
+    def _usable(self, worker):
+        if not worker.alive:
+            return False
+        if (self.health_interval is not None
+                and time.monotonic() - worker.last_used > self.health_interval):
+            return worker.ping()
+        return True
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._start()
+                if self._usable(worker):
+                    return worker
+                self._discard(worker)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, worker, healthy):
+        recycle = self.max_jobs is not None and worker.jobs >= self.max_jobs
+        if healthy and not recycle and worker.alive:
+            self._idle.put(worker)
+        else:
+            self._discard(worker)
+        self._slots.release()
+
+    def warm(self):
+        """Start workers until the pool holds `size` of them"""
+        with self._lock:
+            missing = self.size - len(self._workers)
+        for _ in range(missing):
+            self._idle.put(self._start())
+
+    def check_health(self):
+        """Ping every idle worker, drop the ones that do not answer; returns the healthy count"""
+        healthy = []
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker.alive and worker.ping():
+                healthy.append(worker)
+            else:
+                self._discard(worker)
+        for worker in healthy:
+            self._idle.put(worker)
+        return len(healthy)
+
+    def decode_bytes(self, data, timeout=10):
+        worker = self._acquire()
+        healthy = True
+        try:
+            with span("zxing worker", "external"):
+                return worker.decode_bytes(data, timeout)
+        except ZXingWorkerError:
+            healthy = False
+            raise
+        finally:
+            self._release(worker, healthy)
+
+    def decode_file(self, image_path, timeout=10):
+        with open(image_path, 'rb') as f:
+            return self.decode_bytes(f.read(), timeout)
+
+    def close(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_shared_pools = {}
+_shared_lock = threading.Lock()
+
+
+def shared_pool(jar_dir, size=2):
+    """Process-wide pool for `jar_dir`, closed automatically at exit"""
+    key = os.path.abspath(jar_dir)
+    with _shared_lock:
+        if key not in _shared_pools:
+            _shared_pools[key] = ZXingWorkerPool(LocalRunner(key), size=size)
+        return _shared_pools[key]
+
+
+@atexit.register
+def _close_shared_pools():
+    for pool in _shared_pools.values():
+        pool.close()
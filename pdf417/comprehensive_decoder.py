@@ -3,19 +3,40 @@ Comprehensive PDF417 Barcode Decoder
 Uses multiple decoding libraries and preprocessing techniques
 """
 
-import cv2
-import numpy as np
-from pyzbar.pyzbar import decode
-from PIL import Image
+from functools import partial
+import argparse
+import json
 import sys
 import os
 import subprocess
+import time
 
-def decode_with_pyzbar_pil(image_path):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from decode_common.image_context import ImageContext
+from decode_common.cascade import estimated_costs, run_cascade, DEFAULT_WORKERS
+from decode_common.method_stats import MethodStats
+from decode_common.zxing_worker import shared_pool, ZXingStartupError, ZXingWorkerError
+from decode_common.result_cache import default_cache
+from decode_common.symbologies import PROFILES, parse_symbols, zbar_decode
+from decode_common.localize import localized_methods
+from decode_common.pyramid import pyramid_methods
+from decode_common.deadline import deadline_of, gave_up, GaveUp
+from decode_common.prefilter import DEFAULT_THRESHOLD as PREFILTER_THRESHOLD, screen, shorten
+from decode_common.lazy import report_at_exit
+from decode_common.trace import span, traced, trace_to
+from decode_common.result import FORMATS, cascade_results, silenced, timings_since, write_results
+
+# Part of the cache key; bump when the cascade changes what it can find
+CACHE_CONFIG = "pdf417/v1"
+
+def decode_with_pyzbar_pil(image_path, symbols=PROFILES['pdf417']):
     """Decode using pyzbar with PIL"""
     try:
-        img = Image.open(image_path)
-        decoded_objects = decode(img)
+        ctx = ImageContext.of(image_path)
+        if ctx.image is None:
+            return False, "Failed to load image"
+        
+        decoded_objects = zbar_decode(ctx.pil, symbols)
         
         if decoded_objects:
             results = []
@@ -32,14 +53,14 @@ def decode_with_pyzbar_pil(image_path):
         return False, str(e)
     return False, "No barcode found"
 
-def decode_with_opencv_pyzbar(image_path):
+def decode_with_opencv_pyzbar(image_path, symbols=PROFILES['pdf417']):
     """Decode using OpenCV with pyzbar"""
     try:
-        img = cv2.imread(image_path)
-        if img is None:
+        ctx = ImageContext.of(image_path)
+        if ctx.image is None:
             return False, "Failed to load image"
         
-        decoded_objects = decode(img)
+        decoded_objects = zbar_decode(ctx.image, symbols)
         
         if decoded_objects:
             results = []
@@ -55,15 +76,14 @@ def decode_with_opencv_pyzbar(image_path):
         return False, str(e)
     return False, "No barcode found"
 
-def decode_with_grayscale(image_path):
+def decode_with_grayscale(image_path, symbols=PROFILES['pdf417']):
     """Decode using grayscale conversion"""
     try:
-        img = cv2.imread(image_path)
-        if img is None:
+        ctx = ImageContext.of(image_path)
+        if ctx.image is None:
             return False, "Failed to load image"
         
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        decoded_objects = decode(gray)
+        decoded_objects = zbar_decode(ctx.gray, symbols)
         
         if decoded_objects:
             results = []
@@ -78,17 +98,14 @@ def decode_with_grayscale(image_path):
         return False, str(e)
     return False, "No barcode found"
 
-def decode_with_binary_threshold(image_path):
+def decode_with_binary_threshold(image_path, symbols=PROFILES['pdf417']):
     """Decode using binary thresholding"""
     try:
-        img = cv2.imread(image_path)
-        if img is None:
+        ctx = ImageContext.of(image_path)
+        if ctx.image is None:
             return False, "Failed to load image"
         
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
-        
-        decoded_objects = decode(binary)
+        decoded_objects = zbar_decode(ctx.binary, symbols)
         
         if decoded_objects:
             results = []
@@ -103,17 +120,14 @@ def decode_with_binary_threshold(image_path):
         return False, str(e)
     return False, "No barcode found"
 
-def decode_with_otsu_threshold(image_path):
+def decode_with_otsu_threshold(image_path, symbols=PROFILES['pdf417']):
     """Decode using Otsu's thresholding"""
     try:
-        img = cv2.imread(image_path)
-        if img is None:
+        ctx = ImageContext.of(image_path)
+        if ctx.image is None:
             return False, "Failed to load image"
         
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        _, otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        
-        decoded_objects = decode(otsu)
+        decoded_objects = zbar_decode(ctx.otsu, symbols)
         
         if decoded_objects:
             results = []
@@ -128,20 +142,14 @@ def decode_with_otsu_threshold(image_path):
         return False, str(e)
     return False, "No barcode found"
 
-def decode_with_adaptive_threshold(image_path):
+def decode_with_adaptive_threshold(image_path, symbols=PROFILES['pdf417']):
     """Decode using adaptive thresholding"""
     try:
-        img = cv2.imread(image_path)
-        if img is None:
+        ctx = ImageContext.of(image_path)
+        if ctx.image is None:
             return False, "Failed to load image"
         
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        adaptive = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-            cv2.THRESH_BINARY, 11, 2
-        )
-        
-        decoded_objects = decode(adaptive)
+        decoded_objects = zbar_decode(ctx.adaptive, symbols)
         
         if decoded_objects:
             results = []
@@ -156,17 +164,14 @@ def decode_with_adaptive_threshold(image_path):
         return False, str(e)
     return False, "No barcode found"
 
-def decode_with_contrast_enhancement(image_path):
+def decode_with_contrast_enhancement(image_path, symbols=PROFILES['pdf417']):
     """Decode using histogram equalization"""
     try:
-        img = cv2.imread(image_path)
-        if img is None:
+        ctx = ImageContext.of(image_path)
+        if ctx.image is None:
             return False, "Failed to load image"
         
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        enhanced = cv2.equalizeHist(gray)
-        
-        decoded_objects = decode(enhanced)
+        decoded_objects = zbar_decode(ctx.equalized, symbols)
         
         if decoded_objects:
             results = []
@@ -181,18 +186,14 @@ def decode_with_contrast_enhancement(image_path):
         return False, str(e)
     return False, "No barcode found"
 
-def decode_with_clahe(image_path):
+def decode_with_clahe(image_path, symbols=PROFILES['pdf417']):
     """Decode using CLAHE (Contrast Limited Adaptive Histogram Equalization)"""
     try:
-        img = cv2.imread(image_path)
-        if img is None:
+        ctx = ImageContext.of(image_path)
+        if ctx.image is None:
             return False, "Failed to load image"
         
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-        enhanced = clahe.apply(gray)
-        
-        decoded_objects = decode(enhanced)
+        decoded_objects = zbar_decode(ctx.clahe, symbols)
         
         if decoded_objects:
             results = []
@@ -207,20 +208,14 @@ def decode_with_clahe(image_path):
         return False, str(e)
     return False, "No barcode found"
 
-def decode_with_rotation(image_path, angle):
+def decode_with_rotation(image_path, angle, symbols=PROFILES['pdf417']):
     """Decode by rotating the image"""
     try:
-        img = cv2.imread(image_path)
-        if img is None:
+        ctx = ImageContext.of(image_path)
+        if ctx.image is None:
             return False, "Failed to load image"
         
-        (h, w) = img.shape[:2]
-        center = (w // 2, h // 2)
-        M = cv2.getRotationMatrix2D(center, angle, 1.0)
-        rotated = cv2.warpAffine(img, M, (w, h))
-        
-        gray = cv2.cvtColor(rotated, cv2.COLOR_BGR2GRAY)
-        decoded_objects = decode(gray)
+        decoded_objects = zbar_decode(ctx.rotated_gray(angle), symbols)
         
         if decoded_objects:
             results = []
@@ -236,11 +231,58 @@ def decode_with_rotation(image_path, angle):
         return False, str(e)
     return False, "No barcode found"
 
-def decode_with_zxing_java(image_path):
-    """Decode using ZXing Java library"""
-    javase_jar = "javase-3.5.0.jar"
-    core_jar = "core-3.5.0.jar"
-    jcommander_jar = "jcommander-1.82.jar"
+def decode_with_deskew(image_path, symbols=PROFILES['pdf417']):
+    """Decode after straightening the image by its estimated skew"""
+    try:
+        ctx = ImageContext.of(image_path)
+        if ctx.image is None:
+            return False, "Failed to load image"
+        
+        deskewed = ctx.deskewed
+        if deskewed is None:
+            return False, f"No skew to correct ({ctx.skew.angle:g}°)"
+        
+        decoded_objects = zbar_decode(deskewed, symbols)
+        
+        if decoded_objects:
+            results = []
+            for obj in decoded_objects:
+                results.append({
+                    'type': obj.type,
+                    'data': obj.data.decode('utf-8'),
+                    'quality': obj.quality,
+                    'rotation': -ctx.skew.angle
+                })
+            return True, results
+    except Exception as e:
+        return False, str(e)
+    return False, "No barcode found"
+
+def decode_with_zxing_java(image_path, timeout=10):
+    """Decode using ZXing Java library (`timeout` in seconds)"""
+    jar_dir = os.path.dirname(os.path.abspath(__file__))
+    
+    # Preferred: a long-lived ZXing worker, so the JVM only starts once
+    try:
+        barcodes = shared_pool(jar_dir).decode_file(image_path, timeout=timeout)
+        if not barcodes:
+            return False, "No barcode found with ZXing"
+        return True, [{'type': barcode['format'],
+                       'data': barcode['text'],
+                       'polygon': barcode['points']} for barcode in barcodes]
+    except ZXingStartupError:
+        pass
+    except ZXingWorkerError as e:
+        # Timed out or died on this image: a second JVM would get the same
+        # timeout again and overrun the budget
+        return False, str(e)
+    except Exception as e:
+        return False, str(e)
+    
+    # Fallback: one CommandLineRunner process (no JDK to build the worker)
+    javase_jar = os.path.join(jar_dir, "javase-3.5.0.jar")
+    core_jar = os.path.join(jar_dir, "core-3.5.0.jar")
+    jcommander_jar = os.path.join(jar_dir, "jcommander-1.82.jar")
     
     # Check if JAR files exist
     if not all(os.path.exists(jar) for jar in [javase_jar, core_jar, jcommander_jar]):
@@ -249,12 +291,13 @@ def decode_with_zxing_java(image_path):
     try:
         command = [
             "java", "-cp",
-            f"{javase_jar};{core_jar};{jcommander_jar}",
+            os.pathsep.join([javase_jar, core_jar, jcommander_jar]),
             "com.google.zxing.client.j2se.CommandLineRunner",
             image_path
         ]
         
-        result = subprocess.run(command, capture_output=True, text=True, timeout=10)
+        with span("zxing java", "external"):
+            result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
         
         if result.returncode == 0 and "No barcode found" not in result.stdout:
             return True, result.stdout
@@ -263,32 +306,32 @@ def decode_with_zxing_java(image_path):
     except Exception as e:
         return False, str(e)
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python comprehensive_decoder.py <image_path>")
-        sys.exit(1)
-    
-    image_path = sys.argv[1]
-    
-    if not os.path.exists(image_path):
-        print(f"Error: Image file '{image_path}' not found!")
-        sys.exit(1)
-    
-    print("=" * 80)
-    print("COMPREHENSIVE PDF417 BARCODE DECODER")
-    print("=" * 80)
-    print(f"Image: {image_path}")
-    
-    # Get image info
-    try:
-        img = cv2.imread(image_path)
-        if img is not None:
-            print(f"Image size: {img.shape}")
-    except:
-        pass
+def print_success(method_name, result):
+    """Display a successful result and save the decoded text"""
+    print(f"\n{'='*80}")
+    print(f"✓ SUCCESS! Decoded with: {method_name}")
+    print(f"{'='*80}")
     
-    print("=" * 80)
+    if isinstance(result, list):
+        for obj in result:
+            print(f"\nType: {obj['type']}")
+            print(f"Data: {obj['data']}")
+            if 'quality' in obj:
+                print(f"Quality: {obj['quality']}")
+            if 'rotation' in obj:
+                print(f"Rotation: {obj['rotation']}°")
+            
+            # Save to file
+            with open("decoded_pdf417.txt", "w", encoding='utf-8') as f:
+                f.write(obj['data'])
+            print(f"\n✓ Decoded text saved to 'decoded_pdf417.txt'")
+    else:
+        print(result)
     
+    print(f"{'='*80}")
+
+def build_methods(ctx, symbols=PROFILES['pdf417']):
+    """Preprocessing cascade for one image (or candidate crop); deskew and rotations come last"""
     methods = [
         ("pyzbar with PIL", decode_with_pyzbar_pil),
         ("OpenCV with pyzbar", decode_with_opencv_pyzbar),
@@ -299,68 +342,175 @@ def main():
         ("Contrast enhancement", decode_with_contrast_enhancement),
         ("CLAHE enhancement", decode_with_clahe),
     ]
+    cascade = [(name, partial(func, ctx, symbols)) for name, func in methods]
+    # One deskew by the estimated angle; right angles are exact transposes
+    cascade.append(("Deskew", partial(decode_with_deskew, ctx, symbols)))
+    cascade += [(f"{angle}° rotation", partial(decode_with_rotation, ctx, angle, symbols))
+                for angle in [90, 180, 270]]
+    return cascade
+
+def build_level_methods(ctx, symbols=PROFILES['pdf417']):
+    """Cheap thresholding methods for a rescaled pyramid level"""
+    methods = [
+        ("OpenCV with pyzbar", decode_with_opencv_pyzbar),
+        ("Grayscale conversion", decode_with_grayscale),
+        ("Binary threshold", decode_with_binary_threshold),
+        ("Otsu's threshold", decode_with_otsu_threshold),
+        ("Adaptive threshold", decode_with_adaptive_threshold),
+    ]
+    return [(name, partial(func, ctx, symbols)) for name, func in methods]
+
+@traced()
+def decode_pdf417(image_path, workers=DEFAULT_WORKERS, stats=None, cache=None,
+                  symbols=PROFILES['pdf417'], localize=True, pyramid=True, deadline=None,
+                  prefilter=PREFILTER_THRESHOLD):
+    """
+    Run the full PDF417 cascade (preprocessing methods, rotations, ZXing)
     
-    # Try all methods
-    for idx, (method_name, method_func) in enumerate(methods, 1):
-        print(f"\n[{idx}] Trying: {method_name}...")
-        success, result = method_func(image_path)
-        
-        if success:
-            print(f"\n{'='*80}")
-            print(f"✓ SUCCESS! Decoded with: {method_name}")
-            print(f"{'='*80}")
-            
-            if isinstance(result, list):
-                for obj in result:
-                    print(f"\nType: {obj['type']}")
-                    print(f"Data: {obj['data']}")
-                    if 'quality' in obj:
-                        print(f"Quality: {obj['quality']}")
-                    
-                    # Save to file
-                    with open("decoded_pdf417.txt", "w", encoding='utf-8') as f:
-                        f.write(obj['data'])
-                    print(f"\n✓ Decoded text saved to 'decoded_pdf417.txt'")
-            else:
-                print(result)
-            
-            print(f"{'='*80}")
-            return
+    Args:
+        image_path: Path to the image file
+        workers: Threads used for the preprocessing cascade (1 = sequential)
+        stats: Optional MethodStats used to order the cascade
+        cache: ResultCache to consult first (default: the shared cache,
+            False disables caching)
+        symbols: Symbologies zbar scans for (see decode_common.symbologies)
+        localize: Decode candidate regions of large images before the full frame
+        pyramid: Decode at the scale matching the estimated module size first
+        deadline: Latency budget in ms (or a Deadline); methods that would
+            overrun it are skipped
+        prefilter: Code-likelihood threshold below which the cascade is
+            shortened or skipped (see decode_common.prefilter; 0 disables)
     
-    # Try rotations
-    print(f"\n[{len(methods)+1}] Trying with rotations...")
-    for angle in [90, 180, 270]:
-        print(f"  Rotating {angle}°...")
-        success, result = decode_with_rotation(image_path, angle)
-        if success:
-            print(f"\n{'='*80}")
-            print(f"✓ SUCCESS! Decoded with {angle}° rotation")
-            print(f"{'='*80}")
-            
-            if isinstance(result, list):
-                for obj in result:
-                    print(f"\nType: {obj['type']}")
-                    print(f"Data: {obj['data']}")
-                    
-                    # Save to file
-                    with open("decoded_pdf417.txt", "w", encoding='utf-8') as f:
-                        f.write(obj['data'])
-                    print(f"\n✓ Decoded text saved to 'decoded_pdf417.txt'")
-            
-            print(f"{'='*80}")
-            return
+    Returns:
+        (method_name, results), (None, GaveUp) if the budget ran out, or
+        (None, None) if every method failed (or the pre-filter skipped it)
+    """
+    deadline = deadline_of(deadline)
+    cache = default_cache() if cache is None else cache
+    if cache:
+        cache_key = cache.key_for_file(image_path, f"{CACHE_CONFIG}:{','.join(symbols)}")
+        cached = cache.get(cache_key)
+        if cached:
+            return f"result cache ({cached['method']})", cached['results']
     
-    # Try ZXing
-    print(f"\n[{len(methods)+2}] Trying with ZXing Java library...")
-    success, result = decode_with_zxing_java(image_path)
-    if success:
-        print(f"\n{'='*80}")
-        print(f"✓ SUCCESS! Decoded with ZXing")
-        print(f"{'='*80}")
-        print(result)
-        print(f"{'='*80}")
+    # Load the image once; every method below reads from this context
+    ctx = ImageContext(image_path)
+    try:
+        if ctx.image is not None:
+            print(f"Image size: {ctx.shape}")
+    except:
+        pass
+    
+    print("=" * 80)
+    
+    action = screen(ctx, prefilter) if ctx.image is not None else "decode"
+    if action == "skip":
+        return None, None
+    
+    # On large photos every method also runs on candidate crops first;
+    # each crop (or the full frame) is decoded at its best scale first
+    def build(c):
+        if pyramid:
+            return pyramid_methods(c, lambda level: build_methods(level, symbols),
+                                   build_level=lambda level: build_level_methods(level, symbols))
+        return build_methods(c, symbols)
+    
+    if action == "shorten":
+        cascade = shorten(build_methods(ctx, symbols))
+    else:
+        cascade = localized_methods(ctx, build) if localize else build(ctx)
+    
+    # run_cascade() applies the learned (or pinned) order of `stats`
+    print(f"\n[1-{len(cascade)}] Trying {len(cascade)} preprocessing methods "
+          f"({workers} worker(s){', learned order' if stats is not None else ''})...")
+    for idx, (method_name, _) in enumerate(cascade, 1):
+        print(f"  [{idx}] {method_name}")
+    
+    method_name, result = run_cascade(cascade, workers=workers, stats=stats, deadline=deadline,
+                                      costs=estimated_costs(ctx))
+    if stats is not None:
+        stats.save()
+    
+    if not method_name and not isinstance(result, GaveUp) and action == "decode":
+        if deadline is not None and deadline.expired:
+            return None, gave_up(deadline, "ZXing", [name for name, _ in cascade], [])
+        # Try ZXing
+        print(f"\n[{len(cascade)+1}] Trying with ZXing Java library...")
+        timeout = deadline.timeout(10) if deadline is not None else 10
+        success, result = decode_with_zxing_java(image_path, timeout=timeout)
+        method_name = "ZXing" if success else None
+    
+    if method_name and cache and isinstance(result, list):
+        # Round-trip through JSON so memory and disk hits look the same
+        result = json.loads(json.dumps(result))
+        cache.put(cache_key, {'method': method_name, 'results': result})
+    
+    return method_name, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Comprehensive PDF417 barcode decoder")
+    parser.add_argument("image_path", help="Path to the image file")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Threads used for the preprocessing cascade (1 = sequential)")
+    parser.add_argument("--stats-file",
+                        help="JSON file used to learn the method order from past results")
+    parser.add_argument("--symbols", type=parse_symbols, default=PROFILES['pdf417'],
+                        help="Comma-separated zbar symbologies or profile names (default: pdf417)")
+    parser.add_argument("--no-localize", action="store_true",
+                        help="Always decode the full frame (skip candidate-region crops)")
+    parser.add_argument("--no-pyramid", action="store_true",
+                        help="Decode at native resolution only")
+    parser.add_argument("--budget-ms", type=float,
+                        help="Latency budget per image; slower methods are skipped")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Print backend import timings on exit")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Write a Chrome trace of every stage to FILE and print stage timings")
+    parser.add_argument("--prefilter-threshold", type=float, default=PREFILTER_THRESHOLD,
+                        help="Skip or shorten the cascade on images scoring below this "
+                             "code likelihood (0 disables)")
+    parser.add_argument("--format", choices=FORMATS, default="text",
+                        help="jsonl/csv: one record per symbol on stdout, no report or text file")
+    args = parser.parse_args()
+    
+    if args.startup_report:
+        report_at_exit()
+    if args.trace:
+        trace_to(args.trace)
+    
+    image_path = args.image_path
+    stats = MethodStats(args.stats_file, "PDF417") if args.stats_file else None
+    decode = partial(decode_pdf417, image_path, workers=args.workers, stats=stats,
+                     symbols=args.symbols, localize=not args.no_localize,
+                     pyramid=not args.no_pyramid, deadline=args.budget_ms,
+                     prefilter=args.prefilter_threshold)
+    
+    if args.format != "text":
+        start = time.perf_counter()
+        with silenced():
+            method_name, result = decode() if os.path.exists(image_path) else (None, None)
+        results = (cascade_results(method_name, result, 'PDF417', image_path, timings_since(start))
+                   if method_name else [])
+        write_results(results, args.format)
+        sys.exit(0 if results else 1)
+    
+    if not os.path.exists(image_path):
+        print(f"Error: Image file '{image_path}' not found!")
+        sys.exit(1)
+    
+    print("=" * 80)
+    print("COMPREHENSIVE PDF417 BARCODE DECODER")
+    print("=" * 80)
+    print(f"Image: {image_path}")
+    
+    method_name, result = decode()
+    if method_name:
+        print_success(method_name, result)
         return
     
+    if isinstance(result, GaveUp):
+        print(f"\n⏱️ Time budget exhausted: {result}")
+    
     # All methods failed
     print(f"\n{'='*80}")
     print("✗ DECODING FAILED")
@@ -1,142 +1,205 @@
-import cv2
+import argparse
+import os
 import sys
-from pyzbar.pyzbar import decode
-from PIL import Image
-import numpy as np
 
-if len(sys.argv) < 2:
-    print("Usage: python decode_robust.py <image_path>")
-    sys.exit(1)
-
-image_path = sys.argv[1]
-
-def try_decode(img, method_name):
-    """Try to decode an image and return results"""
-    decoded_objects = decode(img)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from decode_common.image_context import ImageContext
+from decode_common.cascade import estimated_costs, run_cascade, DEFAULT_WORKERS
+from decode_common.symbologies import PROFILES, parse_symbols, zbar_decode
+from decode_common.localize import localized_methods
+from decode_common.pyramid import pyramid_methods
+from decode_common.deadline import Deadline, GaveUp
+from decode_common.lazy import report_at_exit
+from decode_common.trace import span, trace_to
+from decode_common.prefilter import DEFAULT_THRESHOLD as PREFILTER_THRESHOLD, screen, shorten
+from decode_common.quality import describe, features_of, plan, recipe_image
+
+# Preprocessing recipes (ImageContext variants) by method name, in the
+# order they are tried without a quality policy
+RECIPES = [
+    ("original image", "image"),
+    ("grayscale", "gray"),
+    ("binary threshold", "binary"),
+    ("Otsu's threshold", "otsu"),
+    ("adaptive threshold", "adaptive"),
+    ("inverted binary", "binary_inv"),
+    ("enhanced contrast", "equalized"),
+]
+LATE_RECIPES = [("denoised", "denoised"), ("sharpened", "sharpened")]
+
+# The cheap binarizations tried on rescaled pyramid levels
+LEVEL_RECIPES = RECIPES[1:5]
+
+# Recipes the quality policy may pick that the fixed order does not try
+POLICY_ONLY_RECIPES = {"inverted": "inverted grayscale", "clahe": "CLAHE"}
+
+# Recipes tried after the quality policy's picks (those not picked), then
+# one deskew; a bounded fallback in case the analyzer misjudged the image
+FALLBACK_RECIPES = ["gray", "otsu", "adaptive"]
+
+# first: the quality policy's recipes, then FALLBACK_RECIPES; all: the
+# policy's recipes, then the whole fixed order; only: just the policy's
+# recipes; off: the fixed order
+POLICIES = ("first", "all", "only", "off")
+
+def try_decode(img, symbols=PROFILES['pdf417']):
+    """Try to decode an image and return (success, decoded objects)"""
+    if img is None:
+        return False, None
+    decoded_objects = zbar_decode(img, symbols)
     if decoded_objects:
+        return True, decoded_objects
+    return False, None
+
+def build_methods(ctx, symbols=PROFILES['pdf417'], policy="first", picks=None):
+    """
+    Preprocessing variants in preferred order
+
+    Args:
+        policy: "first" tries the recipes the quality analyzer picks for
+            this image, then a short fallback; "all" the picks, then the
+            fixed order; "only" nothing but the picks; "off" the fixed
+            order (see decode_common.quality)
+        picks: Recipes the quality policy chose, usually for the full frame
+            and reused for its crops (default: analyze `ctx`)
+    """
+    def recipe(name):
+        return lambda: recipe_image(ctx, name)
+
+    variants = [(name, recipe(r)) for name, r in RECIPES]
+    # Skewed or sideways images: one deskew by the estimated angle, then
+    # exact right-angle rotations
+    variants.append(("deskewed", lambda: ctx.deskewed))
+    for angle in [90, 180, 270]:
+        variants.append((f"rotation {angle}°", lambda angle=angle: ctx.rotated(angle)))
+    variants += [(name, recipe(r)) for name, r in LATE_RECIPES]
+
+    if policy != "off":
+        names = {r: name for name, r in RECIPES + LATE_RECIPES}
+        names.update(POLICY_ONLY_RECIPES)
+        if picks is None:
+            picks = policy_picks(ctx)
+        chosen = [(f"{names[r]} (quality policy)", recipe(r)) for r in picks]
+        if policy == "only":
+            variants = chosen
+        elif policy == "all":
+            picked = {names[r] for r in picks}
+            variants = chosen + [v for v in variants if v[0] not in picked]
+        else:
+            variants = chosen + [(names[r], recipe(r)) for r in FALLBACK_RECIPES
+                                 if r not in picks]
+            variants.append(("deskewed", lambda: ctx.deskewed))
+
+    return [(name, lambda build=build: try_decode(build(), symbols)) for name, build in variants]
+
+def policy_picks(ctx):
+    """Recipes the quality policy picks for an image, best first"""
+    return [r for _, r in plan(features_of(ctx))]
+
+def build_level_methods(ctx, symbols=PROFILES['pdf417']):
+    """Cheap binarize + zbar methods for a rescaled pyramid level"""
+    return [(name, lambda r=r: try_decode(recipe_image(ctx, r), symbols))
+            for name, r in LEVEL_RECIPES]
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF417 robust decoder")
+    parser.add_argument("image_path", help="Path to the image file")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Threads used for the preprocessing cascade (1 = sequential)")
+    parser.add_argument("--symbols", type=parse_symbols, default=PROFILES['pdf417'],
+                        help="Comma-separated zbar symbologies or profile names (default: pdf417)")
+    parser.add_argument("--no-localize", action="store_true",
+                        help="Always decode the full frame (skip candidate-region crops)")
+    parser.add_argument("--no-pyramid", action="store_true",
+                        help="Decode at native resolution only")
+    parser.add_argument("--budget-ms", type=float,
+                        help="Latency budget; methods that would overrun it are skipped")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Print backend import timings on exit")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Write a Chrome trace of every stage to FILE and print stage timings")
+    parser.add_argument("--prefilter-threshold", type=float, default=PREFILTER_THRESHOLD,
+                        help="Skip or shorten the cascade on images scoring below this "
+                             "code likelihood (0 disables)")
+    parser.add_argument("--policy", choices=POLICIES, default="first",
+                        help="Preprocessing picked from measured image quality: tried before "
+                             "a short fallback (default), before the whole fixed order, "
+                             "alone, or off for the fixed order")
+    args = parser.parse_args()
+    if args.startup_report:
+        report_at_exit()
+    if args.trace:
+        trace_to(args.trace)
+
+    print("=" * 60)
+    print("PDF417 Robust Decoder")
+    print("=" * 60)
+
+    # Load image
+    ctx = ImageContext(args.image_path)
+    if ctx.image is None:
+        print(f"Error: Could not load image {args.image_path}")
+        sys.exit(1)
+
+    print(f"Image size: {ctx.shape}")
+    # The budget covers decoding, not process start-up (the first image
+    # read also imports OpenCV)
+    deadline = Deadline(args.budget_ms) if args.budget_ms else None
+
+    action = screen(ctx, args.prefilter_threshold)
+    if action == "skip":
+        sys.exit(1)
+
+    # The full frame is analyzed once; crops and pyramid levels reuse its picks
+    picks = None
+    if args.policy != "off":
+        features = features_of(ctx)
+        chosen = plan(features)
+        print(f"Image quality: {describe(features)}")
+        print("Quality policy: " + ", ".join(f"{recipe} ({condition})"
+                                             for condition, recipe in chosen))
+        picks = [recipe for _, recipe in chosen]
+
+    # Try different preprocessing methods, on candidate regions first for
+    # large images and at the scale matching the module size first
+    def build(c):
+        if args.no_pyramid:
+            return build_methods(c, args.symbols, args.policy, picks)
+        return pyramid_methods(c, lambda level: build_methods(level, args.symbols, args.policy, picks),
+                               build_level=lambda level: build_level_methods(level, args.symbols))
+
+    if action == "shorten":
+        methods = shorten(build_methods(ctx, args.symbols, args.policy, picks))
+    else:
+        methods = build(ctx) if args.no_localize else localized_methods(ctx, build)
+    for idx, (method_name, _) in enumerate(methods, 1):
+        print(f"\n[{idx}] Trying {method_name}...")
+
+    with span("decode_robust", "decode"):
+        method_name, decoded_objects = run_cascade(methods, workers=args.workers,
+                                                   deadline=deadline, costs=estimated_costs(ctx))
+    success = method_name is not None
+
+    if success:
         print(f"\n✓ SUCCESS with {method_name}!")
         for obj in decoded_objects:
             print(f"  Type: {obj.type}")
             print(f"  Data: {obj.data.decode('utf-8', errors='ignore')}")
             print(f"  Quality: {obj.quality}")
-        return True
-    return False
-
-print("=" * 60)
-print("PDF417 Robust Decoder")
-print("=" * 60)
-
-# Load image
-img_cv = cv2.imread(image_path)
-if img_cv is None:
-    print(f"Error: Could not load image {image_path}")
-    sys.exit(1)
-
-print(f"Image size: {img_cv.shape}")
-
-# Try different preprocessing methods
-methods_tried = 0
-success = False
-
-# Method 1: Original image
-print(f"\n[{methods_tried+1}] Trying original image...")
-if try_decode(img_cv, "original image"):
-    success = True
-methods_tried += 1
-
-# Method 2: Grayscale
-if not success:
-    print(f"\n[{methods_tried+1}] Trying grayscale...")
-    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-    if try_decode(gray, "grayscale"):
-        success = True
-    methods_tried += 1
-
-# Method 3: Binary threshold
-if not success:
-    print(f"\n[{methods_tried+1}] Trying binary threshold...")
-    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-    _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
-    if try_decode(binary, "binary threshold"):
-        success = True
-    methods_tried += 1
-
-# Method 4: Otsu's threshold
-if not success:
-    print(f"\n[{methods_tried+1}] Trying Otsu's threshold...")
-    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-    _, otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    if try_decode(otsu, "Otsu's threshold"):
-        success = True
-    methods_tried += 1
-
-# Method 5: Adaptive threshold
-if not success:
-    print(f"\n[{methods_tried+1}] Trying adaptive threshold...")
-    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-    adaptive = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                     cv2.THRESH_BINARY, 11, 2)
-    if try_decode(adaptive, "adaptive threshold"):
-        success = True
-    methods_tried += 1
-
-# Method 6: Inverted binary
-if not success:
-    print(f"\n[{methods_tried+1}] Trying inverted binary...")
-    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-    _, binary_inv = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY_INV)
-    if try_decode(binary_inv, "inverted binary"):
-        success = True
-    methods_tried += 1
-
-# Method 7: Enhanced contrast
-if not success:
-    print(f"\n[{methods_tried+1}] Trying enhanced contrast...")
-    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-    enhanced = cv2.equalizeHist(gray)
-    if try_decode(enhanced, "enhanced contrast"):
-        success = True
-    methods_tried += 1
-
-# Method 8: Rotations (sometimes images are sideways)
-if not success:
-    for angle in [90, 180, 270]:
-        print(f"\n[{methods_tried+1}] Trying rotation {angle}°...")
-        rows, cols = img_cv.shape[:2]
-        M = cv2.getRotationMatrix2D((cols/2, rows/2), angle, 1)
-        rotated = cv2.warpAffine(img_cv, M, (cols, rows))
-        if try_decode(rotated, f"rotation {angle}°"):
-            success = True
-            break
-        methods_tried += 1
-
-# Method 9: Denoising
-if not success:
-    print(f"\n[{methods_tried+1}] Trying denoising...")
-    denoised = cv2.fastNlMeansDenoisingColored(img_cv, None, 10, 10, 7, 21)
-    if try_decode(denoised, "denoised"):
-        success = True
-    methods_tried += 1
-
-# Method 10: Sharpen
-if not success:
-    print(f"\n[{methods_tried+1}] Trying sharpening...")
-    kernel = np.array([[-1,-1,-1],
-                       [-1, 9,-1],
-                       [-1,-1,-1]])
-    sharpened = cv2.filter2D(img_cv, -1, kernel)
-    if try_decode(sharpened, "sharpened"):
-        success = True
-    methods_tried += 1
-
-print("\n" + "=" * 60)
-if success:
-    print("✓ DECODING SUCCESSFUL!")
-else:
-    print(f"✗ Failed to decode after {methods_tried} attempts")
-    print("\nPossible reasons:")
-    print("  - Image quality too low")
-    print("  - Barcode is damaged or incomplete")
-    print("  - Wrong barcode type")
-    print("  - Image resolution too low")
-print("=" * 60)
+
+    print("\n" + "=" * 60)
+    if success:
+        print("✓ DECODING SUCCESSFUL!")
+    elif isinstance(decoded_objects, GaveUp):
+        print(f"✗ Time budget exhausted: {decoded_objects}")
+    else:
+        print(f"✗ Failed to decode after {len(methods)} attempts")
+        print("\nPossible reasons:")
+        print("  - Image quality too low")
+        print("  - Barcode is damaged or incomplete")
+        print("  - Wrong barcode type")
+        print("  - Image resolution too low")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,9 @@ import subprocess
 import os
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from decode_common.zxing_worker import ZXingWorkerPool, ZXingWorkerError, LocalRunner
+
 if len(sys.argv) < 2:
     print("Usage: python decode_zxing.py <image_path>")
     sys.exit(1)
@@ -27,11 +30,27 @@ print("=" * 60)
 print("Decoding using ZXing library (Java)")
 print("=" * 60)
 
+# Try the persistent ZXing worker first (structured results with points)
+try:
+    with ZXingWorkerPool(LocalRunner("."), size=1) as pool:
+        barcodes = pool.decode_file(image_path)
+    if barcodes:
+        print("Decoded successfully!\n")
+        for barcode in barcodes:
+            print(f"Format: {barcode['format']}")
+            print(f"Text: {barcode['text']}")
+            print(f"Points: {barcode['points']}\n")
+        sys.exit(0)
+    print("Decoding failed or no barcode found")
+    sys.exit(1)
+except (ZXingWorkerError, ValueError) as e:
+    print(f"ZXing worker unavailable ({e}), trying CommandLineRunner...\n")
+
 # Try direct command without Docker first
 try:
     command = [
         "java", "-cp",
-        f"{javase_jar};{core_jar};{jcommander_jar}",
+        os.pathsep.join([javase_jar, core_jar, jcommander_jar]),
         "com.google.zxing.client.j2se.CommandLineRunner",
         image_path
     ]
@@ -0,0 +1,58 @@
+from collections import namedtuple
+from types import SimpleNamespace
+
+import numpy as np
+import qrcode
+
+from decode_common.entrypoints import load_module
+
+Rect = namedtuple("Rect", "left top width height")
+Symbol = namedtuple("Symbol", "data type rect polygon")
+Decoded = namedtuple("Decoded", "data rect")
+
+
+def test_barcode_runs_the_cascade(monkeypatch, tmp_path):
+    qrcode.make("BARCODE").save(tmp_path / "code.png")
+    decoder = load_module('barcode')
+    seen = []
+
+    def fake_zbar(image, symbols):
+        seen.append(image)
+        # Only the grayscale pass reads it
+        if isinstance(image, np.ndarray) and image.ndim == 2 and len(seen) == 3:
+            return [Symbol(b"4006381333931", "EAN13", Rect(1, 2, 3, 4), [])]
+        return []
+
+    monkeypatch.setattr(decoder, "zbar_decode", fake_zbar)
+    results = decoder.decode_barcode(str(tmp_path / "code.png"), workers=1, cache=False,
+                                     output_file=None, quiet=True, prefilter=0)
+    assert [(r.symbology, r.text, r.method) for r in results] == [
+        ("EAN13", "4006381333931", "grayscale")]
+
+
+def test_barcode_gives_up_on_a_spent_budget(monkeypatch, tmp_path, capsys):
+    qrcode.make("BARCODE").save(tmp_path / "code.png")
+    decoder = load_module('barcode')
+    monkeypatch.setattr(decoder, "zbar_decode", lambda image, symbols: [])
+    assert decoder.decode_barcode(str(tmp_path / "code.png"), workers=1, cache=False,
+                                  output_file=None, deadline=0, prefilter=0) is None
+    assert "Time budget exhausted" in capsys.readouterr().out
+
+
+def test_datamatrix_scan_gets_the_time_left(monkeypatch, tmp_path):
+    qrcode.make("DATAMATRIX").save(tmp_path / "code.png")
+    decoder = load_module('datamatrix')
+    timeouts = []
+
+    def fake_decode(image, timeout=None):
+        timeouts.append(timeout)
+        return [Decoded(b"DM-42", Rect(5, 6, 7, 8))]
+
+    monkeypatch.setattr(decoder, "load", lambda name: None)
+    monkeypatch.setattr(decoder, "pylibdmtx", SimpleNamespace(decode=fake_decode))
+    results = decoder.decode_datamatrix(str(tmp_path / "code.png"), cache=False,
+                                        output_file=None, deadline=5000, quiet=True,
+                                        prefilter=0)
+    assert [(r.symbology, r.text, r.method) for r in results] == [
+        ("DATAMATRIX", "DM-42", "libdmtx")]
+    assert 0 < timeouts[0] <= 5000
@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+from decode_common import lazy
+
+
+def test_load_declared_skips_missing_modules(monkeypatch):
+    monkeypatch.setattr(lazy, "_declared", ["json", "no_such_backend"])
+    monkeypatch.setattr(lazy, "IMPORT_ERRORS", {})
+    assert lazy.load_declared() == ["json"]
+    assert "no_such_backend" in lazy.IMPORT_ERRORS
+
+
+def test_warm_up_imports_the_backends():
+    # A fresh interpreter, as a pool worker would be
+    code = ("from decode_common import batch, lazy; batch._warm_up('qrcode'); "
+            "print(sorted(set(lazy.IMPORT_TIMES) | set(lazy.IMPORT_ERRORS)))")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.join(os.path.dirname(__file__), ".."), check=True)
+    imported = output.stdout.strip()
+    for name in ("cv2", "numpy", "PIL.Image", "pyzbar.pyzbar"):
+        assert repr(name) in imported
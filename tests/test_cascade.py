@@ -0,0 +1,108 @@
+import threading
+import time
+
+from decode_common.cascade import estimated_costs, run_cascade
+from decode_common.deadline import Deadline, GaveUp
+from decode_common.image_context import ImageContext
+
+
+def method(success, result=None, delay=0.0, log=None, name=None):
+    def run():
+        if log is not None:
+            log.append(name)
+        time.sleep(delay)
+        return success, result
+    return run
+
+
+def test_earliest_listed_success_wins_even_if_slower():
+    methods = [
+        ("slow winner", method(True, "first", delay=0.05)),
+        ("fast winner", method(True, "second")),
+    ]
+    assert run_cascade(methods, workers=2) == ("slow winner", "first")
+
+
+def test_failures_fall_through_in_order():
+    methods = [("a", method(False)), ("b", method(False)), ("c", method(True, "c"))]
+    for workers in (1, 3):
+        assert run_cascade(methods, workers=workers) == ("c", "c")
+
+
+def test_exceptions_count_as_failures():
+    def broken():
+        raise RuntimeError("backend crashed")
+    assert run_cascade([("broken", broken), ("ok", method(True, 1))], workers=2) == ("ok", 1)
+
+
+def test_every_method_failing():
+    assert run_cascade([("a", method(False)), ("b", method(False))], workers=2) == (None, None)
+
+
+def test_nothing_after_a_success_is_started():
+    log = []
+    methods = [(name, method(name == "b", name, log=log, name=name)) for name in "abcdef"]
+    assert run_cascade(methods, workers=2) == ("b", "b")
+    assert set(log) <= {"a", "b", "c", "d"}
+
+
+def test_threaded_cascade_stops_starting_methods_at_the_deadline():
+    log = []
+    methods = [(f"m{i}", method(False, delay=0.05, log=log, name=f"m{i}")) for i in range(20)]
+    name, result = run_cascade(methods, workers=2, deadline=Deadline(60))
+    assert name is None and isinstance(result, GaveUp)
+    # Only the methods started before the deadline ran; the rest never began
+    time.sleep(0.15)
+    assert len(log) <= 6
+
+
+def test_budget_is_checked_when_each_method_starts():
+    log = []
+    methods = [(name, method(False, delay=0.06, log=log, name=name)) for name in ("a", "b")]
+    methods.append(("late", method(True, "late", log=log, name="late")))
+    # "late" fits the budget up front, not once "a" and "b" have used 60 ms
+    name, result = run_cascade(methods, workers=2, deadline=Deadline(120),
+                               costs={"late": 80}.get)
+    assert name is None and result.skipped == ["late"]
+    assert "late" not in log
+
+
+def test_methods_that_would_overrun_are_skipped():
+    costs = {"expensive": 10_000}.get
+    methods = [("expensive", method(True, "x")), ("cheap", method(True, "y"))]
+    for workers in (1, 2):
+        assert run_cascade(methods, workers=workers, deadline=Deadline(500),
+                           costs=costs) == ("cheap", "y")
+
+
+def test_expired_deadline_gives_up_with_the_stage():
+    deadline = Deadline(0)
+    name, result = run_cascade([("a", method(True, 1)), ("b", method(True, 2))],
+                               workers=2, deadline=deadline)
+    assert name is None and result.stage == "a" and result.attempted == []
+
+
+def test_estimated_costs_scale_with_the_image():
+    import numpy as np
+    ctx = ImageContext(image=np.zeros((1000, 2000, 3), np.uint8))
+    cost = estimated_costs(ctx)
+    assert cost("grayscale") is None
+    assert cost("region 1: denoised") == 3000
+    assert cost("Method 2: Decoding with ZXing (Docker)...") == 3000
+    assert cost("ZXing") == 350
+
+
+def test_concurrency_is_bounded_by_workers():
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def run():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        return False, None
+
+    run_cascade([(str(i), run) for i in range(12)], workers=3)
+    assert peak[0] <= 3
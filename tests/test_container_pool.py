@@ -0,0 +1,67 @@
+import importlib.util
+import os
+
+import pytest
+import qrcode
+
+from decode_common import backends, container_pool
+from decode_common.container_pool import DockerRunner, FakeRunner, warm_container_pool
+from decode_common.entrypoints import REPO_ROOT
+
+
+def load_maxicode():
+    path = os.path.join(REPO_ROOT, "EncodingDecoding", "MaxiCode", "decode_maxicode.py")
+    spec = importlib.util.spec_from_file_location("_test_decode_maxicode", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def restore_backend():
+    yield
+    backends.use_zxing_pool(None)
+
+
+def test_pool_is_warm_before_the_first_image():
+    runner = FakeRunner(text="1Z999", symbology="MAXICODE")
+    with warm_container_pool("unused", size=3, runner=runner) as pool:
+        assert runner.started == 3
+        assert pool.decode_bytes(b"image")[0]['text'] == "1Z999"
+        assert runner.started == 3
+
+
+def test_dead_container_is_replaced():
+    runner = FakeRunner()
+    with warm_container_pool("unused", size=1, health_interval=0, runner=runner) as pool:
+        for worker in pool._workers:
+            worker._process.kill()
+            worker._process.wait()
+        assert pool.decode_bytes(b"image")[0]['text'] == "FAKE"
+        assert pool.check_health() == 1
+    assert runner.started == 2
+
+
+def test_maxicode_decodes_through_warm_containers(restore_backend, tmp_path, capsys):
+    qrcode.make("LABEL").save(tmp_path / "label.png")
+    decoder = load_maxicode()
+    runner = FakeRunner(text="[)>01 96 1Z999", symbology="MAXICODE")
+    pool = decoder.use_warm_containers(size=2, runner=runner)
+    try:
+        results = decoder.decode_maxicode(str(tmp_path / "label.png"), output_file=None)
+    finally:
+        pool.close()
+    assert runner.started == 2
+    assert [(r.symbology, r.text) for r in results] == [("MAXICODE", "[)>01 96 1Z999")]
+
+
+def test_docker_runner_mounts_the_compiled_worker(monkeypatch):
+    started = []
+    monkeypatch.setattr(container_pool, "compile_worker", lambda jar_dir: "/build")
+    monkeypatch.setattr(container_pool, "ZXingWorker",
+                        lambda command, cleanup=None: started.append(command) or command)
+    command = DockerRunner("/jars", image="zxing-test").start()
+    assert command[:3] == ["docker", "run", "-i"]
+    assert "/build:/worker:ro" in command
+    assert "zxing-test" in command
+    assert command[-1] == "ZXingWorker"
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+import qrcode
+
+from decode_common import daemon, trace
+from decode_common.client import script_path
+
+
+@pytest.fixture
+def qr_daemon(monkeypatch):
+    # run_script() executes the compiled script, as a forked worker would
+    path = script_path('qrcode')
+    with open(path, encoding='utf-8') as f:
+        monkeypatch.setitem(daemon._code, 'qrcode', compile(f.read(), path, 'exec'))
+    yield
+    trace.flush()
+
+
+def test_trace_is_written_after_each_request(qr_daemon, tmp_path):
+    qrcode.make("DAEMON").save(tmp_path / "qr.png")
+
+    stdout, stderr, exit_code = daemon.run_script(
+        'qrcode', ["qr.png", "--trace", "t.json"], str(tmp_path))
+    assert exit_code == 0
+    assert "STAGE TIMINGS" in stderr
+    assert json.loads((tmp_path / "t.json").read_text())['traceEvents']
+
+    # The worker lives on: the next request is not traced
+    assert not trace.is_enabled()
+    daemon.run_script('qrcode', ["qr.png", "--trace", "u.json"], str(tmp_path))
+    events = json.loads((tmp_path / "u.json").read_text())['traceEvents']
+    daemon.run_script('qrcode', ["qr.png"], str(tmp_path))
+    assert not trace.events()
+    # Only the second request's spans, not the first one's as well
+    assert len(events) <= len(json.loads((tmp_path / "t.json").read_text())['traceEvents'])
+
+
+def test_startup_report_is_printed_per_request(qr_daemon, tmp_path):
+    qrcode.make("DAEMON").save(tmp_path / "qr.png")
+
+    _, stderr, _ = daemon.run_script('qrcode', ["qr.png", "--startup-report"], str(tmp_path))
+    assert "STARTUP REPORT" in stderr
+    _, stderr, _ = daemon.run_script('qrcode', ["qr.png"], str(tmp_path))
+    assert "STARTUP REPORT" not in stderr
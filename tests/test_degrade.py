@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from benchmark.degrade import degrade, perspective, rotation
+
+
+@pytest.mark.parametrize("step", [rotation, perspective])
+def test_warps_fill_every_channel_with_the_background(step):
+    image = np.zeros((80, 120, 3), np.uint8)
+    warped = step(image, 1.0, np.random.default_rng(4))
+    corner = warped[0, 0]
+    assert corner.tolist() == [255, 255, 255]
+
+
+def test_warps_keep_grayscale_images_grayscale():
+    warped = rotation(np.zeros((80, 120), np.uint8), 1.0, np.random.default_rng(4))
+    assert warped.ndim == 2 and warped[0, 0] == 255
+
+
+def test_same_seed_same_degradation():
+    image = np.random.default_rng(0).integers(0, 256, (60, 60, 3), dtype=np.uint8)
+    assert np.array_equal(degrade(image, 0.7, seed=3), degrade(image, 0.7, seed=3))
+    assert np.array_equal(degrade(image, 0), image)
+
+
+def test_unknown_degradation():
+    with pytest.raises(ValueError):
+        degrade(np.zeros((10, 10), np.uint8), 0.5, kinds=("smudge",))
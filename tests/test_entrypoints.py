@@ -0,0 +1,37 @@
+from decode_common.entrypoints import load_module, normalize_results
+from decode_common.result import DecodeResult
+from decode_common.result_cache import Rect, Symbol
+
+
+def test_decode_results_keep_their_polygon():
+    result = DecodeResult(b'HELLO', 'HELLO', 'QRCODE', ((1, 2), (3, 2), (3, 4), (1, 4)),
+                          method='OpenCV')
+    assert normalize_results('qrcode', [result], 'QRCODE') == [
+        {'type': 'QRCODE', 'data': 'HELLO', 'method': 'OpenCV',
+         'polygon': [[1, 2], [3, 2], [3, 4], [1, 4]]}]
+
+
+def test_pdf417_raw_text_and_records():
+    assert normalize_results('pdf417', ('ZXing', ' RAW\n'), 'PDF417') == [
+        {'type': 'PDF417', 'data': 'RAW', 'method': 'ZXing', 'polygon': []}]
+    record = {'type': None, 'data': 'TEXT', 'rect': (1, 2, 3, 4), 'polygon': []}
+    normalized = normalize_results('pdf417', ('Otsu', [record]), 'PDF417')
+    assert normalized[0]['type'] == 'PDF417'
+    assert normalized[0]['polygon'] == [[1, 2], [4, 2], [4, 6], [1, 6]]
+
+
+def test_nothing_decoded():
+    assert normalize_results('pdf417', (None, None), 'PDF417') == []
+    assert normalize_results('datamatrix', None, 'DATAMATRIX') == []
+
+
+def test_datamatrix_results_carry_symbology_and_corners():
+    # pylibdmtx objects have a rect but no type or polygon
+    obj = Symbol(data=b'DM', type=None, rect=Rect(10, 20, 30, 40), polygon=[], quality=None,
+                 orientation=None)
+    module = load_module('datamatrix')
+    results = module.process_results([obj], 'dm.png', output_file=None, method='libdmtx',
+                                     quiet=True)
+    assert list(results[0]) == ['DATAMATRIX', 'DM']
+    assert results[0].polygon == ((10, 20), (40, 20), (40, 60), (10, 60))
+    assert normalize_results('datamatrix', results, 'DATAMATRIX')[0]['polygon'][2] == [40, 60]
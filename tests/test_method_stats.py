@@ -0,0 +1,52 @@
+import pytest
+
+from decode_common.method_stats import MethodName, MethodStats, base_name
+
+
+def noop():
+    return False, None
+
+
+def test_derived_names_share_the_base_statistics():
+    stats = MethodStats(None, "PDF417")
+    stats.record(MethodName("region 1: Otsu", "Otsu"), True, 10.0)
+    # A pyramid level of a crop: localize wraps pyramid's name
+    stats.record(MethodName("region 2: Otsu @ 0.5x", MethodName("Otsu @ 0.5x", "Otsu")),
+                 False, 30.0)
+    assert list(stats._profile["methods"]) == ["Otsu"]
+    assert stats.mean_ms(MethodName("region 7: Otsu", "Otsu")) == 20.0
+    assert base_name("Otsu") == "Otsu"
+
+
+def test_pin_applies_to_every_region():
+    stats = MethodStats(None, "PDF417")
+    stats.pin(["Otsu", "Grayscale"])
+    methods = [(MethodName(f"region {i}: {name}", name), noop)
+               for i in (1, 2) for name in ("Grayscale", "Blur", "Otsu")]
+    assert [name for name, _ in stats.order(methods)] == [
+        "region 1: Otsu", "region 2: Otsu", "region 1: Grayscale", "region 2: Grayscale"]
+
+
+def test_learned_order_uses_the_base_cost():
+    stats = MethodStats(None, "PDF417")
+    for _ in range(3):
+        stats.record("slow", True, 100.0)
+        stats.record("fast", True, 1.0)
+    methods = [(MethodName(f"region 1: {name}", name), noop) for name in ("slow", "fast")]
+    assert [name.base for name, _ in stats.order(methods)] == ["fast", "slow"]
+
+
+def test_nothing_recorded_cannot_be_pinned():
+    stats = MethodStats(None, "PDF417")
+    with pytest.raises(ValueError):
+        stats.pin()
+    assert stats.pinned is None
+
+
+def test_empty_or_stale_pin_falls_back_to_the_learned_order():
+    stats = MethodStats(None, "PDF417")
+    methods = [("a", noop), ("b", noop)]
+    stats._profile["pinned"] = []
+    assert stats.order(methods) == methods
+    stats._profile["pinned"] = ["gone"]
+    assert stats.order(methods) == methods
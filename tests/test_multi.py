@@ -0,0 +1,83 @@
+import numpy as np
+
+from decode_common import multi
+from decode_common.image_context import ImageContext
+from decode_common.localize import Region
+
+
+def symbol(data, x, y, size=100):
+    return {'data': data, 'polygon': [(x, y), (x + size, y), (x + size, y + size), (x, y + size)]}
+
+
+def test_same_payload_in_the_same_place_is_merged():
+    found = [symbol('A', 0, 0)]
+    assert multi.merge(found, [symbol('A', 10, 10), symbol('B', 10, 10)]) == 1
+    assert [item['data'] for item in found] == ['A', 'B']
+
+
+def test_same_payload_elsewhere_is_kept():
+    found = [symbol('A', 0, 0)]
+    assert multi.merge(found, [symbol('A', 500, 0)]) == 1
+    assert len(found) == 2
+
+
+def test_iou():
+    a = multi.polygon(symbol('A', 0, 0))
+    assert multi.iou(a, a) == 1.0
+    assert abs(multi.iou(a, multi.polygon(symbol('A', 50, 0))) - 1 / 3) < 1e-6
+    assert multi.iou(a, multi.polygon(symbol('A', 200, 0))) == 0.0
+
+
+def test_rect_only_symbols_dedup():
+    found = [{'data': b'A', 'rect': (0, 0, 100, 100)}]
+    assert multi.merge(found, [{'data': 'A', 'rect': (5, 5, 100, 100)}]) == 0
+
+
+def test_unresolved_regions_get_the_region_cascade(monkeypatch):
+    regions = [Region(0, 0, 200, 200), Region(300, 0, 200, 200)]
+    monkeypatch.setattr(multi, 'find_regions', lambda gray, max_regions: regions)
+    ctx = ImageContext(image=np.full((200, 500, 3), 255, np.uint8))
+    calls = []
+
+    def full_frame(c):
+        calls.append(('full', c.offset))
+        return [("multi", lambda: (True, [symbol('A', 50, 50)]))]
+
+    def region(c):
+        calls.append(('region', c.offset))
+        return [("single", lambda: (True, [symbol('B', 10, 10)]))]
+
+    found = multi.find_all(ctx, full_frame, region)
+    assert calls == [('full', (0, 0)), ('region', (300, 0))]
+    assert [item['data'] for item in found] == ['A', 'B']
+    # Shifted back into page coordinates
+    assert found[1]['polygon'][0] == (310, 10)
+
+
+def test_frame_filling_code_gets_the_single_cascade(monkeypatch):
+    # A code covering most of the frame yields no candidate regions
+    monkeypatch.setattr(multi, 'find_regions', lambda gray, max_regions: [])
+    ctx = ImageContext(image=np.full((200, 200, 3), 255, np.uint8))
+
+    def full_frame(c):
+        return [("multi", lambda: (False, None))]
+
+    def single(c):
+        assert c is ctx
+        return [("single", lambda: (True, [symbol('A', 5, 5, 190)]))]
+
+    found = multi.find_all(ctx, full_frame, single)
+    assert [item['data'] for item in found] == ['A']
+
+
+def test_frame_filling_qr_code():
+    import qrcode
+
+    from decode_common.entrypoints import load_module
+
+    image = np.array(qrcode.make("https://benax.rw", border=1).convert("RGB"))[:, :, ::-1]
+    ctx = ImageContext(image=np.ascontiguousarray(image))
+    decoder = load_module('qrcode')
+    symbols = decoder.PROFILES['qrcode']
+    found = multi.find_all(ctx, lambda c: [], lambda c: decoder.build_methods(c, symbols))
+    assert [multi.payload(item) for item in found] == [b"https://benax.rw"]
@@ -0,0 +1,48 @@
+import numpy as np
+import qrcode
+
+from decode_common.orientation import Skew, deskew_angle, estimate_skew, rotate
+
+
+def qr_gray():
+    return np.array(qrcode.make("ORIENTATION").convert("L"), dtype=np.uint8)
+
+
+def test_right_angles_are_exact():
+    image = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    assert rotate(image, 0) is image
+    assert np.array_equal(rotate(image, 90), np.rot90(image, 1))
+    assert np.array_equal(rotate(image, 180), np.rot90(image, 2))
+    assert np.array_equal(rotate(image, -90), np.rot90(image, -1))
+    assert np.array_equal(rotate(image, 450), np.rot90(image, 1))
+
+
+def test_other_angles_keep_the_corners():
+    image = np.zeros((100, 200), np.uint8)
+    rotated = rotate(image, 30)
+    # The canvas holds the whole rotated rectangle
+    assert rotated.shape[1] >= int(200 * np.cos(np.radians(30)) + 100 * np.sin(np.radians(30)))
+    assert rotated.shape[0] >= int(200 * np.sin(np.radians(30)) + 100 * np.cos(np.radians(30)))
+
+
+def test_skew_of_a_rotated_code():
+    gray = qr_gray()
+    straight = estimate_skew(gray)
+    assert abs(straight.angle) < 1.0
+    assert straight.confidence > 0.5
+
+    skew = estimate_skew(rotate(gray, 12))
+    assert abs(skew.angle - 12) < 1.5
+    assert abs(estimate_skew(rotate(gray, -20)).angle + 20) < 1.5
+    # Modulo 90: a code turned by 100 degrees is 10 degrees off square
+    assert abs(estimate_skew(rotate(gray, 100)).angle - 10) < 1.5
+
+
+def test_blank_image_has_no_skew():
+    assert estimate_skew(np.full((50, 50), 255, np.uint8)) == Skew(0.0, 0.0)
+
+
+def test_deskew_angle():
+    assert deskew_angle(Skew(12.0, 0.8)) == -12.0
+    assert deskew_angle(Skew(1.0, 0.8)) is None
+    assert deskew_angle(Skew(12.0, 0.1)) is None
@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+import pytest
+
+from decode_common.prefilter import DEFAULT_THRESHOLD, code_likelihood, decide
+
+WORDS = "the quick brown fox jumps over a lazy dog while invoices ship on monday".split()
+
+
+def qr_code(text="LOW-CONTRAST", module=8):
+    encoded = cv2.QRCodeEncoder.create().encode(text)
+    code = cv2.resize(encoded, None, fx=module, fy=module, interpolation=cv2.INTER_NEAREST)
+    return cv2.copyMakeBorder(code, 40, 40, 40, 40, cv2.BORDER_CONSTANT, value=255)
+
+
+def text_page(width=2000, height=1500):
+    page = np.full((height, width), 255, np.uint8)
+    rng = np.random.default_rng(0)
+    for y in range(80, height - 60, 48):
+        line = " ".join(rng.choice(WORDS, 12))
+        cv2.putText(page, line, (60, y), cv2.FONT_HERSHEY_SIMPLEX, 1.2, 0, 2, cv2.LINE_AA)
+    return page
+
+
+def test_low_contrast_code_is_decoded():
+    code = qr_code()
+    faint = (115 + code.astype(np.float32) / 255 * 15).astype(np.uint8)
+    assert cv2.QRCodeDetector().detectAndDecode(faint)[0] == "LOW-CONTRAST"
+    likelihood = code_likelihood(faint)
+    assert decide(likelihood.score) == "decode", likelihood
+
+
+def test_faint_code_on_a_page_is_decoded():
+    page = np.full((1500, 2000), 125, np.uint8)
+    code = (115 + qr_code().astype(np.float32) / 255 * 15).astype(np.uint8)
+    page[600:600 + code.shape[0], 900:900 + code.shape[1]] = code
+    assert decide(code_likelihood(page).score) == "decode"
+
+
+def test_text_page_is_not_a_code():
+    likelihood = code_likelihood(text_page())
+    assert likelihood.score < DEFAULT_THRESHOLD, likelihood
+    assert decide(likelihood.score) == "shorten"
+
+
+def test_code_next_to_text_is_decoded():
+    page = text_page()
+    code = qr_code()
+    page[100:100 + code.shape[0], 100:100 + code.shape[1]] = code
+    assert decide(code_likelihood(page).score) == "decode"
+
+
+@pytest.mark.parametrize("sigma", [0, 4, 8])
+def test_blank_page_is_skipped(sigma):
+    rng = np.random.default_rng(1)
+    page = np.clip(200 + rng.normal(0, sigma, (1000, 800)), 0, 255).astype(np.uint8)
+    assert decide(code_likelihood(page).score) == "skip"
+
+
+def test_threshold_zero_disables():
+    assert decide(0.0, 0) == "decode"
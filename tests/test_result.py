@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+
+from decode_common.result import DecodeResult, ResultWriter, cascade_results
+from decode_common.result_cache import Point, Rect, Symbol
+
+
+def qr_result(**fields):
+    obj = Symbol(b'HELLO', 'QRCODE', Rect(0, 0, 10, 10),
+                 [Point(0, 0), Point(10, 0), Point(10, 10), Point(0, 10)], 3, None)
+    return DecodeResult.from_symbol(obj, 'OpenCV', {'total_ms': 1.5}, 'label.png', **fields)
+
+
+def test_unpacks_like_the_old_tuples():
+    symbology, text = qr_result()
+    assert (symbology, text) == ('QRCODE', 'HELLO')
+
+
+def test_non_utf8_payload_keeps_its_bytes():
+    record = DecodeResult(b'caf\xe9', 'café').to_dict()
+    assert record['data'] == 'café'
+    assert record['data_b64'] == 'Y2Fm6Q=='
+    assert 'data_b64' not in qr_result().to_dict()
+
+
+def test_cascade_results_from_raw_text():
+    results = cascade_results('ZXing', 'TEXT\n', 'PDF417')
+    assert [(r.symbology, r.text, r.method, r.polygon) for r in results] == [
+        ('PDF417', 'TEXT', 'ZXing', ())]
+
+
+def test_jsonl_writer():
+    out = io.StringIO()
+    ResultWriter(out, "jsonl").write([qr_result(), qr_result()])
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 2
+    record = json.loads(lines[0])
+    assert record['type'] == 'QRCODE'
+    assert record['polygon'] == [[0, 0], [10, 0], [10, 10], [0, 10]]
+    assert record['timings'] == {'total_ms': 1.5}
+
+
+def test_csv_writer_writes_the_header_once():
+    out = io.StringIO()
+    writer = ResultWriter(out, "csv")
+    writer.write([qr_result()])
+    writer.write([qr_result()])
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert rows[0] == ['image', 'symbology', 'text', 'method', 'quality', 'polygon', 'timings']
+    assert rows[1] == ['label.png', 'QRCODE', 'HELLO', 'OpenCV', '3', '0 0;10 0;10 10;0 10',
+                       'total_ms=1.5']
+    assert len(rows) == 3
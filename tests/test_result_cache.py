@@ -0,0 +1,48 @@
+from decode_common.result_cache import (
+    Point, Rect, ResultCache, Symbol, record_symbol, symbol_record, text_record,
+)
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (3, 1, 2)
+
+
+def test_key_depends_on_bytes_and_config():
+    assert ResultCache.key(b'image', 'qr/v1') == ResultCache.key(b'image', 'qr/v1')
+    assert ResultCache.key(b'image', 'qr/v1') != ResultCache.key(b'image', 'qr/v2')
+    assert ResultCache.key(b'image', 'qr/v1') != ResultCache.key(b'other', 'qr/v1')
+
+
+def test_sqlite_tier_survives_a_new_cache(tmp_path):
+    db = str(tmp_path / "cache.db")
+    cache = ResultCache(db_path=db)
+    cache.put('key', [{'data': 'x'}])
+    cache.close()
+
+    reopened = ResultCache(db_path=db)
+    assert reopened.get('key') == [{'data': 'x'}]
+    assert reopened.stats()['disk_hits'] == 1
+    # Now in memory as well
+    assert reopened.get('key') == [{'data': 'x'}]
+    assert reopened.stats()['disk_hits'] == 1
+    reopened.close()
+
+
+def test_symbol_round_trip():
+    polygon = [Point(1, 2), Point(11, 2), Point(11, 12), Point(1, 12)]
+    obj = Symbol(b'\xffdata', 'QRCODE', Rect(1, 2, 10, 10), polygon, 5, None)
+    assert record_symbol(symbol_record(obj)) == obj
+
+
+def test_text_record_rect_comes_from_the_polygon():
+    symbol = record_symbol(text_record("TEXT", "MAXICODE", [(5, 5), (25, 5), (25, 15)]))
+    assert symbol.data == b'TEXT'
+    assert symbol.rect == Rect(5, 5, 20, 10)
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+from decode_common import service
+from decode_common.service import HTTPError, charge, decode_batch, read_request
+
+
+def read(raw):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await read_request(reader)
+
+    return asyncio.run(run())
+
+
+def test_post_body_is_read():
+    method, path, query, headers, body = read(
+        b"POST /decode/qrcode?budget_ms=50 HTTP/1.1\r\nContent-Length: 3\r\n\r\nabc")
+    assert (method, path, query, body) == ("POST", "/decode/qrcode", {'budget_ms': '50'}, b"abc")
+
+
+@pytest.mark.parametrize("length", [b"-1", b"abc"])
+def test_bad_content_length_is_rejected(length):
+    with pytest.raises(HTTPError) as error:
+        read(b"POST /decode/qrcode HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\nabc")
+    assert error.value.status == 400
+
+
+def test_charge():
+    assert charge({}, 100) == {}
+    assert charge({'deadline': 300.0}, 100) == {'deadline': 200.0}
+    assert charge({'deadline': 50.0}, 100) == {'deadline': 0.0}
+
+
+def test_batch_charges_earlier_items(monkeypatch):
+    budgets = []
+
+    def slow_decoder(name, path, deadline=None):
+        budgets.append(deadline)
+        time.sleep(0.05)
+        return []
+
+    monkeypatch.setattr(service, "run_decoder", slow_decoder)
+    decode_batch('qrcode', [(b"x", {'deadline': 500.0}), (b"y", {'deadline': 500.0})])
+    assert budgets[0] > 490
+    assert budgets[1] <= 450
+
+
+def test_burst_is_spread_over_idle_workers():
+    sizes = []
+
+    async def run():
+        svc = service.DecodeService(workers=4, max_batch=8)
+        svc._free_workers = asyncio.Semaphore(svc.workers)
+        svc._idle_workers = svc.workers
+        svc._drained = asyncio.Event()
+        svc._queues = {'qrcode': asyncio.Queue()}
+
+        async def fake_run_batch(decoder_name, batch):
+            sizes.append(len(batch))
+            await asyncio.sleep(0.05)
+            svc._idle_workers += 1
+            svc._free_workers.release()
+            for _, _, future, _ in batch:
+                future.set_result({'ok': True})
+
+        svc._run_batch = fake_run_batch
+        batcher = asyncio.create_task(svc._batcher('qrcode'))
+        await asyncio.gather(*(svc.decode('qrcode', b"x") for _ in range(8)))
+        batcher.cancel()
+
+    asyncio.run(run())
+    assert sum(sizes) == 8
+    assert len(sizes) == 4
+    assert max(sizes) == 2
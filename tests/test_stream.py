@@ -0,0 +1,62 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from decode_common.stream import StreamDecoder
+
+FRAMES = 12
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("no MJPG video writer in this OpenCV build")
+    for i in range(FRAMES):
+        writer.write(np.full((48, 64, 3), i * 20, np.uint8))
+    writer.release()
+    return path
+
+
+def collect(stream, timeout=10):
+    """All results of a stream, failing instead of hanging"""
+    results = []
+    reader = threading.Thread(target=lambda: results.extend(stream.results()), daemon=True)
+    reader.start()
+    reader.join(timeout)
+    assert not reader.is_alive(), "results() did not finish"
+    return results
+
+
+def test_file_source_is_decoded_to_the_end(video):
+    stream = StreamDecoder(video, lambda frame: ['symbol'], workers=2, queue_size=FRAMES)
+    with stream:
+        results = collect(stream)
+    assert len(results) + stream.frames_dropped == FRAMES
+    assert all(result.symbols == ['symbol'] for result in results)
+    assert stream.stats()['frames_read'] == FRAMES
+
+
+def test_raising_callback_does_not_stall_the_stream(video):
+    def on_result(result):
+        raise RuntimeError("callback bug")
+
+    stream = StreamDecoder(video, lambda frame: [], workers=2, queue_size=FRAMES,
+                           on_result=on_result)
+    with stream:
+        results = collect(stream)
+    assert len(results) + stream.frames_dropped == FRAMES
+    assert stream.callback_errors == len(results)
+
+
+def test_raising_decoder_yields_empty_results(video):
+    def decode(frame):
+        raise ValueError("bad frame")
+
+    stream = StreamDecoder(video, decode, workers=1, queue_size=FRAMES)
+    with stream:
+        results = collect(stream)
+    assert results and all(result.symbols == [] for result in results)
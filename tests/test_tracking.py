@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from decode_common.localize import find_regions
+from decode_common.tracking import FAILED_FRAMES, LOCALIZE_EVERY, SymbolTracker
+
+Symbol = namedtuple('Symbol', 'data type rect polygon')
+
+
+def text_frame():
+    frame = np.full((480, 640, 3), 255, np.uint8)
+    for y in range(60, 460, 40):
+        cv2.putText(frame, "shipping label 0042 fragile", (20, y), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.9, (0, 0, 0), 2)
+    return frame
+
+
+def qr_frame():
+    code = cv2.QRCodeEncoder.create().encode("TRACK-ME")
+    code = cv2.resize(code, None, fx=6, fy=6, interpolation=cv2.INTER_NEAREST)
+    frame = np.full((480, 640), 255, np.uint8)
+    frame[100:100 + code.shape[0], 200:200 + code.shape[1]] = code
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+
+def qr_decoder(image):
+    data, points, _ = cv2.QRCodeDetector().detectAndDecode(image)
+    if not data:
+        return []
+    polygon = [(int(x), int(y)) for x, y in points.reshape(-1, 2)]
+    x, y, w, h = cv2.boundingRect(np.int32(polygon))
+    return [Symbol(data.encode(), 'QRCODE', (x, y, w, h), polygon)]
+
+
+def test_empty_scene_searches_every_few_frames_and_skips_failed_regions():
+    frame = text_frame()
+    regions = find_regions(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    tracker = SymbolTracker(lambda image: [])
+    frames = 2 * FAILED_FRAMES
+    for _ in range(frames):
+        assert tracker.update(frame) == []
+    assert regions
+    # Every region is retried once its failure expires, not on every search
+    retries = len(range(0, frames, FAILED_FRAMES))
+    assert tracker.decodes == retries * len(regions)
+    assert len(range(0, frames, LOCALIZE_EVERY)) > retries
+
+
+def test_static_symbol_is_decoded_once_and_followed():
+    frame = qr_frame()
+    tracker = SymbolTracker(qr_decoder)
+    first = tracker.update(frame)
+    assert [(s.data, s.decoded) for s in first] == [(b"TRACK-ME", True)]
+    decodes = tracker.decodes
+    for _ in range(10):
+        symbols = tracker.update(frame)
+        assert [(s.data, s.decoded) for s in symbols] == [(b"TRACK-ME", False)]
+    assert tracker.decodes == decodes
+
+
+def test_import_does_not_load_opencv():
+    # stream_qrcode imports the tracker even without --track
+    code = "import sys, decode_common.tracking; print('cv2' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.join(os.path.dirname(__file__), ".."), check=True)
+    assert output.stdout.strip() == "False"
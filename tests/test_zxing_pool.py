@@ -0,0 +1,102 @@
+import pytest
+
+from decode_common import zxing_worker
+from decode_common.container_pool import FakeRunner
+from decode_common.entrypoints import load_module
+from decode_common.zxing_worker import (
+    LocalRunner, ZXingStartupError, ZXingWorkerError, ZXingWorkerPool,
+)
+
+
+def test_workers_are_reused():
+    runner = FakeRunner(text="HELLO", symbology="PDF_417")
+    with ZXingWorkerPool(runner, size=2) as pool:
+        for _ in range(3):
+            results = pool.decode_bytes(b"image")
+            assert [(r['format'], r['text']) for r in results] == [("PDF_417", "HELLO")]
+    assert runner.started == 1
+
+
+def test_warm_starts_every_worker():
+    runner = FakeRunner()
+    with ZXingWorkerPool(runner, size=2) as pool:
+        pool.warm()
+        assert runner.started == 2
+        assert pool.check_health() == 2
+
+
+def test_crashed_worker_is_replaced():
+    runner = FakeRunner(exit_after=1)
+    with ZXingWorkerPool(runner, size=1) as pool:
+        pool.decode_bytes(b"image")
+        with pytest.raises(ZXingWorkerError):
+            pool.decode_bytes(b"image")
+        assert pool.decode_bytes(b"image")[0]['text'] == "FAKE"
+    assert runner.started == 2
+
+
+def test_workers_are_recycled_after_max_jobs():
+    runner = FakeRunner()
+    with ZXingWorkerPool(runner, size=1, max_jobs=2) as pool:
+        for _ in range(4):
+            pool.decode_bytes(b"image")
+    assert runner.started == 2
+
+
+def test_slow_worker_times_out():
+    runner = FakeRunner(delay=2.0)
+    with ZXingWorkerPool(runner, size=1) as pool:
+        with pytest.raises(ZXingWorkerError):
+            pool.decode_bytes(b"image", timeout=0.2)
+
+
+def test_empty_image_is_rejected():
+    with ZXingWorkerPool(FakeRunner(), size=1) as pool:
+        with pytest.raises(ValueError):
+            pool.decode_bytes(b"")
+
+
+def test_failed_compile_is_not_retried(monkeypatch, tmp_path):
+    for jar in (zxing_worker.JAVASE_JAR, zxing_worker.CORE_JAR):
+        (tmp_path / jar).write_bytes(b"")
+    monkeypatch.setattr(zxing_worker, "BUILD_DIR", str(tmp_path / "build"))
+    monkeypatch.setattr(zxing_worker, "_compile_errors", {})
+    calls = []
+
+    def javac(command, **kwargs):
+        calls.append(command)
+        raise FileNotFoundError(command[0])
+
+    monkeypatch.setattr(zxing_worker.subprocess, "run", javac)
+    for _ in range(3):
+        with pytest.raises(ZXingStartupError):
+            LocalRunner(str(tmp_path)).start()
+    assert len(calls) == 1
+
+
+class FailingPool:
+    def __init__(self, error):
+        self.error = error
+
+    def decode_file(self, image_path, timeout=10):
+        raise self.error
+
+
+@pytest.mark.parametrize("error, falls_back", [
+    (ZXingStartupError("javac not found"), True),
+    (ZXingWorkerError("ZXing worker did not answer within 1 s"), False),
+])
+def test_command_line_fallback_only_without_a_worker(monkeypatch, error, falls_back):
+    decoder = load_module('pdf417')
+    monkeypatch.setattr(decoder, "shared_pool", lambda jar_dir: FailingPool(error))
+    monkeypatch.setattr(decoder.os.path, "exists", lambda path: True)
+    runs = []
+
+    def command_line_runner(command, **kwargs):
+        runs.append(command)
+        raise FileNotFoundError("java")
+
+    monkeypatch.setattr(decoder.subprocess, "run", command_line_runner)
+    success, _ = decoder.decode_with_zxing_java("label.png", timeout=1)
+    assert not success
+    assert bool(runs) == falls_back